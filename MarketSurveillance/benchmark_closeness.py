@@ -0,0 +1,108 @@
+# benchmark_closeness.py
+# Compare exact networkx closeness centrality against the parallel
+# exact and pivot-sampled engines in closeness.py on Barabasi-Albert
+# graphs of growing size. The parallel results are checked against
+# networkx wherever it runs ("nx diff"; the script exits with status 1
+# on a mismatch). The sampled estimate's error is shown both as the
+# largest closeness error and, in hops, as the largest error in average
+# distance ("dist err"), which is what the reported error bound
+# ("dist bound") limits. BA graphs are connected, so a node's average
+# distance to the others is 1 / closeness.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import argparse
+import time
+import numpy as np
+import networkx as nx
+from csr_graph import CSRGraph
+from closeness import closeness_centrality, approximate_closeness
+
+
+# Largest difference to networkx still counted as a match.
+TOLERANCE = 1e-9
+
+
+def main():
+	parser = argparse.ArgumentParser(
+		description='Benchmark closeness centrality engines on BA graphs.'
+	)
+	parser.add_argument(
+		'--sizes', type=int, nargs='+', default=[1000, 2000, 5000, 10000],
+		help='Number of nodes of each BA graph.'
+	)
+	parser.add_argument(
+		'--m', type=int, default=3,
+		help='Edges added per new node in the BA model.'
+	)
+	parser.add_argument(
+		'--workers', type=int, default=None,
+		help='Worker processes (defaults to the CPU count).'
+	)
+	parser.add_argument(
+		'--pivots', type=int, default=64,
+		help='Number of pivots for the sampled estimate.'
+	)
+	parser.add_argument(
+		'--nx-limit', type=int, default=5000,
+		help='Largest graph on which to run exact networkx.'
+	)
+	args = parser.parse_args()
+
+	header = (
+		f'{"nodes":>8} {"edges":>9} {"networkx":>10} {"parallel":>10} '
+		f'{"sampled":>10} {"nx diff":>9} {"close err":>10} {"dist err":>9} '
+		f'{"dist bound":>10}'
+	)
+	print(header)
+	mismatches = 0
+	for n in args.sizes:
+		G = nx.barabasi_albert_graph(n, args.m, seed=42)
+		graph = CSRGraph.from_networkx(G, weight=None)
+
+		# Exact networkx (only on the smaller graphs).
+		nx_time = float('nan')
+		expected = None
+		if n <= args.nx_limit:
+			start = time.perf_counter()
+			expected = nx.closeness_centrality(G)
+			nx_time = time.perf_counter() - start
+
+		# Parallel exact closeness.
+		start = time.perf_counter()
+		exact = closeness_centrality(graph, workers=args.workers)
+		parallel_time = time.perf_counter() - start
+
+		# Pivot-sampled closeness.
+		start = time.perf_counter()
+		approx, bound = approximate_closeness(
+			graph, pivots=args.pivots, workers=args.workers, seed=42
+		)
+		sampled_time = time.perf_counter() - start
+
+		diff = float('nan')
+		if expected is not None:
+			diff = np.abs(
+				exact - np.asarray([expected[name] for name in graph.names.tolist()])
+			).max()
+			if diff > TOLERANCE:
+				mismatches += 1
+		dist_err = np.abs(1 / exact - 1 / approx).max()
+		print(
+			f'{n:>8} {graph.number_of_edges():>9} {nx_time:>10.3f} '
+			f'{parallel_time:>10.3f} {sampled_time:>10.3f} {diff:>9.1e} '
+			f'{np.abs(exact - approx).max():>10.5f} {dist_err:>9.3f} '
+			f'{bound:>10.3f}'
+		)
+
+	if mismatches > 0:
+		print(f'Parallel closeness differs from networkx on {mismatches} graph(s)')
+		exit(1)
+
+	# Exit the program.
+	exit(0)
+
+
+if __name__ == '__main__':
+	main()
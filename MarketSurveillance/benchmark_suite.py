@@ -0,0 +1,424 @@
+# benchmark_suite.py
+# Scaling benchmark for every analysis step of market_surveillance.py.
+# Barabasi-Albert, Watts-Strogatz and Erdos-Renyi graphs of 10^3 to
+# 10^7 edges are generated with the vectorized models from
+# ../SyntheticSocialNetwork/generators.py, turned into a chat-log style
+# DataFrame (Inviter/Invitee/MsgCount), and each step is run on them:
+# graph construction, degree/closeness/eigenvector centrality, Louvain,
+# modularity, clique enumeration and layout. Every step runs in its own
+# child process (regenerating the same seeded graph), so a step that
+# hangs or runs out of memory does not take the suite down, and the
+# peak RSS is reset right before the timed step (Linux), so it is
+# measured without the graph generation. The child is a regular
+# (non-daemonic) process, so steps such as closeness can start their
+# own worker pools (--workers). Results (wall time, peak RSS, memory
+# added by the step, throughput) are saved as JSON and can be compared
+# against an earlier run to catch regressions; --compare exits with
+# status 1 when a step got slower than REGRESSION_RATIO:
+#   python benchmark_suite.py --edges 1000 10000 100000 --out bench.json
+#   python benchmark_suite.py --out new.json --compare bench.json
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+	0, os.path.join(
+		os.path.dirname(os.path.abspath(__file__)), '..',
+		'SyntheticSocialNetwork'
+	)
+)
+from generators import erdos_renyi_edges, watts_strogatz_edges
+from generators import barabasi_albert_edges
+from ingest import build_graph
+from csr_graph import CSRGraph
+from centrality import degree_centrality, strength_centrality
+from centrality import eigenvector_centrality
+from closeness import closeness_centrality, approximate_closeness
+from louvain import louvain_membership, modularity
+from cliques import find_cliques
+from render import force_layout
+from metrics import peak_rss_bytes, rss_bytes, reset_peak_rss
+
+
+MODELS = ['ba', 'ws', 'er']
+STEPS = [
+	'generate', 'build-graph', 'build-networkx', 'degree', 'eigenvector',
+	'closeness', 'louvain', 'modularity', 'cliques', 'layout',
+]
+
+# Average degree of the generated graphs (BA m = 3, WS k = 6, ER
+# p = 6 / (n - 1)), so a graph with E edges has about E / 3 nodes.
+AVERAGE_DEGREE = 6
+
+# Largest graph (in edges) each step is run on by default. Closeness
+# switches from exact to pivot-sampled above its limit instead of
+# being skipped.
+STEP_LIMITS = {
+	'build-networkx': 1_000_000,
+	'closeness': 100_000,
+	'layout': 1_000_000,
+}
+
+# A step is flagged as a regression when it is this much slower than
+# in the baseline results.
+REGRESSION_RATIO = 1.25
+
+MB = 1 << 20
+
+
+def generate(model, edges, seed):
+	# Edge arrays and node count of a graph with about `edges` edges.
+	n = max(AVERAGE_DEGREE + 1, edges * 2 // AVERAGE_DEGREE)
+	if model == 'ba':
+		src, dst = barabasi_albert_edges(n, AVERAGE_DEGREE // 2, seed)
+	elif model == 'ws':
+		src, dst = watts_strogatz_edges(n, AVERAGE_DEGREE, 0.1, seed)
+	elif model == 'er':
+		src, dst = erdos_renyi_edges(n, AVERAGE_DEGREE / (n - 1), seed)
+	else:
+		raise ValueError(f'Unknown model: {model}')
+	return src, dst, n
+
+
+def edge_frame(src, dst, seed):
+	# Chat log style aggregated edge list: participants named P<id> and
+	# random message counts.
+	rng = np.random.default_rng(seed)
+	return pd.DataFrame({
+		'Inviter': np.char.add('P', src.astype(str)).astype(object),
+		'Invitee': np.char.add('P', dst.astype(str)).astype(object),
+		'MsgCount': rng.integers(1, 50, len(src)),
+	})
+
+
+def run_step(model, edges, step, seed, pivots, workers=None):
+	# Child process: build the benchmark graph and time one step on it.
+	# Returns the step's result record. Memory is measured over the
+	# timed step only (see _begin()): peak_rss_mb is the peak RSS while
+	# it ran and step_rss_mb how far that peak rose above the RSS the
+	# step started from (graph generation and CSR conversion excluded).
+	start, baseline = _begin()
+	src, dst, n = generate(model, edges, seed)
+	elapsed, peak = _end(start)
+	detail = ''
+	if step != 'generate':
+		df = edge_frame(src, dst, seed)
+		del src, dst
+		if step == 'build-graph':
+			start, baseline = _begin()
+			graph = CSRGraph.from_edges(df)
+			elapsed, peak = _end(start)
+		elif step == 'build-networkx':
+			start, baseline = _begin()
+			build_graph(df)
+			elapsed, peak = _end(start)
+			graph = None
+		else:
+			graph = CSRGraph.from_edges(df)
+			del df
+			membership = None
+			if step == 'modularity':
+				membership = louvain_membership(graph, seed)
+			start, baseline = _begin()
+			detail = _STEPS[step](graph, membership, seed, pivots, edges, workers)
+			elapsed, peak = _end(start)
+		if graph is not None:
+			n = graph.number_of_nodes()
+			edges = graph.number_of_edges()
+	if baseline is None or peak is None:
+		peak = None
+		step_rss = None
+	else:
+		step_rss = max(0, peak - baseline) / MB
+		peak = peak / MB
+	return {
+		'nodes': int(n),
+		'edges': int(edges),
+		'seconds': elapsed,
+		'peak_rss_mb': peak,
+		'step_rss_mb': step_rss,
+		'edges_per_sec': edges / max(elapsed, 1e-9),
+		'status': 'ok',
+		'detail': detail,
+	}
+
+
+def _begin():
+	# Start measuring a step: record the current RSS, reset the peak RSS
+	# to it and start the clock. The baseline is None where the peak
+	# cannot be reset (it would still include the setup).
+	baseline = rss_bytes()
+	if not reset_peak_rss():
+		baseline = None
+	return time.perf_counter(), baseline
+
+
+def _end(start):
+	# (seconds since start, peak RSS in bytes since _begin()).
+	return time.perf_counter() - start, peak_rss_bytes()
+
+
+def _degree(graph, membership, seed, pivots, edges, workers):
+	degree_centrality(graph)
+	strength_centrality(graph)
+	return ''
+
+
+def _eigenvector(graph, membership, seed, pivots, edges, workers):
+	eigenvector_centrality(graph, max_iter=1000)
+	return ''
+
+
+def _closeness(graph, membership, seed, pivots, edges, workers):
+	if edges <= STEP_LIMITS['closeness']:
+		closeness_centrality(graph, workers)
+		return 'exact'
+	_, bound = approximate_closeness(graph, pivots, workers, seed)
+	return f'{pivots} pivots, error bound {bound:.3f}'
+
+
+def _louvain(graph, membership, seed, pivots, edges, workers):
+	membership = louvain_membership(graph, seed)
+	return f'{membership.max() + 1} communities'
+
+
+def _modularity(graph, membership, seed, pivots, edges, workers):
+	return f'modularity {modularity(graph, membership):.4f}'
+
+
+def _cliques(graph, membership, seed, pivots, edges, workers):
+	count = sum(1 for _ in find_cliques(graph, min_size=2, workers=workers or 1))
+	return f'{count} cliques'
+
+
+def _layout(graph, membership, seed, pivots, edges, workers):
+	force_layout(graph, seed=seed)
+	return ''
+
+
+_STEPS = {
+	'degree': _degree,
+	'eigenvector': _eigenvector,
+	'closeness': _closeness,
+	'louvain': _louvain,
+	'modularity': _modularity,
+	'cliques': _cliques,
+	'layout': _layout,
+}
+
+
+def run_suite(models, sizes, steps, seed=42, pivots=64, timeout=600,
+		limits=None, verbose=True, workers=None):
+	# Run every step on every (model, size) graph, each in a fresh
+	# child process. Steps above their size limit are recorded as
+	# skipped, and steps that fail or exceed timeout (seconds) as
+	# errors. workers is the process pool size of the steps that use
+	# one (closeness: None = all cores, cliques: None = no pool).
+	# Returns the list of result records.
+	if limits is None:
+		limits = STEP_LIMITS
+	context = multiprocessing.get_context('spawn')
+	results = []
+	for model in models:
+		for edges in sizes:
+			for step in steps:
+				record = {'model': model, 'target_edges': edges, 'step': step}
+				if step in limits and step != 'closeness' and edges > limits[step]:
+					record.update(status='skipped', detail=f'over {limits[step]} edges')
+				else:
+					record.update(_run_child(
+						context, (model, edges, step, seed, pivots, workers),
+						timeout
+					))
+				results.append(record)
+				if verbose:
+					print(_row(record), flush=True)
+	return results
+
+
+def _run_child(context, args, timeout):
+	# Run run_step(*args) in a child process and wait up to timeout
+	# seconds for its record. Returns an error record if the step
+	# raised, timed out or the child died (e.g. killed when out of
+	# memory).
+	results = context.Queue()
+	process = context.Process(target=_step_worker, args=(results, args))
+	process.start()
+	deadline = time.monotonic() + timeout
+	try:
+		while True:
+			try:
+				status, value = results.get(timeout=1.0)
+				break
+			except queue.Empty:
+				if not process.is_alive():
+					try:
+						status, value = results.get(timeout=1.0)
+						break
+					except queue.Empty:
+						return {
+							'status': 'error',
+							'detail': f'exited with code {process.exitcode}',
+						}
+				if time.monotonic() > deadline:
+					return {'status': 'error', 'detail': f'timed out after {timeout}s'}
+	finally:
+		if process.is_alive():
+			process.terminate()
+		process.join()
+	if status == 'ok':
+		return value
+	return {'status': 'error', 'detail': value}
+
+
+def _step_worker(results, args):
+	# Child process entry point: send back ('ok', record) or
+	# ('error', exception repr).
+	try:
+		results.put(('ok', run_step(*args)))
+	except Exception as e:
+		results.put(('error', repr(e)))
+
+
+def compare(results, baseline, ratio=REGRESSION_RATIO):
+	# Match results against a baseline run by (model, size, step) and
+	# return (record, baseline seconds, slowdown) for every step that
+	# got slower by more than ratio.
+	previous = {
+		(r['model'], r['target_edges'], r['step']): r
+		for r in baseline['results'] if r['status'] == 'ok'
+	}
+	regressions = []
+	for record in results:
+		old = previous.get((record['model'], record['target_edges'], record['step']))
+		if old is None or record['status'] != 'ok':
+			continue
+		slowdown = record['seconds'] / max(old['seconds'], 1e-9)
+		if slowdown > ratio:
+			regressions.append((record, old['seconds'], slowdown))
+	return regressions
+
+
+def summary_table(results):
+	# Seconds per step (rows) and graph (columns), as a DataFrame.
+	table = pd.DataFrame([
+		{
+			'step': r['step'],
+			'graph': f'{r["model"]}-{r["target_edges"]:.0e}',
+			'seconds': r['seconds'] if r['status'] == 'ok' else np.nan,
+		}
+		for r in results
+	])
+	table = table.pivot(index='step', columns='graph', values='seconds')
+	return table.reindex([step for step in STEPS if step in table.index])
+
+
+def _row(record):
+	if record['status'] != 'ok':
+		return (
+			f'{record["model"]:>3} {record["target_edges"]:>9} '
+			f'{record["step"]:>14} {record["status"]:>9} {record["detail"]}'
+		)
+	rss = [
+		f'{value:>9.1f}' if value is not None else f'{"n/a":>9}'
+		for value in [record['peak_rss_mb'], record['step_rss_mb']]
+	]
+	return (
+		f'{record["model"]:>3} {record["edges"]:>9} {record["step"]:>14} '
+		f'{record["seconds"]:>9.3f} {rss[0]} {rss[1]} '
+		f'{record["edges_per_sec"]:>12,.0f} {record["detail"]}'
+	)
+
+
+def main():
+	parser = argparse.ArgumentParser(
+		description='Benchmark every analysis step on synthetic graphs.'
+	)
+	parser.add_argument('--models', nargs='+', choices=MODELS, default=MODELS)
+	parser.add_argument(
+		'--edges', type=int, nargs='+', default=[1000, 10000, 100000],
+		help='Approximate number of edges of each graph (up to 10^7).'
+	)
+	parser.add_argument('--steps', nargs='+', choices=STEPS, default=STEPS)
+	parser.add_argument('--seed', type=int, default=42)
+	parser.add_argument(
+		'--workers', type=int, default=None,
+		help='Process pool size for closeness (default: all cores) and '
+			'cliques (default: none).'
+	)
+	parser.add_argument(
+		'--pivots', type=int, default=64,
+		help='Pivots for sampled closeness on graphs above the exact limit.'
+	)
+	parser.add_argument(
+		'--timeout', type=float, default=600,
+		help='Seconds allowed per step before it is recorded as an error.'
+	)
+	parser.add_argument(
+		'--no-limits', action='store_true',
+		help='Run every step on every size (ignore STEP_LIMITS).'
+	)
+	parser.add_argument('--out', default='benchmark_results.json')
+	parser.add_argument(
+		'--compare', default=None,
+		help='Earlier results JSON to check for regressions.'
+	)
+	args = parser.parse_args()
+
+	print(
+		f'{"":>3} {"edges":>9} {"step":>14} {"seconds":>9} {"peak MB":>9} '
+		f'{"step MB":>9} {"edges/sec":>12} detail'
+	)
+	results = run_suite(
+		args.models, args.edges, args.steps, args.seed, args.pivots,
+		args.timeout, {} if args.no_limits else STEP_LIMITS,
+		workers=args.workers
+	)
+	with open(args.out, 'w') as f:
+		json.dump({
+			'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+			'python': platform.python_version(),
+			'platform': platform.platform(),
+			'cpus': os.cpu_count(),
+			'numpy': np.__version__,
+			'args': vars(args),
+			'results': results,
+		}, f, indent=4)
+
+	print()
+	with pd.option_context('display.width', 200, 'display.max_columns', None):
+		print(summary_table(results).to_string(float_format='{:.3f}'.format))
+	print(f'\nResults written to {args.out}')
+
+	if args.compare is not None:
+		with open(args.compare) as f:
+			baseline = json.load(f)
+		regressions = compare(results, baseline)
+		for record, before, slowdown in regressions:
+			print(
+				f'REGRESSION {record["model"]} {record["target_edges"]} '
+				f'{record["step"]}: {before:.3f}s -> {record["seconds"]:.3f}s '
+				f'({slowdown:.2f}x)'
+			)
+		if len(regressions) == 0:
+			print(f'No regressions against {args.compare}')
+		else:
+			exit(1)
+
+	# Exit the program.
+	exit(0)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,116 @@
+# centrality.py
+# Vectorized degree, weighted degree (strength) and eigenvector
+# centrality on a CSRGraph using scipy.sparse matrix-vector products.
+# Each measure is computed once per run and the top-k nodes are picked
+# with np.argpartition instead of sorting every node.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import os
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+
+def degree_centrality(graph):
+	# Fraction of the other nodes each node is connected to (same as
+	# nx.degree_centrality).
+	n = graph.number_of_nodes()
+	if n <= 1:
+		return np.ones(n)
+	return graph.degree() / (n - 1)
+
+
+def strength_centrality(graph):
+	# Weighted degree: total MsgCount exchanged by each node.
+	return graph.strength()
+
+
+def eigenvector_centrality(graph, weighted=False, tol=1e-6, max_iter=100,
+		start=None):
+	# Power iteration on (A + I), which is what nx.eigenvector_centrality
+	# does, so the results match networkx. Convergence is reached when
+	# the L1 change of the L2-normalized vector drops below n * tol.
+	# start can be the vector from a previous run (see warm_start()) to
+	# cut the number of iterations when the graph changed only a little.
+	n = graph.number_of_nodes()
+	if n == 0:
+		return np.zeros(0)
+	A = graph.to_scipy().astype(np.float64)
+	if not weighted:
+		A.data[:] = 1.0
+
+	if start is None:
+		x = np.ones(n)
+	else:
+		x = np.asarray(start, dtype=np.float64).copy()
+		if x.shape != (n,) or not np.any(x):
+			raise ValueError('start vector does not match the graph')
+	x /= np.linalg.norm(x)
+
+	for _ in range(max_iter):
+		last = x
+		x = last + A @ last
+		norm = np.linalg.norm(x)
+		if norm == 0:
+			return x
+		x /= norm
+		if np.abs(x - last).sum() < n * tol:
+			return x
+	raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def compute_centralities(graph, tol=1e-6, max_iter=100, start=None):
+	# Compute every centrality measure once and return them as a dict
+	# of per-node arrays (indexed by node ID).
+	return {
+		'degree': degree_centrality(graph),
+		'strength': strength_centrality(graph),
+		'eigenvector': eigenvector_centrality(
+			graph, tol=tol, max_iter=max_iter, start=start
+		),
+	}
+
+
+def top_k(values, k=10):
+	# Return the node IDs of the k largest values in descending order.
+	# np.argpartition selects them in O(n); only the k winners are
+	# sorted.
+	values = np.asarray(values)
+	k = min(k, len(values))
+	if k <= 0:
+		return np.zeros(0, dtype=np.int64)
+	ids = np.argpartition(-values, k - 1)[:k]
+	return ids[np.argsort(-values[ids], kind='stable')]
+
+
+def top_k_dict(graph, values, k=10):
+	# {node_name: value} for the k largest values, in descending order.
+	ids = top_k(values, k)
+	return dict(zip(graph.names[ids].tolist(), np.asarray(values)[ids].tolist()))
+
+
+def save_vector(path, graph, vector):
+	# Persist a centrality vector with its node names so that the next
+	# run can warm-start from it.
+	np.savez(path, names=graph.names.astype(str), vector=vector)
+
+
+def warm_start(path, graph):
+	# Load a vector written by save_vector() and align it to the node
+	# IDs of graph. Nodes that did not exist in the previous run get the
+	# mean of the known values. Returns None if there is no usable file.
+	if not os.path.exists(path):
+		return None
+	with np.load(path) as data:
+		names = data['names']
+		vector = data['vector']
+	# Names are stored as strings, so match on the string form.
+	ids = pd.Index(graph.names.astype(str)).get_indexer(names)
+	known = ids >= 0
+	if not np.any(known):
+		return None
+	start = np.full(graph.number_of_nodes(), vector[known].mean())
+	start[ids[known]] = vector[known]
+	return start
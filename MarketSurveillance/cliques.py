@@ -0,0 +1,271 @@
+# cliques.py
+# Streaming maximal-clique enumeration (Bron-Kerbosch with Tomita
+# pivoting) on a CSRGraph. Cliques are produced lazily by a stream
+# that records whether a clique or time cap cut the enumeration short,
+# the minimum and maximum clique size are used to prune the search itself,
+# and the work can be split into per-vertex subproblems (taken in
+# degeneracy order) that run in a process pool. Results can be streamed
+# straight to a JSONL or Parquet file.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import json
+import multiprocessing
+import time
+import numpy as np
+
+
+# Number of per-vertex subproblems handed to a worker at a time.
+CHUNK_SIZE = 256
+
+# State used by the worker processes (set by _init_worker).
+_WORKER = None
+
+
+class CliqueStream:
+	# The cliques of find_cliques(), enumerated lazily while iterating.
+	# Once the iteration is over, truncated tells whether max_cliques or
+	# time_limit stopped it before every clique was found (reason is
+	# then 'max_cliques' or 'time_limit'), so a partial result can be
+	# told apart from a complete one.
+	def __init__(self, enumerate_cliques):
+		self.truncated = False
+		self.reason = None
+		self._enumerate = enumerate_cliques
+
+
+	def __iter__(self):
+		self.truncated = False
+		self.reason = None
+		return self._enumerate(self)
+
+
+	def _stop(self, reason):
+		self.truncated = True
+		self.reason = reason
+
+
+def find_cliques(graph, min_size=1, max_size=None, degeneracy=True,
+		max_cliques=None, time_limit=None, workers=1):
+	# Every maximal clique (as a list of node names) whose size is
+	# between min_size and max_size (inclusive), as a CliqueStream.
+	# - Nodes outside the (min_size-1)-core can not be part of a clique
+	#   with min_size nodes and are dropped up front; a branch is cut as
+	#   soon as it can no longer reach min_size nodes or has grown past
+	#   max_size.
+	# - degeneracy=True processes vertices in degeneracy order, which
+	#   bounds every subproblem by the graph degeneracy.
+	# - max_cliques and time_limit (seconds) stop the enumeration early;
+	#   the stream's truncated flag is then set.
+	# - workers > 1 spreads the per-vertex subproblems over a process
+	#   pool; cliques are yielded as each chunk completes.
+	def enumerate_cliques(stream):
+		return _find_cliques(
+			stream, graph, min_size, max_size, degeneracy, max_cliques,
+			time_limit, workers
+		)
+
+	return CliqueStream(enumerate_cliques)
+
+
+def _find_cliques(stream, graph, min_size, max_size, degeneracy,
+		max_cliques, time_limit, workers):
+	if max_size is None:
+		max_size = graph.number_of_nodes()
+	if min_size > max_size:
+		return
+	deadline = None if time_limit is None else time.time() + time_limit
+
+	if degeneracy:
+		order, core = degeneracy_ordering(graph)
+	else:
+		order = np.arange(graph.number_of_nodes())
+		core = None
+	position = np.empty(len(order), dtype=np.int64)
+	position[order] = np.arange(len(order))
+
+	# Only vertices in the (min_size-1)-core can be in a large enough
+	# clique.
+	if min_size > 1:
+		if core is None:
+			_, core = degeneracy_ordering(graph)
+		order = order[core[order] >= min_size - 1]
+	keep = np.zeros(len(position), dtype=bool)
+	keep[order] = True
+
+	state = (
+		graph.indptr, graph.indices, position, keep, min_size, max_size,
+		deadline
+	)
+	if workers <= 1:
+		results = (_solve(state, v) for v in order.tolist())
+	else:
+		chunks = [
+			order[i:i + CHUNK_SIZE].tolist()
+			for i in range(0, len(order), CHUNK_SIZE)
+		]
+		pool = multiprocessing.Pool(
+			workers, initializer=_init_worker, initargs=(state,)
+		)
+		results = pool.imap_unordered(_solve_chunk, chunks)
+
+	# A subproblem cut by the deadline ends the enumeration. When
+	# max_cliques is reached, the stream is only truncated if there is
+	# another clique left.
+	count = 0
+	try:
+		for cliques, expired in results:
+			for clique in cliques:
+				if max_cliques is not None and count >= max_cliques:
+					stream._stop('max_cliques')
+					return
+				yield graph.names[clique].tolist()
+				count += 1
+			if expired:
+				stream._stop('time_limit')
+				return
+	finally:
+		if workers > 1:
+			pool.terminate()
+			pool.join()
+
+
+def degeneracy_ordering(graph):
+	# Batagelj-Zaversnik O(m) core decomposition. Returns the vertex
+	# order (repeatedly removing a vertex of minimum degree) and the
+	# core number of every vertex. Self-loops are ignored.
+	n = graph.number_of_nodes()
+	rows = graph.row_ids()
+	loops = rows == graph.indices
+	deg = (np.diff(graph.indptr) - np.bincount(rows[loops], minlength=n))
+	if n == 0:
+		return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+	# Bucket sort the vertices by degree.
+	counts = np.bincount(deg)
+	bin_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+	vert = np.argsort(deg, kind='stable')
+	pos = np.empty(n, dtype=np.int64)
+	pos[vert] = np.arange(n)
+
+	indptr = graph.indptr.tolist()
+	indices = graph.indices.tolist()
+	deg = deg.tolist()
+	vert = vert.tolist()
+	pos = pos.tolist()
+	bin_start = bin_start.tolist()
+	for i in range(n):
+		v = vert[i]
+		for u in indices[indptr[v]:indptr[v + 1]]:
+			if deg[u] > deg[v]:
+				# Move u to the front of its bucket and shrink its degree.
+				du = deg[u]
+				pu = pos[u]
+				pw = bin_start[du]
+				w = vert[pw]
+				if u != w:
+					pos[u] = pw
+					vert[pu] = w
+					pos[w] = pu
+					vert[pw] = u
+				bin_start[du] += 1
+				deg[u] -= 1
+	return np.asarray(vert, dtype=np.int64), np.asarray(deg, dtype=np.int64)
+
+
+def write_cliques(cliques, path, batch_size=100000):
+	# Stream cliques to a JSONL file (one JSON list per line) or to a
+	# Parquet file (a single list<string> column named "members"),
+	# without keeping them all in memory. Returns the number written.
+	count = 0
+	if path.endswith('.parquet') or path.endswith('.pq'):
+		import pyarrow as pa
+		import pyarrow.parquet as pq
+		schema = pa.schema([('members', pa.list_(pa.string()))])
+		with pq.ParquetWriter(path, schema) as writer:
+			batch = []
+			for clique in cliques:
+				batch.append([str(node) for node in clique])
+				if len(batch) == batch_size:
+					writer.write_table(pa.table({'members': batch}, schema=schema))
+					count += len(batch)
+					batch = []
+			if len(batch) > 0:
+				writer.write_table(pa.table({'members': batch}, schema=schema))
+				count += len(batch)
+		return count
+
+	with open(path, 'w') as f:
+		for clique in cliques:
+			f.write(json.dumps(clique, default=str) + '\n')
+			count += 1
+	return count
+
+
+def _solve(state, v):
+	# Enumerate the maximal cliques whose earliest vertex (in the
+	# processing order) is v. Returns a list of node ID lists and
+	# whether the deadline cut the search short.
+	indptr, indices, position, keep, min_size, max_size, deadline = state
+	if deadline is not None and time.time() > deadline:
+		return [], True
+	neighbors = indices[indptr[v]:indptr[v + 1]]
+	neighbors = neighbors[(neighbors != v) & keep[neighbors]]
+	if len(neighbors) + 1 < min_size:
+		return [], False
+
+	# Restrict the adjacency to N(v): every clique containing v lives
+	# there.
+	local = set(neighbors.tolist())
+	adj = {}
+	for u in local:
+		nbrs = indices[indptr[u]:indptr[u + 1]].tolist()
+		adj[u] = local.intersection(nbrs)
+		adj[u].discard(u)
+	later = position[neighbors] > position[v]
+	P = set(neighbors[later].tolist())
+	X = set(neighbors[~later].tolist())
+	cliques = []
+	expired = _expand([v], P, X, adj, min_size, max_size, deadline, cliques)
+	return cliques, expired
+
+
+def _expand(R, P, X, adj, min_size, max_size, deadline, out):
+	# Bron-Kerbosch with Tomita pivoting and size pruning. Returns True
+	# if the deadline passed (the search then unwinds at once).
+	if len(R) > max_size or len(R) + len(P) < min_size:
+		return False
+	if deadline is not None and time.time() > deadline:
+		return True
+	if len(P) == 0:
+		if len(X) == 0:
+			out.append(list(R))
+		return False
+	pivot = max(P | X, key=lambda u: len(P & adj[u]))
+	for v in list(P - adj[pivot]):
+		nbrs = adj[v]
+		R.append(v)
+		if _expand(R, P & nbrs, X & nbrs, adj, min_size, max_size, deadline, out):
+			return True
+		R.pop()
+		P.discard(v)
+		X.add(v)
+		if len(R) + len(P) < min_size:
+			return False
+	return False
+
+
+def _init_worker(state):
+	global _WORKER
+	_WORKER = state
+
+
+def _solve_chunk(vertices):
+	cliques = []
+	for v in vertices:
+		found, expired = _solve(_WORKER, v)
+		cliques.extend(found)
+		if expired:
+			return cliques, True
+	return cliques, False
@@ -0,0 +1,195 @@
+# closeness.py
+# Parallel exact and pivot-sampled closeness centrality on a CSRGraph.
+# The CSR index arrays (int32 when they fit, which is what
+# scipy.sparse.csgraph works on) are placed in shared memory once and
+# every worker process runs breadth-first searches from its share of
+# the source nodes directly on them. The edge weights are a single
+# broadcast 1.0 and the graph is already symmetric, so the searches run
+# in directed mode and scipy neither symmetrizes nor copies anything
+# per search. Nothing but the small per-batch results is pickled
+# between processes.
+# Python 3.8+ (multiprocessing.shared_memory)
+# Windows/MacOS/Linux
+
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+from csr_graph import index_arrays, share_arrays, attach_arrays
+from csr_graph import release_arrays
+
+
+# Upper bound on the size of the (sources x nodes) distance block that a
+# single BFS batch may allocate.
+BATCH_BYTES = 64 * 1024 * 1024
+
+# Adjacency matrix used by the batch functions. Set directly in the
+# parent process or attached from shared memory in each worker.
+_ADJACENCY = None
+
+
+def closeness_centrality(graph, workers=None):
+	# Exact closeness centrality, identical to nx.closeness_centrality
+	# (wf_improved=True): for a node reaching r nodes (itself included)
+	# with total distance d, the score is ((r-1)/d) * ((r-1)/(n-1)).
+	n = graph.number_of_nodes()
+	if n <= 1:
+		return np.zeros(n)
+	sources = np.arange(n)
+	results = _run(graph, _exact_batch, _batches(sources, n), workers)
+	totsp = np.zeros(n)
+	reached = np.zeros(n)
+	for ids, batch_totsp, batch_reached in results:
+		totsp[ids] = batch_totsp
+		reached[ids] = batch_reached
+	return _closeness(totsp, reached, n)
+
+
+def approximate_closeness(graph, pivots=64, workers=None, seed=None,
+		delta=0.05):
+	# Pivot-based (Eppstein-Wang) estimate of closeness centrality. In
+	# every connected component with more than `pivots` nodes, BFS is
+	# only run from `pivots` randomly chosen nodes and each node's
+	# average distance is estimated from its distances to them. Smaller
+	# components are computed exactly.
+	# Returns (closeness, error_bound): with probability >= 1 - delta,
+	# every node's estimated average distance to the rest of its
+	# component is within error_bound of the true value (Hoeffding
+	# bound, using twice the smallest pivot eccentricity as a bound on
+	# the component diameter).
+	n = graph.number_of_nodes()
+	if n <= 1:
+		return np.zeros(n), 0.0
+	# The CSR is symmetric, so its strongly connected components are
+	# the undirected components (and finding them needs no transpose).
+	_, labels = csgraph.connected_components(
+		_adjacency(*index_arrays(graph), n), directed=True, connection='strong'
+	)
+	sizes = np.bincount(labels)
+
+	# Pick up to `pivots` random nodes from every component.
+	rng = np.random.default_rng(seed)
+	order = rng.permutation(n)
+	order = order[np.argsort(labels[order], kind='stable')]
+	starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+	rank = np.arange(n) - starts[labels[order]]
+	chosen = order[rank < pivots]
+
+	results = _run(graph, _pivot_batch, _batches(chosen, n), workers)
+	sums = np.zeros(n)
+	ecc = np.full(len(sizes), np.inf)
+	for batch_sums, batch_ids, batch_ecc in results:
+		sums += batch_sums
+		np.minimum.at(ecc, labels[batch_ids], batch_ecc)
+
+	# Scale each node's pivot distance sum up to its whole component.
+	counts = np.minimum(sizes, pivots)[labels]
+	totsp = sums * sizes[labels] / counts
+	closeness = _closeness(totsp, sizes[labels].astype(float), n)
+
+	sampled = sizes > pivots
+	if not np.any(sampled):
+		return closeness, 0.0
+	bound = 2 * ecc[sampled] * np.sqrt(
+		np.log(2 * sizes[sampled] / delta) / (2 * pivots)
+	)
+	return closeness, float(bound.max())
+
+
+def _closeness(totsp, reached, n):
+	closeness = np.zeros(n)
+	ok = totsp > 0
+	r = reached[ok] - 1
+	closeness[ok] = (r / totsp[ok]) * (r / (n - 1))
+	return closeness
+
+
+def _batches(sources, n):
+	# Split the source nodes into batches whose distance block fits in
+	# BATCH_BYTES.
+	size = max(1, BATCH_BYTES // (8 * n))
+	return [sources[i:i + size] for i in range(0, len(sources), size)]
+
+
+def _distances(sources):
+	# Hop distances (np.inf where unreachable) from every source, one
+	# breadth-first search per source. The CSR holds both directions of
+	# every edge, so a directed search gives the undirected distances.
+	n = _ADJACENCY.shape[0]
+	nodes = np.arange(n)
+	dist = np.empty((len(sources), n))
+	for row, source in enumerate(sources.tolist()):
+		_, pred = csgraph.breadth_first_order(
+			_ADJACENCY, source, directed=True, return_predecessors=True
+		)
+		# Depth in the BFS tree by pointer jumping: every node adds the
+		# depth of its current ancestor and then skips to that
+		# ancestor's ancestor, so log2(depth) vectorized rounds suffice.
+		has_parent = pred >= 0
+		parent = np.where(has_parent, pred, nodes)
+		depth = has_parent.astype(np.int32)
+		while True:
+			grand = parent[parent]
+			if np.array_equal(grand, parent):
+				break
+			depth = depth + depth[parent]
+			parent = grand
+		dist[row] = depth
+		dist[row, ~has_parent] = np.inf
+		dist[row, source] = 0
+	return dist
+
+
+def _exact_batch(sources):
+	dist = _distances(sources)
+	finite = np.isfinite(dist)
+	totsp = np.where(finite, dist, 0).sum(axis=1)
+	return sources, totsp, finite.sum(axis=1)
+
+
+def _pivot_batch(sources):
+	dist = _distances(sources)
+	finite = np.isfinite(dist)
+	dist = np.where(finite, dist, 0)
+	return dist.sum(axis=0), sources, dist.max(axis=1)
+
+
+def _run(graph, func, batches, workers):
+	# Run func over every batch, either in this process or in a pool of
+	# workers sharing the adjacency through shared memory.
+	global _ADJACENCY
+	if workers is None:
+		workers = os.cpu_count() or 1
+	workers = min(workers, len(batches))
+	arrays = index_arrays(graph)
+	if workers <= 1:
+		_ADJACENCY = _adjacency(*arrays, graph.number_of_nodes())
+		try:
+			return [func(batch) for batch in batches]
+		finally:
+			_ADJACENCY = None
+
+	blocks, specs = share_arrays(arrays)
+	try:
+		with ProcessPoolExecutor(
+				max_workers=workers, initializer=_attach,
+				initargs=(specs, graph.number_of_nodes())) as pool:
+			return list(pool.map(func, batches))
+	finally:
+		release_arrays(blocks)
+
+
+def _attach(specs, n):
+	# Worker initializer: map the shared CSR arrays without copying.
+	global _ADJACENCY
+	_ADJACENCY = _adjacency(*attach_arrays(specs), n)
+
+
+def _adjacency(indptr, indices, n):
+	# Adjacency matrix over the given CSR arrays (no copy). Every
+	# weight is the same broadcast 1.0, so no weight array is
+	# allocated.
+	data = np.broadcast_to(1.0, indices.shape)
+	return sp.csr_matrix((data, indices, indptr), shape=(n, n), copy=False)
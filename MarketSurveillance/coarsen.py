@@ -0,0 +1,394 @@
+# coarsen.py
+# Small proxies of the surveillance graph for exploratory analysis:
+#   - coarsen(): collapses every Louvain community into a super-node.
+#     Edges between communities carry the summed MsgCount of the member
+#     edges (the community's internal MsgCount becomes a self-loop) and
+#     the mapping back to the members is kept, so per-community results
+#     can be expanded to participants and any community can be drilled
+#     into at full resolution (drill_down()).
+#   - random_walk_sample(), forest_fire_sample(), stratified_sample():
+#     node samplers (vectorized over walkers / the burning front / the
+#     communities). sample() builds the sample graph with node-edge
+#     sampling: every sampled node keeps all of its edges, and the
+#     edges that lead out of the sample are re-paired among the sampled
+#     nodes (within the community they led into), so each sampled node
+#     keeps its degree. The sample graph then has the degree
+#     distribution of the sampled nodes, which for stratified sampling
+#     is that of the whole graph, and centrality, clique and render
+#     passes can be tried on a graph of a chosen size.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import numpy as np
+import pandas as pd
+from csr_graph import CSRGraph
+
+
+# Probability that a random walker jumps back to its start node.
+RESTART_PROBABILITY = 0.15
+
+# Walkers that found no new node for this many steps restart elsewhere
+# (e.g. when they are stuck in a small component).
+STALL_STEPS = 100
+
+# Forest fire forward burning probability (each burning node ignites a
+# geometric number of neighbors with mean p / (1 - p)).
+BURN_PROBABILITY = 0.7
+
+# Rounds of re-pairing for the edge stubs of a sample graph that formed
+# a self-loop or a duplicate edge. Stubs still unpaired after the last
+# round are dropped.
+REPAIR_ROUNDS = 8
+
+
+class CommunityGraph:
+	def __init__(self, graph, membership):
+		# graph: the full CSRGraph.
+		# membership: community of every node ID (array), or a
+		# {node_name: community} partition.
+		if isinstance(membership, dict):
+			membership = [membership[name] for name in graph.names.tolist()]
+		self.fine = graph
+		self.membership = np.asarray(membership, dtype=np.int64)
+		size = int(self.membership.max()) + 1 if len(self.membership) > 0 else 0
+		self.sizes = np.bincount(self.membership, minlength=size)
+
+		# Members of each community, grouped by community (node IDs in
+		# increasing order within a community).
+		self.order = np.argsort(self.membership, kind='stable')
+		self.offsets = np.zeros(size + 1, dtype=np.int64)
+		self.offsets[1:] = np.cumsum(self.sizes)
+
+		# Community graph: duplicate community pairs are summed by
+		# CSRGraph.from_arrays().
+		src, dst, weights = graph.edge_arrays()
+		self.graph = CSRGraph.from_arrays(
+			self.membership[src], self.membership[dst], weights,
+			np.arange(size)
+		)
+
+
+	def number_of_communities(self):
+		return len(self.sizes)
+
+
+	def member_ids(self, community):
+		return self.order[self.offsets[community]:self.offsets[community + 1]]
+
+
+	def members(self, community):
+		# Names of the participants in a community.
+		return self.fine.names[self.member_ids(community)]
+
+
+	def community_of(self, name):
+		return int(self.membership[self.fine.node_id(name)])
+
+
+	def expand(self, values):
+		# Map a per-community array to a per-node array.
+		return np.asarray(values)[self.membership]
+
+
+	def drill_down(self, community):
+		# The community at full resolution (induced subgraph of its
+		# members, with their original names).
+		return induced_subgraph(self.fine, self.member_ids(community))
+
+
+	def community_edges(self):
+		# One row per pair of connected communities with the summed
+		# MsgCount between them (internal MsgCount is left out).
+		src, dst, weights = self.graph.edge_arrays()
+		off = src != dst
+		return pd.DataFrame({
+			'Community_A': src[off], 'Community_B': dst[off],
+			'MsgCount': weights[off],
+		})
+
+
+	def write_community_edges(self, path):
+		# Write community_edges() as a CSV. Returns the number of rows.
+		table = self.community_edges()
+		table.to_csv(path, index=False)
+		return len(table)
+
+
+	def save(self, path):
+		# Write the community graph with the node membership and the
+		# community sizes (CSRGraph.load() reads the community graph
+		# back).
+		self.graph.save(
+			path, membership=self.membership, sizes=self.sizes,
+			node_names=self.fine.names.astype(str)
+		)
+
+
+def coarsen(graph, membership):
+	# Collapse the communities of graph into super-nodes (see
+	# CommunityGraph).
+	return CommunityGraph(graph, membership)
+
+
+def induced_subgraph(graph, nodes):
+	# CSRGraph of the given node IDs and the edges between them. Node
+	# i of the result is nodes[i] after sorting.
+	nodes = np.unique(np.asarray(nodes, dtype=np.int64))
+	A = graph.to_scipy()[nodes][:, nodes].tocsr()
+	A.sort_indices()
+	return CSRGraph(A.indptr, A.indices, A.data, graph.names[nodes])
+
+
+def sample_graph(graph, nodes, membership=None, seed=None,
+		rounds=REPAIR_ROUNDS):
+	# Node-edge sample graph of the given node IDs (node i of the
+	# result is nodes[i] after sorting). Edges between sampled nodes are
+	# kept as they are. Every edge from a sampled node to a node outside
+	# the sample is a stub; stubs are paired at random among those that
+	# led into the same community (membership, or all stubs when it is
+	# None) and each pair becomes an edge with the mean MsgCount of the
+	# two. So a sampled node keeps its degree, unlike in the induced
+	# subgraph, where a node keeps only about size / n of its edges.
+	# Pairs that would form a self-loop or a duplicate edge are re-paired
+	# across communities for a few rounds, then dropped.
+	rng = np.random.default_rng(seed)
+	n = graph.number_of_nodes()
+	nodes = np.unique(np.asarray(nodes, dtype=np.int64))
+	size = len(nodes)
+	position = np.full(n, -1, dtype=np.int64)
+	position[nodes] = np.arange(size)
+	if membership is None:
+		membership = np.zeros(n, dtype=np.int64)
+	elif isinstance(membership, dict):
+		membership = [membership[name] for name in graph.names.tolist()]
+	membership = np.asarray(membership, dtype=np.int64)
+
+	rows = graph.row_ids()
+	keep = position[rows] >= 0
+	src = position[rows[keep]]
+	dst = position[graph.indices[keep]]
+	weights = graph.weights[keep]
+	inner = (dst >= 0) & (src <= dst)
+	stubs = np.flatnonzero(dst < 0)
+	stub_node = src[stubs]
+	stub_weight = weights[stubs]
+	keys = membership[graph.indices[keep][stubs]]
+
+	src = src[inner]
+	dst = dst[inner]
+	weights = weights[inner]
+	pending = np.arange(len(stubs))
+	for _ in range(rounds + 1):
+		if len(pending) < 2:
+			break
+		a, b, unpaired = _pair(keys, rng)
+		a = pending[a]
+		b = pending[b]
+		u = stub_node[a]
+		v = stub_node[b]
+		pair_keys = np.concatenate([
+			np.minimum(src, dst) * size + np.maximum(src, dst),
+			np.minimum(u, v) * size + np.maximum(u, v),
+		])
+		first = np.zeros(len(pair_keys), dtype=bool)
+		first[np.unique(pair_keys, return_index=True)[1]] = True
+		ok = first[len(src):] & (u != v)
+		src = np.concatenate([src, u[ok]])
+		dst = np.concatenate([dst, v[ok]])
+		weights = np.concatenate([
+			weights, (stub_weight[a[ok]] + stub_weight[b[ok]]) / 2
+		])
+		pending = np.concatenate([pending[unpaired], a[~ok], b[~ok]])
+		keys = np.zeros(len(pending), dtype=np.int64)
+	return CSRGraph.from_arrays(src, dst, weights, graph.names[nodes])
+
+
+def random_walk_sample(graph, size, seed=None, walkers=16,
+		restart=RESTART_PROBABILITY):
+	# Node IDs (sorted) visited by Metropolis-Hastings random walks with
+	# restart, advanced together one step at a time, until size distinct
+	# nodes were seen. Walkers on isolated nodes jump to a random node.
+	n = graph.number_of_nodes()
+	size = min(size, n)
+	rng = np.random.default_rng(seed)
+	if size == 0 or len(graph.indices) == 0:
+		return np.sort(rng.choice(n, size, replace=False))
+	deg = np.diff(graph.indptr)
+	start = rng.integers(0, n, walkers)
+	pos = start.copy()
+	visited = np.zeros(n, dtype=bool)
+	found = [np.unique(pos)]
+	visited[pos] = True
+	count = len(found[0])
+	stalled = 0
+	while count < size:
+		d = deg[pos]
+		step = graph.indptr[pos] + (rng.random(walkers) * d).astype(np.int64)
+		nxt = graph.indices[np.minimum(step, len(graph.indices) - 1)]
+		# Metropolis-Hastings step: a move to a neighbor of higher
+		# degree is only accepted with probability deg(u) / deg(v), so
+		# the walk does not drift towards the hubs.
+		nxt = np.where(rng.random(walkers) * deg[nxt] < d, nxt, pos)
+		nxt = np.where(d == 0, rng.integers(0, n, walkers), nxt)
+		nxt = np.where(rng.random(walkers) < restart, start, nxt)
+		new = np.unique(nxt[~visited[nxt]])
+		if len(new) > 0:
+			visited[new] = True
+			found.append(new)
+			count += len(new)
+			stalled = 0
+		else:
+			stalled += 1
+			if stalled >= STALL_STEPS:
+				start = rng.integers(0, n, walkers)
+				nxt = start.copy()
+				stalled = 0
+		pos = nxt
+	return np.sort(np.concatenate(found)[:size])
+
+
+def forest_fire_sample(graph, size, seed=None, p=BURN_PROBABILITY):
+	# Node IDs (sorted) burned by forest fires: starting from a random
+	# node, every burning node ignites a geometric number of its
+	# unburned neighbors (mean p / (1 - p)), one front at a time. When
+	# a fire dies out, a new one starts at a random unburned node. Like
+	# any exploration sample it leans towards high-degree nodes (they
+	# are reached from more neighbors).
+	n = graph.number_of_nodes()
+	size = min(size, n)
+	rng = np.random.default_rng(seed)
+	visited = np.zeros(n, dtype=bool)
+	found = []
+	count = 0
+	while count < size:
+		front = np.asarray([rng.choice(np.flatnonzero(~visited))])
+		visited[front] = True
+		found.append(front)
+		count += 1
+		while len(front) > 0 and count < size:
+			neighbors, owners = graph.neighbors_of(front)
+			keep = ~visited[neighbors]
+			neighbors = neighbors[keep]
+			owners = owners[keep]
+
+			# Ignite the first burn[owner] unburned neighbors of every
+			# burning node, in random order.
+			burn = rng.geometric(1 - p, len(front)) - 1
+			order = np.lexsort((rng.random(len(neighbors)), owners))
+			neighbors = neighbors[order]
+			owners = owners[order]
+			rank = np.arange(len(owners)) - np.searchsorted(owners, owners)
+			front = np.unique(neighbors[rank < burn[owners]])
+			front = rng.permutation(front)[:size - count]
+			visited[front] = True
+			found.append(front)
+			count += len(front)
+	return np.sort(np.concatenate(found))
+
+
+def stratified_sample(graph, membership, size, seed=None):
+	# Node IDs (sorted) sampled per community: each community gets a
+	# share of size proportional to its number of members (largest
+	# remainder rounding, so communities too small for a share can get
+	# none), taken systematically from its members ordered by degree,
+	# so both the community sizes and the degree distribution within
+	# every community are kept.
+	if isinstance(membership, dict):
+		membership = [membership[name] for name in graph.names.tolist()]
+	membership = np.asarray(membership, dtype=np.int64)
+	n = graph.number_of_nodes()
+	size = min(size, n)
+	rng = np.random.default_rng(seed)
+	if size == 0:
+		return np.zeros(0, dtype=np.int64)
+	counts = np.bincount(membership)
+	raw = counts * size / n
+	quota = np.floor(raw).astype(np.int64)
+	extra = size - quota.sum()
+	if extra > 0:
+		quota[np.argsort(quota - raw, kind='stable')[:extra]] += 1
+
+	# Members grouped by community and sorted by degree (random order
+	# among equal degrees); community c takes the positions
+	# (i + u) * count / quota, i < quota, for one random offset u.
+	order = np.lexsort((rng.random(n), graph.degree(), membership))
+	starts = np.zeros(len(counts), dtype=np.int64)
+	starts[1:] = np.cumsum(counts)[:-1]
+	community = np.repeat(np.arange(len(counts)), quota)
+	i = np.arange(len(community)) - np.repeat(np.cumsum(quota) - quota, quota)
+	offset = rng.random(len(counts))
+	positions = starts[community] + np.floor(
+		(i + offset[community]) * counts[community] / quota[community]
+	).astype(np.int64)
+	return np.sort(order[positions])
+
+
+SAMPLERS = {
+	'random-walk': random_walk_sample,
+	'forest-fire': forest_fire_sample,
+	'stratified': stratified_sample,
+}
+
+# Options each sampler accepts through sample().
+SAMPLER_OPTIONS = {
+	'random-walk': ['walkers', 'restart'],
+	'forest-fire': ['p'],
+	'stratified': [],
+}
+
+
+def sample(graph, method, size, seed=None, membership=None, **options):
+	# Sample graph (see sample_graph()) of size nodes picked by one of
+	# the SAMPLERS (stratified sampling needs the community membership,
+	# which the other samplers only use to re-pair the edge stubs).
+	# options are passed to the sampler (see SAMPLER_OPTIONS).
+	if method not in SAMPLERS:
+		raise ValueError(f'Unknown sampler: {method}')
+	unknown = sorted(set(options) - set(SAMPLER_OPTIONS[method]))
+	if len(unknown) > 0:
+		raise ValueError(
+			f'Unknown option(s) for the {method} sampler: {", ".join(unknown)} '
+			f'(accepted: {", ".join(SAMPLER_OPTIONS[method]) or "none"})'
+		)
+	if method == 'stratified':
+		if membership is None:
+			raise ValueError('Stratified sampling needs a membership.')
+		nodes = stratified_sample(graph, membership, size, seed)
+	else:
+		nodes = SAMPLERS[method](graph, size, seed, **options)
+	return sample_graph(graph, nodes, membership, seed)
+
+
+def degree_distance(graph, sampled):
+	# Kolmogorov-Smirnov distance between the degree distributions of
+	# two graphs (0 when they are the same, 1 when they do not overlap).
+	a = np.sort(graph.degree())
+	b = np.sort(sampled.degree())
+	if len(a) == 0 or len(b) == 0:
+		return 0.0
+	values = np.union1d(a, b)
+	cdf_a = np.searchsorted(a, values, side='right') / len(a)
+	cdf_b = np.searchsorted(b, values, side='right') / len(b)
+	return float(np.abs(cdf_a - cdf_b).max())
+
+
+def _pair(keys, rng):
+	# Pair up positions with equal keys, in random order. Returns the
+	# first and second position of every pair and the positions left
+	# unpaired (one per key with an odd count).
+	order = np.lexsort((rng.random(len(keys)), keys))
+	keys = keys[order]
+	count = len(keys)
+	starts = np.ones(count, dtype=bool)
+	starts[1:] = keys[1:] != keys[:-1]
+	rank = np.arange(count) - np.maximum.accumulate(
+		np.where(starts, np.arange(count), 0)
+	)
+	heads = np.zeros(count, dtype=bool)
+	heads[:-1] = (rank[:-1] % 2 == 0) & ~starts[1:]
+	first = np.flatnonzero(heads)
+	paired = np.zeros(count, dtype=bool)
+	paired[first] = True
+	paired[first + 1] = True
+	return order[first], order[first + 1], order[~paired]
@@ -0,0 +1,292 @@
+# csr_graph.py
+# Compact compressed-sparse-row (CSR) representation of the undirected
+# surveillance graph. Nodes are integer IDs (0..n-1) with a name<->id
+# index, and the MsgCount weights are kept in a float32 array. Each
+# edge is stored in both directions (self-loops once), which costs ~8
+# bytes per direction instead of the hundreds of bytes per edge used by
+# the networkx dict-of-dicts.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+import scipy.sparse as sp
+
+
+class CSRGraph:
+	def __init__(self, indptr, indices, weights, names):
+		# indptr: int64 array of length n+1, row offsets into indices.
+		# indices: int32 array with the neighbor ID of every entry.
+		# weights: float32 array with the weight of every entry.
+		# names: array of node names (position = node ID).
+		self.indptr = np.asarray(indptr, dtype=np.int64)
+		self.indices = np.asarray(indices, dtype=np.int32)
+		self.weights = np.asarray(weights, dtype=np.float32)
+		self.names = np.asarray(names, dtype=object)
+		self.index = pd.Index(self.names)
+
+
+	@classmethod
+	def from_arrays(cls, src, dst, weights, names):
+		# Build the graph from parallel arrays of integer node IDs and
+		# weights. Each undirected edge only needs to be given once;
+		# duplicate pairs are summed.
+		n = len(names)
+		src = np.asarray(src, dtype=np.int64)
+		dst = np.asarray(dst, dtype=np.int64)
+		weights = np.asarray(weights, dtype=np.float32)
+
+		# Mirror every non self-loop edge so that the matrix is
+		# symmetric. Self-loops are kept once on the diagonal.
+		off = src != dst
+		rows = np.concatenate([src, dst[off]])
+		cols = np.concatenate([dst, src[off]])
+		vals = np.concatenate([weights, weights[off]])
+		matrix = sp.csr_matrix((vals, (rows, cols)), shape=(n, n))
+		matrix.sum_duplicates()
+		matrix.sort_indices()
+		return cls(matrix.indptr, matrix.indices, matrix.data, names)
+
+
+	@classmethod
+	def from_edges(cls, edges, source='Inviter', target='Invitee',
+			weight='MsgCount'):
+		# Build the graph from an edge list dataframe, such as the one
+		# returned by ingest.ingest_edges().
+		codes, names = pd.factorize(
+			pd.concat([edges[source], edges[target]], ignore_index=True)
+		)
+		m = len(edges)
+		if weight is None or weight not in edges:
+			weights = np.ones(m, dtype=np.float32)
+		else:
+			weights = edges[weight].to_numpy(dtype=np.float32)
+		return cls.from_arrays(
+			codes[:m], codes[m:], weights, np.asarray(names, dtype=object)
+		)
+
+
+	@classmethod
+	def from_networkx(cls, G, weight='MsgCount'):
+		# Convert a networkx graph. Missing weights default to 1.
+		names = np.asarray(list(G.nodes()), dtype=object)
+		index = {name: i for i, name in enumerate(names)}
+		m = G.number_of_edges()
+		src = np.empty(m, dtype=np.int64)
+		dst = np.empty(m, dtype=np.int64)
+		weights = np.empty(m, dtype=np.float32)
+		for i, (u, v, w) in enumerate(G.edges(data=weight, default=1)):
+			src[i] = index[u]
+			dst[i] = index[v]
+			weights[i] = w
+		return cls.from_arrays(src, dst, weights, names)
+
+
+	def to_networkx(self, weight='MsgCount'):
+		# Convert back to an undirected networkx graph.
+		G = nx.Graph()
+		G.add_nodes_from(self.names.tolist())
+		src, dst, weights = self.edge_arrays()
+		G.add_weighted_edges_from(
+			zip(
+				self.names[src].tolist(), self.names[dst].tolist(),
+				weights.tolist()
+			),
+			weight=weight
+		)
+		return G
+
+
+	def save(self, path, **extra):
+		# Write the CSR arrays and node names (as strings) to an .npz
+		# file, along with any extra named arrays.
+		np.savez(
+			path, indptr=self.indptr, indices=self.indices,
+			weights=self.weights, names=self.names.astype(str), **extra
+		)
+
+
+	@classmethod
+	def load(cls, path):
+		with np.load(path) as data:
+			return cls(
+				data['indptr'], data['indices'], data['weights'],
+				data['names'].astype(object)
+			)
+
+
+	def to_scipy(self):
+		# Return the symmetric weighted adjacency matrix (a view over
+		# the CSR arrays, no copy).
+		n = self.number_of_nodes()
+		return sp.csr_matrix(
+			(self.weights, self.indices, self.indptr), shape=(n, n)
+		)
+
+
+	def edge_arrays(self):
+		# Return (src, dst, weights) with each undirected edge once
+		# (src <= dst).
+		src = self.row_ids()
+		keep = src <= self.indices
+		return src[keep], self.indices[keep], self.weights[keep]
+
+
+	def row_ids(self):
+		# Return the source node ID of every CSR entry.
+		return np.repeat(
+			np.arange(self.number_of_nodes(), dtype=np.int32),
+			np.diff(self.indptr)
+		)
+
+
+	def number_of_nodes(self):
+		return len(self.indptr) - 1
+
+
+	def number_of_edges(self):
+		# Each undirected edge is stored twice, except self-loops.
+		loops = int(np.count_nonzero(self.row_ids() == self.indices))
+		return (len(self.indices) - loops) // 2 + loops
+
+
+	def nbytes(self):
+		# Memory held by the numeric arrays (node names excluded).
+		return self.indptr.nbytes + self.indices.nbytes + self.weights.nbytes
+
+
+	def neighbors(self, node_id):
+		return self.indices[self.indptr[node_id]:self.indptr[node_id + 1]]
+
+
+	def neighbors_of(self, nodes):
+		# See neighbors_of() below.
+		return neighbors_of(self.indptr, self.indices, nodes)
+
+
+	def expand(self, nodes, hops, max_nodes=None):
+		# See expand() below.
+		return expand(self.indptr, self.indices, nodes, hops, max_nodes)
+
+
+	def degree(self):
+		# Number of incident edges per node (self-loops count twice,
+		# as in networkx).
+		deg = np.diff(self.indptr)
+		loops = self.row_ids() == self.indices
+		return deg + np.bincount(
+			self.indices[loops], minlength=self.number_of_nodes()
+		)
+
+
+	def strength(self):
+		# Weighted degree (sum of MsgCount per node, self-loops twice).
+		rows = self.row_ids()
+		loops = rows == self.indices
+		strength = np.bincount(
+			rows, weights=self.weights, minlength=self.number_of_nodes()
+		)
+		return strength + np.bincount(
+			rows[loops], weights=self.weights[loops],
+			minlength=self.number_of_nodes()
+		)
+
+
+	def node_id(self, name):
+		return self.index.get_loc(name)
+
+
+	def node_ids(self, names):
+		# Vectorized name -> ID lookup (-1 for unknown names).
+		return self.index.get_indexer(names)
+
+
+	def to_dict(self, values):
+		# Map a per-node array back to a {node_name: value} dict.
+		return dict(zip(self.names.tolist(), np.asarray(values).tolist()))
+
+
+def neighbors_of(indptr, indices, nodes):
+	# All neighbors of the given node IDs (with repeats), and the
+	# position in nodes of the node each one belongs to. Only the CSR
+	# rows of those nodes are read.
+	nodes = np.asarray(nodes, dtype=np.int64)
+	starts = indptr[nodes].astype(np.int64)
+	lengths = indptr[nodes + 1] - starts
+	offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+	neighbors = indices[offsets + np.arange(lengths.sum())]
+	owners = np.repeat(np.arange(len(nodes)), lengths)
+	return neighbors.astype(np.int64), owners
+
+
+def expand(indptr, indices, nodes, hops, max_nodes=None):
+	# Sorted IDs of the given nodes plus every node within `hops` steps
+	# of them, or None once more than max_nodes nodes are reached. Each
+	# hop only reads the CSR rows of the current frontier, so the cost
+	# follows the size of the neighborhood, not of the graph.
+	result = np.unique(np.asarray(nodes, dtype=np.int64))
+	frontier = result
+	for _ in range(hops):
+		if len(frontier) == 0:
+			break
+		neighbors, _ = neighbors_of(indptr, indices, frontier)
+		frontier = np.setdiff1d(neighbors, result)
+		result = np.union1d(result, frontier)
+		if max_nodes is not None and len(result) > max_nodes:
+			return None
+	return result
+
+
+def index_arrays(graph):
+	# (indptr, indices) in the dtype scipy.sparse uses without copying:
+	# int32 when the number of entries fits (scipy would otherwise make
+	# its own int32 copy of indptr), else int64.
+	indptr = graph.indptr
+	if len(graph.indices) < np.iinfo(np.int32).max:
+		indptr = indptr.astype(np.int32)
+	return indptr, graph.indices.astype(indptr.dtype, copy=False)
+
+
+def share_arrays(arrays):
+	# Copy arrays into new shared memory blocks (Python 3.8+), e.g. to
+	# hand the CSR arrays to a process pool without pickling them into
+	# every worker. Returns (blocks, specs): specs are passed to
+	# attach_arrays() in the workers, and the blocks must be released
+	# with release_arrays() once the workers are done.
+	from multiprocessing import shared_memory
+	blocks = []
+	specs = []
+	try:
+		for array in arrays:
+			block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+			blocks.append(block)
+			np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+			specs.append((block.name, array.shape, array.dtype.str))
+	except BaseException:
+		release_arrays(blocks)
+		raise
+	return blocks, specs
+
+
+def attach_arrays(specs):
+	# Map the arrays placed with share_arrays() (no copy). The blocks
+	# stay open for the life of the process.
+	from multiprocessing import shared_memory
+	arrays = []
+	for name, shape, dtype in specs:
+		block = shared_memory.SharedMemory(name=name)
+		_ATTACHED.append(block)
+		arrays.append(np.ndarray(shape, np.dtype(dtype), buffer=block.buf))
+	return arrays
+
+
+def release_arrays(blocks):
+	for block in blocks:
+		block.close()
+		block.unlink()
+
+
+# Shared memory blocks mapped by attach_arrays() in this process.
+_ATTACHED = []
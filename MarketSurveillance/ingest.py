@@ -0,0 +1,171 @@
+# ingest.py
+# Stream chat logs (Inviter/Invitee/MsgCount) from CSV, Parquet or XLSX
+# files in bounded-size chunks and merge them into a single weighted
+# edge list, summing MsgCount for duplicate participant pairs.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import os
+import time
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+
+# Default column names used by the Bloomberg chat export.
+SOURCE_COL = 'Inviter'
+TARGET_COL = 'Invitee'
+WEIGHT_COL = 'MsgCount'
+
+# Default number of rows read from the input file at a time.
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+def iter_chunks(path, chunksize=DEFAULT_CHUNKSIZE, source=SOURCE_COL,
+		target=TARGET_COL, weight=WEIGHT_COL):
+	# Yield the edge columns of the input file as a sequence of pandas
+	# dataframes with at most chunksize rows each. The reader used
+	# depends on the file extension (.csv/.csv.gz, .parquet/.pq,
+	# .xlsx). Only the three edge columns are ever materialized.
+	columns = [source, target, weight]
+	name = path.lower()
+	if name.endswith('.csv') or name.endswith('.csv.gz'):
+		reader = pd.read_csv(path, usecols=columns, chunksize=chunksize)
+		for chunk in reader:
+			yield chunk[columns]
+	elif name.endswith('.parquet') or name.endswith('.pq'):
+		import pyarrow.parquet as pq
+		parquet_file = pq.ParquetFile(path)
+		for batch in parquet_file.iter_batches(
+				batch_size=chunksize, columns=columns):
+			yield batch.to_pandas()[columns]
+	elif name.endswith('.xlsx'):
+		# Use the openpyxl read-only (streaming) mode so that the whole
+		# workbook is never loaded into memory.
+		from openpyxl import load_workbook
+		workbook = load_workbook(path, read_only=True, data_only=True)
+		try:
+			rows = workbook.active.iter_rows(values_only=True)
+			header = list(next(rows))
+			index = [header.index(col) for col in columns]
+			buffer = []
+			for row in rows:
+				buffer.append([row[i] for i in index])
+				if len(buffer) == chunksize:
+					yield pd.DataFrame(buffer, columns=columns)
+					buffer = []
+			if len(buffer) > 0:
+				yield pd.DataFrame(buffer, columns=columns)
+		finally:
+			workbook.close()
+	else:
+		raise ValueError(
+			f'Unsupported file type for chat log: {os.path.basename(path)}'
+		)
+
+
+def aggregate_edges(df, source=SOURCE_COL, target=TARGET_COL,
+		weight=WEIGHT_COL):
+	# Collapse a dataframe of edges into one row per undirected
+	# participant pair, summing the weights. Each pair is stored in a
+	# canonical order (by the string form of the participants, so the
+	# order is the same whatever dtype a chunk was read with) so that
+	# A->B and B->A are merged, matching the undirected nx.Graph built
+	# from it. Participants keep their original values and dtype; rows
+	# with a missing source or target are dropped.
+	df = df.dropna(subset=[source, target])
+	src = _participants(df[source])
+	dst = _participants(df[target])
+	swap = df[source].astype(str).to_numpy() > df[target].astype(str).to_numpy()
+	pairs = pd.DataFrame({
+		source: np.where(swap, dst, src),
+		target: np.where(swap, src, dst),
+		weight: pd.to_numeric(df[weight]).fillna(0).to_numpy(),
+	})
+	return pairs.groupby([source, target], sort=False, as_index=False)[weight].sum()
+
+
+def ingest_edges(path, chunksize=DEFAULT_CHUNKSIZE, source=SOURCE_COL,
+		target=TARGET_COL, weight=WEIGHT_COL, verbose=True):
+	# Read the chat log chunk by chunk and return the aggregated edge
+	# list as a dataframe (one row per participant pair). Memory is
+	# bounded by the chunk size plus the number of distinct pairs, not
+	# by the number of rows in the file. Per-chunk rows/sec (reading
+	# and aggregating the chunk) is printed when verbose is set.
+	# Per-chunk aggregates are buffered and only compacted into the
+	# running total once they outgrow it, which keeps the merge cost
+	# amortized.
+	merged = None
+	pending = []
+	pending_rows = 0
+	total_rows = 0
+	start = time.perf_counter()
+	chunks = iter_chunks(path, chunksize, source, target, weight)
+	i = 0
+	while True:
+		chunk_start = time.perf_counter()
+		chunk = next(chunks, None)
+		if chunk is None:
+			break
+		partial = aggregate_edges(chunk, source, target, weight)
+		pending.append(partial)
+		pending_rows += len(partial)
+		if merged is None or pending_rows >= len(merged):
+			frames = pending if merged is None else [merged] + pending
+			merged = _compact(frames, source, target, weight)
+			pending = []
+			pending_rows = 0
+		elapsed = time.perf_counter() - chunk_start
+		total_rows += len(chunk)
+		if verbose:
+			print(
+				f'Ingested chunk {i}: {len(chunk)} rows in {elapsed:.3f}s '
+				f'({len(chunk) / max(elapsed, 1e-9):,.0f} rows/sec)'
+			)
+		i += 1
+
+	if merged is None:
+		return pd.DataFrame(
+			{source: pd.Series(dtype=str), target: pd.Series(dtype=str),
+				weight: pd.Series(dtype=float)}
+		)
+	if len(pending) > 0:
+		merged = _compact([merged] + pending, source, target, weight)
+
+	if verbose:
+		elapsed = time.perf_counter() - start
+		print(
+			f'Ingested {total_rows} rows into {len(merged)} edges in '
+			f'{elapsed:.3f}s ({total_rows / max(elapsed, 1e-9):,.0f} rows/sec)'
+		)
+	return merged
+
+
+def _participants(column):
+	# Participant IDs as an array. Integer IDs that were read as floats
+	# only because the column had missing values become integers again.
+	values = column.to_numpy()
+	if values.dtype.kind == 'f' and np.all(np.mod(values, 1) == 0):
+		return values.astype(np.int64)
+	return values
+
+
+def _compact(frames, source, target, weight):
+	# Merge several already-aggregated edge frames into one.
+	combined = pd.concat(frames, ignore_index=True)
+	return combined.groupby([source, target], sort=False, as_index=False)[weight].sum()
+
+
+def build_graph(edges, source=SOURCE_COL, target=TARGET_COL,
+		weight=WEIGHT_COL):
+	# Build the undirected networkx graph from an aggregated edge list
+	# in a single bulk call (no per-row Python loop).
+	return nx.from_pandas_edgelist(edges, source, target, weight)
+
+
+def ingest_graph(path, chunksize=DEFAULT_CHUNKSIZE, source=SOURCE_COL,
+		target=TARGET_COL, weight=WEIGHT_COL, verbose=True):
+	# Convenience wrapper: stream the chat log and return the graph.
+	edges = ingest_edges(path, chunksize, source, target, weight, verbose)
+	return build_graph(edges, source, target, weight)
@@ -0,0 +1,361 @@
+# louvain.py
+# Louvain community detection and modularity computed directly on a
+# CSRGraph (see csr_graph.py), without converting to networkx.
+# Follows the same multi-level scheme as community.best_partition:
+# local node moves until modularity stops improving, then aggregate
+# each community into a single node and repeat.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from csr_graph import CSRGraph
+
+
+# Minimum modularity increase for a pass to count as an improvement
+# (same default as python-louvain).
+MIN_GAIN = 1e-7
+
+
+def adjacency(graph):
+	# Symmetric adjacency matrix in the convention used here: the
+	# diagonal holds twice the self-loop weight, so that row sums equal
+	# the weighted degree and the matrix sums to 2m.
+	A = graph.to_scipy().astype(np.float64)
+	diag = A.diagonal()
+	if np.any(diag != 0):
+		A = (A + sp.diags(diag)).tocsr()
+	return A
+
+
+def modularity(graph, partition):
+	# Modularity of a partition, given either as a per-node community
+	# array or as a {node_name: community} dict. Matches
+	# community.modularity(partition, G, weight='MsgCount').
+	if isinstance(partition, dict):
+		membership = np.asarray(
+			[partition[name] for name in graph.names.tolist()]
+		)
+	else:
+		membership = np.asarray(partition)
+	return _modularity(adjacency(graph), _renumber(membership))
+
+
+def best_partition(graph, seed=None, min_gain=MIN_GAIN):
+	# Equivalent of community.best_partition() for a CSRGraph. Returns
+	# a {node_name: community} dict.
+	return graph.to_dict(louvain_membership(graph, seed, min_gain))
+
+
+def community_members(partition):
+	# Turn a {node: community} partition into a dictionary like
+	# {community_number: 'member | member | ...'}.
+	dict_nodes = {}
+	for community_node, community_num in partition.items():
+		if community_num in dict_nodes:
+			dict_nodes[community_num] += ' | ' + str(community_node)
+		else:
+			dict_nodes[community_num] = str(community_node)
+	return dict_nodes
+
+
+def write_community_list(partition, path):
+	# Write the partition as a Community_Num/Members CSV (the format of
+	# Community_List_snippet.csv). Returns the {community: members}
+	# dictionary.
+	dict_nodes = community_members(partition)
+	community_df = pd.DataFrame.from_dict(
+		dict_nodes, orient='index', columns=['Members']
+	)
+	community_df.index.rename('Community_Num', inplace=True)
+	community_df.to_csv(path)
+	return dict_nodes
+
+
+def louvain_membership(graph, seed=None, min_gain=MIN_GAIN):
+	# Run Louvain and return the community of each node ID as an array.
+	A = adjacency(graph)
+	rng = np.random.default_rng(seed)
+	membership = np.arange(A.shape[0])
+	if A.sum() == 0:
+		return membership
+
+	while True:
+		comm, improved = one_level(A, np.arange(A.shape[0]), rng, min_gain)
+		comm = _renumber(comm)
+		membership = comm[membership]
+		if not improved:
+			break
+		A = aggregate(A, comm)
+	return membership
+
+
+def one_level(A, comm, rng=None, min_gain=MIN_GAIN, nodes=None):
+	# Run local moving passes over the given nodes (all nodes by
+	# default) starting from the community assignment comm. Returns the
+	# new assignment and whether modularity improved.
+	n = A.shape[0]
+	m2 = A.sum()
+	k = np.asarray(A.sum(axis=1)).ravel()
+	comm = np.asarray(comm)
+	tot = np.bincount(comm, weights=k, minlength=n).tolist()
+	inside = _inside_weights(A, comm, n).tolist()
+	k_list = k.tolist()
+	comm_list = comm.tolist()
+	if nodes is None:
+		nodes = np.arange(n)
+	nodes = np.asarray(nodes)
+
+	current = _quality(inside, tot, m2)
+	improved = False
+	while True:
+		order = nodes if rng is None else rng.permutation(nodes)
+		moved = move_nodes(A, order, comm_list, tot, inside, k_list, m2)
+		if moved == 0:
+			break
+		improved = True
+		new = _quality(inside, tot, m2)
+		if new - current < min_gain:
+			break
+		current = new
+	return np.asarray(comm_list), improved
+
+
+def move_nodes(A, order, comm, tot, inside, k, m2):
+	# One pass of Louvain local moves over the node IDs in order. comm,
+	# tot (total degree per community), inside (adjacency weight inside
+	# each community) and k (node degrees) are Python lists updated in
+	# place. Returns the number of nodes that changed community.
+	indptr = A.indptr
+	indices = A.indices
+	data = A.data
+	moved = 0
+	for i in np.asarray(order).tolist():
+		ci = comm[i]
+		ki = k[i]
+		start = indptr[i]
+		end = indptr[i + 1]
+
+		# Sum the link weights from node i to each neighboring
+		# community.
+		links = {}
+		loop = 0.0
+		for j, w in zip(indices[start:end].tolist(), data[start:end].tolist()):
+			if j == i:
+				loop = w
+			else:
+				c = comm[j]
+				links[c] = links.get(c, 0.0) + w
+
+		# Remove i from its community and find the community with the
+		# largest modularity gain (staying wins ties).
+		tot[ci] -= ki
+		inside[ci] -= 2 * links.get(ci, 0.0) + loop
+		best = ci
+		best_gain = links.get(ci, 0.0) - tot[ci] * ki / m2
+		for c, w in links.items():
+			gain = w - tot[c] * ki / m2
+			if gain > best_gain:
+				best_gain = gain
+				best = c
+		tot[best] += ki
+		inside[best] += 2 * links.get(best, 0.0) + loop
+		if best != ci:
+			comm[i] = best
+			moved += 1
+	return moved
+
+
+class IncrementalLouvain:
+	# Louvain partition that is carried over from one daily snapshot to
+	# the next. update() seeds the new graph with the previous
+	# partition and only re-runs local moves for nodes whose edges
+	# changed (plus their neighborhoods), so the work is proportional
+	# to the day's changes. The per-community totals behind the
+	# modularity score are patched with the changed edges instead of
+	# being recomputed over the whole graph.
+	def __init__(self, graph, seed=None, min_gain=MIN_GAIN, membership=None):
+		# Start from a full Louvain run, or from a known membership
+		# (e.g. a partition saved by a previous job).
+		self.rng = np.random.default_rng(seed)
+		self.min_gain = min_gain
+		if membership is None:
+			membership = louvain_membership(graph, self.rng, min_gain)
+		self.graph = graph
+		self.A = adjacency(graph)
+		self.m2 = self.A.sum()
+		self.k = np.asarray(self.A.sum(axis=1)).ravel()
+		self.membership = np.asarray(membership).copy()
+		size = self.membership.max() + 1 if len(self.membership) > 0 else 0
+		self.tot = np.bincount(self.membership, weights=self.k, minlength=size)
+		self.inside = _inside_weights(self.A, self.membership, size)
+
+
+	@property
+	def modularity(self):
+		return _quality(self.inside, self.tot, self.m2)
+
+
+	def partition(self):
+		# {node_name: community} dict with communities numbered 0..c-1.
+		return self.graph.to_dict(_renumber(self.membership))
+
+
+	def save(self, path):
+		# Persist the snapshot graph and partition so the next run can
+		# continue from them.
+		self.graph.save(path, membership=self.membership)
+
+
+	@classmethod
+	def load(cls, path, seed=None, min_gain=MIN_GAIN):
+		with np.load(path) as data:
+			membership = data['membership']
+		return cls(
+			CSRGraph.load(path), seed, min_gain, membership=membership
+		)
+
+
+	def update(self, graph, hops=1):
+		# Move to a new snapshot of the graph. Returns the number of
+		# nodes that were re-optimized.
+		old = self.graph
+		n = graph.number_of_nodes()
+		ids = graph.node_ids(old.names)
+		kept = ids >= 0
+
+		# Carry the previous communities over; new nodes start as
+		# singletons.
+		membership = np.full(n, -1, dtype=np.int64)
+		membership[ids[kept]] = self.membership[kept]
+		new_nodes = np.flatnonzero(membership < 0)
+		size = len(self.tot)
+		membership[new_nodes] = size + np.arange(len(new_nodes))
+		tot = np.concatenate([self.tot, np.zeros(len(new_nodes))])
+		inside = np.concatenate([self.inside, np.zeros(len(new_nodes))])
+
+		# Remove the old adjacency entries of nodes that disappeared.
+		old_A = self.A.tocoo()
+		alive = kept[old_A.row] & kept[old_A.col]
+		dead = ~alive
+		_patch(
+			tot, inside, self.membership[old_A.row[dead]],
+			self.membership[old_A.col[dead]], -old_A.data[dead]
+		)
+
+		# Difference between the new adjacency and the old one (mapped
+		# into the new node IDs) gives the changed edges.
+		A = adjacency(graph)
+		aligned = sp.csr_matrix(
+			(
+				old_A.data[alive],
+				(ids[old_A.row[alive]], ids[old_A.col[alive]])
+			),
+			shape=(n, n)
+		)
+		delta = (A - aligned).tocoo()
+		changed = delta.data != 0
+		rows = delta.row[changed]
+		cols = delta.col[changed]
+		_patch(tot, inside, membership[rows], membership[cols], delta.data[changed])
+
+		self.graph = graph
+		self.A = A
+		self.m2 = A.sum()
+		self.k = np.asarray(A.sum(axis=1)).ravel()
+		self.membership = membership
+
+		# Re-optimize the touched nodes and their neighborhoods.
+		touched = graph.expand(np.concatenate([rows, new_nodes]), hops)
+		if len(touched) == 0 or self.m2 == 0:
+			self.tot = tot
+			self.inside = inside
+			self._compact()
+			return 0
+		comm_list = membership.tolist()
+		tot_list = tot.tolist()
+		inside_list = inside.tolist()
+		k_list = self.k.tolist()
+		current = _quality(inside_list, tot_list, self.m2)
+		while True:
+			moved = move_nodes(
+				A, self.rng.permutation(touched), comm_list, tot_list,
+				inside_list, k_list, self.m2
+			)
+			if moved == 0:
+				break
+			new = _quality(inside_list, tot_list, self.m2)
+			if new - current < self.min_gain:
+				break
+			current = new
+		self.membership = np.asarray(comm_list)
+		self.tot = np.asarray(tot_list)
+		self.inside = np.asarray(inside_list)
+		self._compact()
+		return len(touched)
+
+
+	def _compact(self):
+		# Renumber the communities as 0..c-1 and drop the totals of
+		# communities that became empty, so the community arrays do not
+		# grow with every update's new nodes.
+		used = np.unique(self.membership)
+		if len(used) == len(self.tot):
+			return
+		mapping = np.full(len(self.tot), -1, dtype=np.int64)
+		mapping[used] = np.arange(len(used))
+		self.membership = mapping[self.membership]
+		self.tot = self.tot[used]
+		self.inside = self.inside[used]
+
+
+def aggregate(A, comm):
+	# Collapse each community into a single node. Internal edges become
+	# (doubled) self-loops so the adjacency convention is preserved.
+	n = A.shape[0]
+	P = sp.csr_matrix(
+		(np.ones(n), (np.arange(n), comm)), shape=(n, comm.max() + 1)
+	)
+	return (P.T @ A @ P).tocsr()
+
+
+def _modularity(A, comm):
+	# Q = sum_c [ in_c / 2m - (tot_c / 2m)^2 ] where in_c is the sum of
+	# adjacency entries inside community c.
+	size = comm.max() + 1
+	tot = np.bincount(
+		comm, weights=np.asarray(A.sum(axis=1)).ravel(), minlength=size
+	)
+	return _quality(_inside_weights(A, comm, size), tot, A.sum())
+
+
+def _quality(inside, tot, m2):
+	# Modularity from the per-community inside and total weights.
+	if m2 == 0:
+		return 0.0
+	inside = np.asarray(inside)
+	tot = np.asarray(tot)
+	return float(inside.sum() / m2 - np.dot(tot, tot) / (m2 * m2))
+
+
+def _inside_weights(A, comm, size):
+	# Sum of the adjacency entries whose endpoints share a community.
+	rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+	same = comm[rows] == comm[A.indices]
+	return np.bincount(comm[rows[same]], weights=A.data[same], minlength=size)
+
+
+def _patch(tot, inside, comm_rows, comm_cols, weights):
+	# Apply adjacency entry changes to the per-community totals.
+	np.add.at(tot, comm_rows, weights)
+	same = comm_rows == comm_cols
+	np.add.at(inside, comm_rows[same], weights[same])
+
+
+def _renumber(comm):
+	# Relabel communities as 0..c-1 in order of first appearance.
+	_, first, inverse = np.unique(comm, return_index=True, return_inverse=True)
+	order = np.argsort(np.argsort(first))
+	return order[inverse.ravel()]
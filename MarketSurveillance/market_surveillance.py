@@ -7,15 +7,27 @@
 # Windows/MacOS/Linux
 
 
-from collections import Counter
-import community
+import os
 import matplotlib
-import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
-import matplotlib.colors as mcolors
-import matplotlib.patches as mpatches
-import pandas as pd
-import networkx as nx
+from ingest import ingest_edges
+from csr_graph import CSRGraph
+from louvain import IncrementalLouvain, write_community_list
+from centrality import degree_centrality, strength_centrality
+from centrality import eigenvector_centrality, top_k_dict, save_vector
+from centrality import warm_start
+from closeness import closeness_centrality
+from cliques import find_cliques, write_cliques
+from girvan_newman import write_girvan_newman
+from render import cached_layout, save_base_plot, save_centrality_plot
+from render import save_community_plot
+from coarsen import coarsen
+from metrics import Metrics
+
+
+# Girvan-Newman is O(m^2 n), so it is only run on graphs with up to
+# this many edges. Set SURVEILLANCE_GIRVAN_NEWMAN=1 to always run it,
+# or 0 to never run it.
+GIRVAN_NEWMAN_MAX_EDGES = 5000
 
 
 def main():
@@ -89,38 +101,44 @@ def main():
 	value_width=16
 	matplotlib.rcParams['figure.figsize']=[12, 8]
 
-	# Reading in the data for the Inviters and Invitees from the the Bloomberg Chat Data
-	df = pd.read_excel('dataset.xlsx')
-
-	# Creating a graph from a pandas dataframe
-	G = nx.from_pandas_edgelist(df, 'Inviter', 'Invitee', 'MsgCount')
-	for index, row in df.iterrows():
-		G.add_edge(row['Inviter'], row['Invitee'])
-		
-	# Position nodes using Fruchterman-Reingold force-directed algorithm
-	pos = nx.spring_layout(G)
-
-	# Drawing the graph
-	nx.draw_networkx_nodes(
-		G, pos, with_labels=True, node_size=50, font_size=7,
-		node_color='green', label='Participants'
-	)
-	nx.draw_networkx_edges(
-		G, pos, with_labels=False, width=2.0, 
-		label='Number of Messages'
-	)
-	plt.title(
-		'Node Graph for Communications Data', fontsize=22, 
-		fontname='Arial'
-	)
-	plt.box(on=None)
-	plt.axis('off')
-	plt.legend(bbox_to_anchor=(1, 0), loc='best', ncol=1)
-	plt.savefig('base.png', dpi=400)
+	# Instrumentation: every stage below runs in a timing span that
+	# also records the process memory high-water mark. Set
+	# SURVEILLANCE_LOG=stderr (or a file path) for JSON line logs and
+	# SURVEILLANCE_PROFILE=1 to save a cProfile dump of the slowest
+	# stage. The totals are written to metrics.json and metrics.prom
+	# (Prometheus text format) at the end of the run.
+	metrics = Metrics.from_env()
+
+	# Reading in the data for the Inviters and Invitees from the the
+	# Bloomberg Chat Data. The file is streamed in bounded-size chunks
+	# (CSV, Parquet and XLSX are supported) and duplicate participant
+	# pairs are merged by summing their MsgCount.
+	with metrics.span('ingest'):
+		edges = ingest_edges('dataset.xlsx')
+
+	# Creating a compact CSR graph from the aggregated edge list
+	# (integer node IDs, float32 MsgCount weights) used by every step
+	# below.
+	with metrics.span('build_csr'):
+		graph = CSRGraph.from_edges(edges)
+
+	# Position nodes using a Fruchterman-Reingold force-directed layout
+	# (vectorized, with approximate repulsion on large graphs). The
+	# layout is cached by graph hash, so every plot below reuses the
+	# same node positions.
+	with metrics.span('layout'):
+		pos = cached_layout(graph, seed=42)
+
+	# Drawing the graph (all edges in one LineCollection, all nodes in
+	# one scatter)
+	with metrics.span('savefig_base'):
+		save_base_plot(graph, pos, 'base.png')
 
 	# Additional metrics
-	print("Total number of Edges=", len(G.edges()))
-	print("Total number of Nodes=", len(G.nodes()))
+	print("Total number of Edges=", graph.number_of_edges())
+	print("Total number of Nodes=", graph.number_of_nodes())
+	metrics.count('edges', graph.number_of_edges())
+	metrics.count('nodes', graph.number_of_nodes())
 
 
 	# Quantitative Metrics for Network Analysis
@@ -140,46 +158,54 @@ def main():
 
 	# Centrality Metrics
 
-	# Calculating Centrality metrics for the Graph
-	dict_degree_centrality = nx.degree_centrality(G)
-	dict_closeness_centrality = nx.closeness_centrality(G)
-	dict_eigenvector_centrality = nx.eigenvector_centrality(G)
+	# Calculating Centrality metrics for the Graph. Degree, strength
+	# (MsgCount-weighted degree) and eigenvector centrality are computed
+	# once with sparse matrix-vector products. The eigenvector power
+	# iteration is warm-started from the previous run's vector if one
+	# was saved.
+	centralities = {}
+	with metrics.span('centrality'):
+		with metrics.span('degree_centrality'):
+			centralities['degree'] = degree_centrality(graph)
+			centralities['strength'] = strength_centrality(graph)
+		with metrics.span('eigenvector_centrality'):
+			centralities['eigenvector'] = eigenvector_centrality(
+				graph, start=warm_start('eigenvector_centrality.npz', graph)
+			)
+		save_vector(
+			'eigenvector_centrality.npz', graph, centralities['eigenvector']
+		)
+		# Closeness runs BFS from every node, split across a process
+		# pool that shares the CSR adjacency. On very large graphs use
+		# approximate_closeness(graph, pivots=...) to trade accuracy
+		# for time.
+		with metrics.span('closeness_centrality'):
+			closeness = closeness_centrality(graph)
+	dict_degree_centrality = graph.to_dict(centralities['degree'])
+	dict_closeness_centrality = graph.to_dict(closeness)
+	dict_eigenvector_centrality = graph.to_dict(centralities['eigenvector'])
 
 	# Top 10 nodes with the largest values of degree centrality in 
 	# descending order
-	dict(Counter(dict_degree_centrality).most_common(10))
+	print(top_k_dict(graph, centralities['degree'], 10))
 
 	# Top 10 nodes with the largest values of closeness centrality in 
 	# descending order
-	dict(Counter(dict_closeness_centrality).most_common(10))
+	print(top_k_dict(graph, closeness, 10))
 
 	# Top 10 nodes with the largest values of eigenvector centrality in
 	# descending order
-	dict(Counter(dict_eigenvector_centrality).most_common(10))
-
-	# Function to plot the graphs for each centrality metric
-	matplotlib.rcParams['figure.figsize']= [24, 8]
-	def draw(G, pos, lista, listb, measure_name):
-		nodes=nx.draw_networkx_nodes(
-			G, pos, node_size=100, cmap=plt.cm.viridis, 
-			node_color=lista, nodelist=listb
-		)
-		nodes.set_norm(
-			mcolors.SymLogNorm(linthresh=0.01, linscale=1)
+	print(top_k_dict(graph, centralities['eigenvector'], 10))
+
+	# Plot the graphs for each centrality metric
+	with metrics.span('savefig_centrality'):
+		save_centrality_plot(
+			graph, pos, [
+				('Degree Centrality', centralities['degree']),
+				('Closeness Centrality', closeness),
+				('Eigenvector Centrality', centralities['eigenvector']),
+			], 'centrality.png'
 		)
-		edges=nx.draw_networkx_edges(G, pos)
-		plt.title(measure_name, fontsize=22, fontname='Arial')
-		plt.colorbar(nodes)
-		plt.axis('off')
-
-	plt.subplot(1,3,1)
-	list_pos_values = []
-	for i in nx.degree_centrality(G).values():
-		list_pos_values.append(i)
-		list_pos_keys=[]
-	for i in nx.degree_centrality(G).keys():
-		list_pos_keys.append(i)
-	draw(G, pos, list_pos_values, list_pos_keys, 'Degree Centrality')
 
 	# Based on the graphs above, the authors observe that some of the 
 	# most influential participants are P1, P12, P16, P29, P44 and P63.
@@ -231,62 +257,62 @@ def main():
 	# participants. The following code block also shows the code used 
 	# for this purpose:
 	# Starting with an initial partition of the graph and running the 
-	# Louvain algorithm for Community Detection
-	partition=community.best_partition(G, weight='MsgCount')
+	# Louvain algorithm for Community Detection. If a previous run left
+	# its snapshot behind, the previous partition is reused and only
+	# the nodes touched by changed edges (and their neighbors) are
+	# re-optimized; modularity is kept in sync incrementally.
+	with metrics.span('best_partition'):
+		if os.path.exists('louvain_state.npz'):
+			louvain_state = IncrementalLouvain.load('louvain_state.npz')
+			louvain_state.update(graph)
+		else:
+			louvain_state = IncrementalLouvain(graph)
+		louvain_state.save('louvain_state.npz')
+	partition=louvain_state.partition()
 	print('Completed Louvain algorithm .. . . ' )
-	values = [partition.get(node) for node in G.nodes()]
-	list_com = partition.values()
 
 	# Creating a dictionary like {community_number:list_of_participants}
-	dict_nodes = {}
-
-	# Populating the dictionary with items
-	for each_item in partition.items():
-		community_num = each_item[1]
-		community_node = each_item[0]
-		if community_num in dict_nodes:
-			value = dict_nodes.get(community_num) + ' | ' + str(community_node)
-			dict_nodes.update({community_num:value})
-		else:
-			dict_nodes.update({community_num:community_node})
-
-	# Creating a dataframe from the diet, and getting the output into 
-	# excel
-	community_df=pd.DataFrame.from_dict(
-		dict_nodes, orient='index', columns=['Members']
-	)
-	community_df.index.rename('Community_Num' , inplace=True)
-	community_df.to_csv('Community_List_snippet.csv')
-
-	# Creating a new graph to represent the communities created by the 
-	# Louvain algorithm
-	matplotlib.rcParams['figure.figsize'] = [12, 8]
-	G_comm = nx.Graph()
-
-	# Populating the data from the node dictionary created earlier
-	G_comm.add_nodes_from(dict_nodes)
+	# and getting the output into a CSV file
+	dict_nodes = write_community_list(partition, 'Community_List_snippet.csv')
 
 	# Calculating modularity and the total number of communities
-	mod=community.modularity(partition,G)
+	with metrics.span('modularity'):
+		mod=louvain_state.modularity
 	print("Modularity: ", mod)
-	print("Total number of Communities=", len(G_comm.nodes()))
-
-	# Creating the Graph and also calculating Modularity
-	matplotlib.rcParams['figure.figsize'] = [12, 8]
-	pos_louvain = nx.spring_layout(G_comm)
-	nx.draw_networkx(
-		G_comm, pos_louvain, with_labels=True, node_size=160, 
-		font_size=11,label='Modularity =' + str(round(mod,3)) +
-			', Communities=' + str(len(G_comm.nodes()))
-	)
-	plt.suptitle(
-		'Community structure (Louvain Algorithm)', fontsize=22, 
-		fontname='Arial'
+	print("Total number of Communities=", len(dict_nodes))
+	metrics.count('communities', len(dict_nodes))
+
+	# Collapsing each community into a single node. The edges between
+	# communities carry the summed MsgCount of their members' edges
+	# (written to Community_Edges.csv) and the community graph keeps
+	# the mapping back to the members.
+	membership = [partition[node] for node in graph.names.tolist()]
+	with metrics.span('coarsen'):
+		communities = coarsen(graph, membership)
+		communities.write_community_edges('Community_Edges.csv')
+	metrics.count('community_edges', communities.graph.number_of_edges())
+
+	# Creating the Graph and also calculating Modularity. Each community
+	# is placed at the centroid of its members in the cached node
+	# layout instead of running a second spring layout, and connected
+	# to the communities its members converse with.
+	with metrics.span('savefig_louvain'):
+		save_community_plot(
+			pos, membership, mod, 'louvain.png',
+			'Community structure (Louvain Algorithm)',
+			graph=communities.graph
+		)
+
+	# The community graph (or a stratified sample from coarsen.sample(),
+	# which keeps the degree distribution) is a small proxy
+	# for exploring the data; any community can then be drilled into at
+	# full resolution, e.g. the largest one:
+	largest = int(communities.sizes.argmax())
+	community_graph = communities.drill_down(largest)
+	print(
+		f"Largest community ({largest}): {community_graph.number_of_nodes()}"
+		f" participants, {community_graph.number_of_edges()} edges"
 	)
-	plt.box(on=None)
-	plt.axis('off')
-	plt.legend(bbox_to_anchor=(0,1), loc='best', ncol=1)
-	plt.savefig('louvain.png', dpi=400, bbox_inches='tight')
 
 	# If we were to visualize all the non-overlapping communities in 
 	# different colors, we would get the following image. As we can see
@@ -314,6 +340,42 @@ def main():
 	# Louvain algorithm, and can be found at the Github link given at 
 	# the beginning of the article. The next figure shows the community
 	# structure for the Girvan-Newman Algorithm.
+	# Here the betweenness is only recomputed for the component that
+	# contained the removed edge and the algorithm stops once modularity
+	# has peaked. The result uses the same CSV format as the Louvain
+	# communities so the two can be compared.
+	# It is still far slower than Louvain (O(m^2 n)), so on large graphs
+	# it is skipped unless forced (see GIRVAN_NEWMAN_MAX_EDGES).
+	run_girvan_newman = os.environ.get('SURVEILLANCE_GIRVAN_NEWMAN', '')
+	if run_girvan_newman == '':
+		run_girvan_newman = graph.number_of_edges() <= GIRVAN_NEWMAN_MAX_EDGES
+	else:
+		run_girvan_newman = run_girvan_newman != '0'
+	if run_girvan_newman:
+		with metrics.span('girvan_newman'):
+			partition_gn, mod_gn = write_girvan_newman(
+				graph, 'Community_List_girvan_newman.csv'
+			)
+		metrics.count(
+			'communities_girvan_newman', len(set(partition_gn.values()))
+		)
+		print('Completed Girvan-Newman algorithm .. . . ')
+		print("Modularity (Girvan-Newman): ", mod_gn)
+		print(
+			"Total number of Communities (Girvan-Newman)=",
+			len(set(partition_gn.values()))
+		)
+	else:
+		print(
+			f'Skipping Girvan-Newman algorithm ({graph.number_of_edges()} '
+			f'edges, limit {GIRVAN_NEWMAN_MAX_EDGES}; set '
+			f'SURVEILLANCE_GIRVAN_NEWMAN=1 to run it anyway)'
+		)
+		metrics.event(
+			'girvan_newman_skipped', edges=graph.number_of_edges(),
+			limit=GIRVAN_NEWMAN_MAX_EDGES
+		)
+		metrics.add('stages_skipped')
 
 
 	# Maximal Clique Calculation:
@@ -335,21 +397,30 @@ def main():
 	# Now, if would like to view the interconnectedness between cliques
 	# for the complete network/dataset, we can see the image below, and 
 	# also the supporting Python code:
-	# Finding the Maximal Cliques associated with teh graph
-	a = nx.find_cliques(G)
-	i = 0
-
-	# For each clique, print the members and also print the total 
-	# number of communities
-	for clique in a:
-		print(clique)
-		i += 1
-	total_comm_max_cl = i
-	print('Total number of communities: ', total_comm_max_cl)
+	# Finding the Maximal Cliques associated with teh graph. The cliques
+	# are enumerated once, as a stream: each one is printed and written
+	# to cliques.jsonl (use a .parquet path for Parquet) instead of
+	# being kept in memory. The minimum size is pushed into the search,
+	# so single-node cliques are never generated. Remove "min_size=2"
+	# if you're interested in maxcliques with 1 node as well.
+	def print_cliques(cliques):
+		# For each clique, print the members while it is written out.
+		for clique in cliques:
+			print(clique)
+			yield clique
+
+	with metrics.span('find_cliques'):
+		cliques = find_cliques(graph, min_size=2)
+		total_comm_max_cl = write_cliques(
+			print_cliques(cliques), 'cliques.jsonl'
+		)
+	metrics.count('cliques', total_comm_max_cl)
+	metrics.count('cliques_truncated', int(cliques.truncated))
+	if cliques.truncated:
+		print('Clique enumeration stopped early:', cliques.reason)
 
-	# Remove "len(clique)>1" if you're interested in maxcliques with 2 
-	# or more edges
-	cliques = [clique for clique in nx.find_cliques(G) if len(clique)>1]
+	# Print the total number of communities
+	print('Total number of communities: ', total_comm_max_cl)
 
 
 	# Test Exercise: Real World/Large Scale Data
@@ -381,6 +452,15 @@ def main():
 	# market surveillance more robust and efficient.
 
 
+	# Write out the run metrics (and the profile of the slowest stage,
+	# if profiling was enabled).
+	metrics.write_json('metrics.json')
+	metrics.write_prometheus('metrics.prom')
+	slowest = metrics.dump_profile('slowest_stage.prof')
+	if slowest is not None:
+		print(f'Profile of the slowest stage ({slowest}) saved to slowest_stage.prof')
+	metrics.close()
+
 	# Exit the program.
 	exit(0)
 
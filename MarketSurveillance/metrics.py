@@ -0,0 +1,292 @@
+# metrics.py
+# Lightweight instrumentation for the analysis runs: timing spans
+# around each stage, process memory high-water marks and counters
+# (nodes, edges, communities, cliques). Each span records the peak RSS
+# reached while it ran (the high-water mark is reset when a span starts,
+# on Linux), not the process's lifetime peak. Every finished span and counter
+# can be logged as one JSON line, and the totals can be written as a
+# JSON summary or in the Prometheus text exposition format (e.g. for
+# the node_exporter textfile collector), so nightly job durations can
+# be alerted on. Optionally each top-level stage runs under cProfile
+# and the profile of the slowest one is kept for dumping.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+	def __init__(self, log=None, profile=False, prefix='surveillance'):
+		# log is a file-like object that receives one JSON line per
+		# event (None disables logging). prefix starts every Prometheus
+		# metric name.
+		self.log = log
+		self.profile = profile
+		self.prefix = prefix
+		self.spans = []
+		self.counters = {}
+		self.started = time.time()
+		self._start = time.perf_counter()
+		self._stack = []
+		self._slowest = None
+		self._peak = peak_rss_bytes()
+
+
+	@classmethod
+	def from_env(cls):
+		# Configure from the environment:
+		#   SURVEILLANCE_LOG=stderr|stdout|<path> for JSON line logs,
+		#   SURVEILLANCE_PROFILE=1 to profile the stages.
+		target = os.environ.get('SURVEILLANCE_LOG')
+		if target is None or target == '':
+			log = None
+		elif target == 'stderr':
+			log = sys.stderr
+		elif target == 'stdout':
+			log = sys.stdout
+		else:
+			log = open(target, 'a')
+		profile = os.environ.get('SURVEILLANCE_PROFILE', '') not in ('', '0')
+		return cls(log=log, profile=profile)
+
+
+	@contextmanager
+	def span(self, name):
+		# Time the enclosed block. Spans can be nested; only top-level
+		# spans are profiled (cProfile cannot nest). The span's peak RSS
+		# covers the block alone: the high-water mark seen so far is
+		# folded into the enclosing spans and the run total before it
+		# is reset. Where it cannot be reset, the span's peak is None.
+		parent = self._stack[-1][0] if len(self._stack) > 0 else None
+		self._observe()
+		frame = [name, None]
+		if reset_peak_rss():
+			frame[1] = rss_bytes() or 0
+		self._stack.append(frame)
+		profiler = None
+		if self.profile and parent is None:
+			profiler = cProfile.Profile()
+			profiler.enable()
+		status = 'ok'
+		start = time.perf_counter()
+		try:
+			yield
+		except BaseException:
+			status = 'error'
+			raise
+		finally:
+			elapsed = time.perf_counter() - start
+			if profiler is not None:
+				profiler.disable()
+				if self._slowest is None or elapsed > self._slowest[0]:
+					self._slowest = (elapsed, name, profiler)
+			self._observe()
+			self._stack.pop()
+			record = {
+				'event': 'span',
+				'name': name,
+				'parent': parent,
+				'seconds': elapsed,
+				'peak_rss_bytes': frame[1],
+				'rss_bytes': rss_bytes(),
+				'status': status,
+			}
+			self.spans.append(record)
+			self._emit(record)
+
+
+	def count(self, name, value):
+		# Set a counter (e.g. count('nodes', n)).
+		self.counters[name] = value
+		self._emit({'event': 'counter', 'name': name, 'value': value})
+
+
+	def add(self, name, value=1):
+		# Increment a counter.
+		self.count(name, self.counters.get(name, 0) + value)
+
+
+	def event(self, name, **fields):
+		# Log a one-off event (e.g. a skipped stage) with its fields.
+		self._emit(dict(fields, event=name))
+
+
+	def slowest(self):
+		# (name, seconds) of the slowest top-level span.
+		top = [span for span in self.spans if span['parent'] is None]
+		if len(top) == 0:
+			return None
+		span = max(top, key=lambda span: span['seconds'])
+		return span['name'], span['seconds']
+
+
+	def peak_rss(self):
+		# Peak RSS of the whole run so far (the span resets do not lose
+		# it), or None where it is unavailable.
+		self._observe()
+		return self._peak
+
+
+	def summary(self):
+		return {
+			'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+			'seconds': time.perf_counter() - self._start,
+			'peak_rss_bytes': self.peak_rss(),
+			'spans': self.spans,
+			'counters': self.counters,
+			'slowest': self.slowest(),
+		}
+
+
+	def write_json(self, path):
+		with open(path, 'w') as f:
+			json.dump(self.summary(), f, indent=4, default=str)
+
+
+	def prometheus(self):
+		# Metrics in the Prometheus text exposition format. A span that
+		# ran several times reports its total duration.
+		p = self.prefix
+		lines = []
+
+		def metric(name, help_text, samples):
+			lines.append(f'# HELP {p}_{name} {help_text}')
+			lines.append(f'# TYPE {p}_{name} gauge')
+			for labels, value in samples:
+				if value is None:
+					continue
+				label = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+				if len(label) > 0:
+					label = '{' + label + '}'
+				lines.append(f'{p}_{name}{label} {float(value)!r}')
+
+		stages = {}
+		for span in self.spans:
+			stage = stages.setdefault(span['name'], {
+				'seconds': 0.0, 'peak_rss_bytes': 0, 'ok': 1,
+				'parent': span['parent'] or '',
+			})
+			stage['seconds'] += span['seconds']
+			stage['peak_rss_bytes'] = max(stage['peak_rss_bytes'], span['peak_rss_bytes'] or 0)
+			stage['ok'] = min(stage['ok'], int(span['status'] == 'ok'))
+		metric('stage_duration_seconds', 'Wall time spent in each stage.', [
+			({'stage': name, 'parent': s['parent']}, s['seconds'])
+			for name, s in stages.items()
+		])
+		metric('stage_peak_rss_bytes', 'Peak RSS while each stage ran.', [
+			({'stage': name, 'parent': s['parent']}, s['peak_rss_bytes'] or None)
+			for name, s in stages.items()
+		])
+		metric('stage_success', '1 if every run of the stage succeeded.', [
+			({'stage': name, 'parent': s['parent']}, s['ok'])
+			for name, s in stages.items()
+		])
+		metric('run_duration_seconds', 'Wall time of the whole run so far.', [
+			({}, time.perf_counter() - self._start)
+		])
+		metric('run_start_timestamp_seconds', 'Unix time the run started.', [
+			({}, self.started)
+		])
+		metric('peak_rss_bytes', 'Process peak resident set size.', [
+			({}, self.peak_rss())
+		])
+		for name, value in sorted(self.counters.items()):
+			metric(name, f'Counter {name}.', [({}, value)])
+		return '\n'.join(lines) + '\n'
+
+
+	def write_prometheus(self, path):
+		# Write atomically so a scraper never reads a partial file.
+		tmp = f'{path}.tmp-{os.getpid()}'
+		with open(tmp, 'w') as f:
+			f.write(self.prometheus())
+		os.replace(tmp, path)
+
+
+	def dump_profile(self, path):
+		# Write the cProfile stats of the slowest profiled stage (for
+		# pstats or snakeviz). Returns its name, or None when profiling
+		# was off.
+		if self._slowest is None:
+			return None
+		_, name, profiler = self._slowest
+		profiler.dump_stats(path)
+		return name
+
+
+	def close(self):
+		# Close the log file (stdout/stderr are left open). Call once
+		# the run is over.
+		if self.log is not None and self.log not in (sys.stdout, sys.stderr):
+			self.log.close()
+		self.log = None
+
+
+	def _observe(self):
+		# Fold the current high-water mark into every open span and the
+		# run total.
+		peak = peak_rss_bytes()
+		if peak is None:
+			return
+		self._peak = max(self._peak or 0, peak)
+		for frame in self._stack:
+			if frame[1] is not None:
+				frame[1] = max(frame[1], peak)
+
+
+	def _emit(self, record):
+		if self.log is None:
+			return
+		record = dict(record, time=time.time())
+		self.log.write(json.dumps(record, default=str) + '\n')
+		self.log.flush()
+
+
+def peak_rss_bytes():
+	# High-water mark of this process's resident set size since it
+	# started or since the last reset_peak_rss() (None where the
+	# resource module is unavailable, i.e. on Windows).
+	try:
+		with open('/proc/self/status') as f:
+			for line in f:
+				if line.startswith('VmHWM:'):
+					return int(line.split()[1]) * 1024
+	except (OSError, ValueError):
+		pass
+	try:
+		import resource
+	except ImportError:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def reset_peak_rss():
+	# Reset the high-water mark reported by peak_rss_bytes() to the
+	# current resident set size (Linux, through /proc/self/clear_refs).
+	# Returns False where it cannot be reset.
+	try:
+		with open('/proc/self/clear_refs', 'w') as f:
+			f.write('5')
+		return True
+	except OSError:
+		return False
+
+
+def rss_bytes():
+	# Current resident set size (Linux only, None elsewhere).
+	try:
+		with open('/proc/self/statm') as f:
+			return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+	except (OSError, ValueError, AttributeError):
+		return None
+
+
+def _escape(value):
+	return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
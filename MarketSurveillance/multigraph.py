@@ -0,0 +1,196 @@
+# multigraph.py
+# Multi-relation graph of the surveillance data: several edge sources
+# (chat MsgCount, trade notional, call counts, ...) between the same
+# participants, aggregated per undirected pair in one vectorized pass
+# (np.unique + np.bincount, no Python loop over rows). The pairs share
+# a single symmetric CSR structure and every relation keeps its own
+# typed weight array, indexed by pair. combine() mixes the relations
+# with configurable coefficients into a CSRGraph that reuses that
+# structure, so centrality and Louvain can be run on any combination
+# without re-aggregating the sources.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+from csr_graph import CSRGraph
+
+
+class MultiRelationGraph:
+	def __init__(self, names, lo, hi, relations):
+		# names: node names (position = node ID).
+		# lo, hi: node IDs of every undirected pair (lo <= hi).
+		# relations: {relation: weight array indexed by pair}.
+		self.names = np.asarray(names, dtype=object)
+		self.lo = np.asarray(lo, dtype=np.int64)
+		self.hi = np.asarray(hi, dtype=np.int64)
+		self.relations = dict(relations)
+		self._combined = {}
+
+		# Symmetric CSR over the pairs (self-loops stored once), with
+		# the pair behind every entry.
+		n = len(self.names)
+		off = self.lo != self.hi
+		pair_ids = np.arange(len(self.lo))
+		rows = np.concatenate([self.lo, self.hi[off]])
+		cols = np.concatenate([self.hi, self.lo[off]])
+		pairs = np.concatenate([pair_ids, pair_ids[off]])
+		order = np.lexsort((cols, rows))
+		self.indptr = np.zeros(n + 1, dtype=np.int64)
+		self.indptr[1:] = np.cumsum(np.bincount(rows, minlength=n))
+		self.indices = cols[order].astype(np.int32)
+		self.entry_pair = pairs[order]
+
+
+	@classmethod
+	def from_sources(cls, sources, dtypes=None):
+		# Build from {relation: (edges, source, target, weight)} where
+		# edges is a dataframe with one row per interaction. Rows of the
+		# same pair are summed; a weight column of None counts the rows
+		# (e.g. number of calls). dtypes optionally gives the dtype of
+		# each relation's weights (float64 by default). As in
+		# ingest.aggregate_edges(), rows with a missing source or target
+		# are dropped and missing weights count as 0.
+		if dtypes is None:
+			dtypes = {}
+		names = list(sources)
+		frames = [
+			(edges.dropna(subset=[source, target]), source, target, weight)
+			for edges, source, target, weight in (sources[name] for name in names)
+		]
+		sizes = [len(edges) for edges, _, _, _ in frames]
+		codes, labels = pd.factorize(pd.concat(
+			[edges[source] for edges, source, _, _ in frames] +
+			[edges[target] for edges, _, target, _ in frames],
+			ignore_index=True
+		))
+		total = sum(sizes)
+		src = codes[:total].astype(np.int64)
+		dst = codes[total:].astype(np.int64)
+		n = len(labels)
+
+		# One key per undirected pair; inverse maps rows to pairs.
+		lo = np.minimum(src, dst)
+		hi = np.maximum(src, dst)
+		keys, inverse = np.unique(lo * max(n, 1) + hi, return_inverse=True)
+		inverse = inverse.ravel()
+
+		relations = {}
+		start = 0
+		for name, (edges, _, _, weight), size in zip(names, frames, sizes):
+			if weight is None:
+				values = np.ones(size)
+			else:
+				values = pd.to_numeric(edges[weight]).fillna(0).to_numpy(
+					dtype=np.float64
+				)
+			relations[name] = np.bincount(
+				inverse[start:start + size], weights=values,
+				minlength=len(keys)
+			).astype(dtypes.get(name, np.float64))
+			start += size
+		return cls(
+			np.asarray(labels, dtype=object), keys // max(n, 1),
+			keys % max(n, 1), relations
+		)
+
+
+	def combine(self, coefficients, normalize=False):
+		# CSRGraph whose weights are sum(coefficient * relation weight)
+		# over the given {relation: coefficient}. With normalize set,
+		# each relation is first divided by its mean non-zero weight so
+		# relations on different scales (notional vs. counts) can be
+		# mixed with comparable coefficients. Pairs whose combined
+		# weight is zero are left out. Results are cached per
+		# combination.
+		key = (tuple(sorted(coefficients.items())), normalize)
+		if key in self._combined:
+			return self._combined[key]
+		combined = np.zeros(len(self.lo))
+		for name, coefficient in coefficients.items():
+			if name not in self.relations:
+				raise KeyError(f'Unknown relation: {name}')
+			values = self.relations[name].astype(np.float64)
+			if normalize:
+				nonzero = values[values != 0]
+				if len(nonzero) > 0:
+					values = values / np.abs(nonzero).mean()
+			combined += coefficient * values
+
+		# Expand to the CSR entries and drop zero-weight entries.
+		weights = combined[self.entry_pair]
+		keep = weights != 0
+		indptr = self.indptr
+		indices = self.indices
+		if not np.all(keep):
+			rows = np.repeat(np.arange(len(self.names)), np.diff(self.indptr))
+			indptr = np.zeros(len(self.indptr), dtype=np.int64)
+			indptr[1:] = np.cumsum(
+				np.bincount(rows[keep], minlength=len(self.names))
+			)
+			indices = indices[keep]
+			weights = weights[keep]
+		graph = CSRGraph(indptr, indices, weights, self.names)
+		self._combined[key] = graph
+		return graph
+
+
+	def relation(self, name):
+		# CSRGraph of a single relation.
+		return self.combine({name: 1.0})
+
+
+	def number_of_nodes(self):
+		return len(self.names)
+
+
+	def number_of_pairs(self):
+		return len(self.lo)
+
+
+	def pair_frame(self):
+		# One row per pair with a column per relation.
+		frame = pd.DataFrame({
+			'Source': self.names[self.lo], 'Target': self.names[self.hi]
+		})
+		for name, values in self.relations.items():
+			frame[name] = values
+		return frame
+
+
+	def to_networkx(self):
+		# nx.Graph with every relation weight as its own edge attribute
+		# (pairs only carry the relations they have).
+		G = nx.Graph()
+		G.add_nodes_from(self.names.tolist())
+		frame = self.pair_frame()
+		names = list(self.relations)
+		columns = [frame[name].tolist() for name in names]
+		for row in zip(frame['Source'].tolist(), frame['Target'].tolist(), *columns):
+			G.add_edge(row[0], row[1], **{
+				name: value for name, value in zip(names, row[2:]) if value != 0
+			})
+		return G
+
+
+	def save(self, path):
+		# Write the pairs and every relation's weights to an .npz file.
+		np.savez(
+			path, names=self.names.astype(str), lo=self.lo, hi=self.hi,
+			relation_names=np.asarray(list(self.relations), dtype=str),
+			**{f'relation_{i}': values for i, values in enumerate(self.relations.values())}
+		)
+
+
+	@classmethod
+	def load(cls, path):
+		with np.load(path) as data:
+			relations = {
+				name: data[f'relation_{i}']
+				for i, name in enumerate(data['relation_names'].tolist())
+			}
+			return cls(
+				data['names'].astype(object), data['lo'], data['hi'], relations
+			)
@@ -0,0 +1,389 @@
+# pipeline.py
+# Headless command line version of the market surveillance analysis,
+# split into named stages:
+#   ingest -> build-graph -> centrality, louvain, cliques -> coarsen
+#   -> render
+# Every stage writes its outputs to a content-addressed cache folder,
+# <cache_dir>/<stage>/<key>, where the key hashes the stage's
+# parameters with the keys of the stages it reads from (and, for
+# ingest, the contents of the input file). A stage whose folder exists
+# is skipped, so re-runs only redo what changed and a failed run resumes
+# after the last completed stage. Folders are written under a temporary
+# name and renamed once the stage finishes, so partial outputs are
+# never reused.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+from ingest import ingest_edges, DEFAULT_CHUNKSIZE
+from csr_graph import CSRGraph
+from louvain import IncrementalLouvain, write_community_list
+from centrality import compute_centralities
+from closeness import closeness_centrality, approximate_closeness
+from cliques import find_cliques, write_cliques
+from render import force_layout, save_base_plot, save_centrality_plot
+from render import save_community_plot
+from coarsen import coarsen
+from metrics import Metrics
+
+
+# Bump to invalidate every cached stage output (e.g. after changing
+# what a stage writes).
+PIPELINE_VERSION = 2
+
+CACHE_DIR = '.pipeline_cache'
+STAGE_FILE = 'stage.json'
+
+# Default parameters. Only the ones listed for a stage in STAGES are
+# part of its cache key; chunksize only bounds ingest's memory and does
+# not change its output, so it is not.
+DEFAULTS = {
+	'chunksize': DEFAULT_CHUNKSIZE,
+	'seed': 42,
+	'tol': 1e-6,
+	'max_iter': 100,
+	'pivots': 0,
+	'min_clique_size': 2,
+	'max_clique_size': None,
+	'iterations': 50,
+	'dpi': 400,
+}
+
+# Files copied from a stage's cache folder to the output directory.
+EXPORTS = {
+	'ingest': [],
+	'build-graph': [],
+	'centrality': ['centrality.csv'],
+	'louvain': ['Community_List_snippet.csv'],
+	'cliques': ['cliques.jsonl'],
+	'coarsen': ['Community_Edges.csv'],
+	'render': ['base.png', 'centrality.png', 'louvain.png'],
+}
+
+
+def file_hash(path, block_size=1 << 24):
+	# SHA-256 of a file's contents, read in blocks.
+	digest = hashlib.sha256()
+	with open(path, 'rb') as f:
+		for block in iter(lambda: f.read(block_size), b''):
+			digest.update(block)
+	return digest.hexdigest()
+
+
+def stage_key(stage, params, inputs):
+	# Cache key of a stage: hash of the pipeline version, the stage's
+	# own parameters and the keys of its inputs.
+	_, names, _ = STAGES[stage]
+	spec = {
+		'version': PIPELINE_VERSION,
+		'stage': stage,
+		'params': {name: params[name] for name in names},
+		'inputs': inputs,
+	}
+	raw = json.dumps(spec, sort_keys=True, default=str).encode('utf-8')
+	return hashlib.sha256(raw).hexdigest()
+
+
+def resolve(stages):
+	# Add the (transitive) dependencies of the selected stages and
+	# return them all in execution order.
+	needed = set()
+	pending = list(stages)
+	while pending:
+		stage = pending.pop()
+		if stage not in STAGES:
+			raise ValueError(f'Unknown stage: {stage}')
+		if stage not in needed:
+			needed.add(stage)
+			pending.extend(STAGES[stage][0])
+	return [stage for stage in STAGES if stage in needed]
+
+
+def run_pipeline(path, stages=None, skip=(), cache_dir=CACHE_DIR,
+		out_dir=None, force=(), workers=None, verbose=True, metrics=None,
+		**params):
+	# Run the selected stages (all by default, minus skip) on the chat
+	# log at path, reusing cached outputs. Stages in force are rerun
+	# even when cached. Exported files are copied to out_dir when it is
+	# given. Stages that run are timed in metrics spans and the numeric
+	# values of their summaries become counters. Returns
+	# {stage: cache folder} for every stage that ran or was reused.
+	if metrics is None:
+		metrics = Metrics()
+	params = dict(DEFAULTS, **params)
+	if stages is None:
+		stages = list(STAGES)
+	selected = [stage for stage in stages if stage not in skip]
+	keys = {}
+	folders = {}
+	for stage in resolve(selected):
+		deps, _, run = STAGES[stage]
+		if len(deps) == 0:
+			inputs = {'file': file_hash(path)}
+		else:
+			inputs = {dep: keys[dep] for dep in deps}
+		keys[stage] = stage_key(stage, params, inputs)
+		folder = os.path.join(cache_dir, stage, keys[stage])
+		folders[stage] = folder
+
+		if os.path.isdir(folder) and stage not in force:
+			metrics.add('stages_cached')
+			if verbose:
+				print(f'{stage}: cached ({keys[stage][:12]})')
+		else:
+			start = time.perf_counter()
+			tmp = f'{folder}.tmp-{os.getpid()}'
+			if os.path.isdir(tmp):
+				shutil.rmtree(tmp)
+			os.makedirs(tmp)
+			sources = {dep: folders[dep] for dep in deps}
+			if len(deps) == 0:
+				sources['file'] = path
+			with metrics.span(stage):
+				summary = run(sources, tmp, params, workers)
+			elapsed = time.perf_counter() - start
+			metrics.add('stages_run')
+			with open(os.path.join(tmp, STAGE_FILE), 'w') as f:
+				json.dump({
+					'stage': stage,
+					'key': keys[stage],
+					'inputs': inputs,
+					'params': {name: params[name] for name in STAGES[stage][1]},
+					'seconds': elapsed,
+					'summary': summary,
+				}, f, indent=4, default=str)
+			if os.path.isdir(folder):
+				shutil.rmtree(folder)
+			os.replace(tmp, folder)
+			for name, value in summary.items():
+				metrics.count(f'{stage.replace("-", "_")}_{name}', value)
+			if verbose:
+				print(f'{stage}: done in {elapsed:.3f}s ({keys[stage][:12]}) {summary}')
+
+		if out_dir is not None and stage in selected:
+			os.makedirs(out_dir, exist_ok=True)
+			for name in EXPORTS[stage]:
+				shutil.copy2(os.path.join(folder, name), os.path.join(out_dir, name))
+	return folders
+
+
+def stage_summary(folder):
+	# The summary a completed stage recorded in its cache folder.
+	with open(os.path.join(folder, STAGE_FILE)) as f:
+		return json.load(f)['summary']
+
+
+def _ingest(sources, folder, params, workers):
+	edges = ingest_edges(sources['file'], params['chunksize'])
+	edges.to_parquet(os.path.join(folder, 'edges.parquet'), index=False)
+	return {'edges': len(edges)}
+
+
+def _build_graph(sources, folder, params, workers):
+	edges = pd.read_parquet(os.path.join(sources['ingest'], 'edges.parquet'))
+	graph = CSRGraph.from_edges(edges)
+	graph.save(os.path.join(folder, 'graph.npz'))
+	return {
+		'nodes': graph.number_of_nodes(),
+		'edges': graph.number_of_edges(),
+	}
+
+
+def _centrality(sources, folder, params, workers):
+	graph = CSRGraph.load(os.path.join(sources['build-graph'], 'graph.npz'))
+	values = compute_centralities(graph, params['tol'], params['max_iter'])
+	if params['pivots'] > 0:
+		values['closeness'], bound = approximate_closeness(
+			graph, params['pivots'], workers, params['seed']
+		)
+	else:
+		values['closeness'] = closeness_centrality(graph, workers)
+		bound = 0.0
+	np.savez(os.path.join(folder, 'centrality.npz'), **values)
+	table = pd.DataFrame(values)
+	table.insert(0, 'Name', graph.names)
+	table.to_csv(os.path.join(folder, 'centrality.csv'), index=False)
+	return {'closeness_error_bound': bound}
+
+
+def _louvain(sources, folder, params, workers):
+	graph = CSRGraph.load(os.path.join(sources['build-graph'], 'graph.npz'))
+	louvain_state = IncrementalLouvain(graph, seed=params['seed'])
+	louvain_state.save(os.path.join(folder, 'louvain_state.npz'))
+	partition = louvain_state.partition()
+	dict_nodes = write_community_list(
+		partition, os.path.join(folder, 'Community_List_snippet.csv')
+	)
+	return {
+		'modularity': float(louvain_state.modularity),
+		'communities': len(dict_nodes),
+	}
+
+
+def _cliques(sources, folder, params, workers):
+	graph = CSRGraph.load(os.path.join(sources['build-graph'], 'graph.npz'))
+	cliques = find_cliques(
+		graph, min_size=params['min_clique_size'],
+		max_size=params['max_clique_size'], workers=workers or 1
+	)
+	count = write_cliques(cliques, os.path.join(folder, 'cliques.jsonl'))
+	return {'cliques': count, 'truncated': int(cliques.truncated)}
+
+
+def _coarsen(sources, folder, params, workers):
+	graph = CSRGraph.load(os.path.join(sources['build-graph'], 'graph.npz'))
+	louvain_state = IncrementalLouvain.load(
+		os.path.join(sources['louvain'], 'louvain_state.npz')
+	)
+	communities = coarsen(graph, louvain_state.partition())
+	communities.save(os.path.join(folder, 'community_graph.npz'))
+	count = communities.write_community_edges(
+		os.path.join(folder, 'Community_Edges.csv')
+	)
+	return {'community_edges': count}
+
+
+def _render(sources, folder, params, workers):
+	graph = CSRGraph.load(os.path.join(sources['build-graph'], 'graph.npz'))
+	pos = force_layout(graph, params['iterations'], params['seed'])
+	np.save(os.path.join(folder, 'layout.npy'), pos)
+	save_base_plot(graph, pos, os.path.join(folder, 'base.png'), params['dpi'])
+
+	with np.load(os.path.join(sources['centrality'], 'centrality.npz')) as data:
+		measures = [
+			('Degree Centrality', data['degree']),
+			('Closeness Centrality', data['closeness']),
+			('Eigenvector Centrality', data['eigenvector']),
+		]
+	save_centrality_plot(
+		graph, pos, measures, os.path.join(folder, 'centrality.png'),
+		params['dpi']
+	)
+
+	louvain_state = IncrementalLouvain.load(
+		os.path.join(sources['louvain'], 'louvain_state.npz')
+	)
+	partition = louvain_state.partition()
+	membership = [partition[node] for node in graph.names.tolist()]
+	save_community_plot(
+		pos, membership, stage_summary(sources['louvain'])['modularity'],
+		os.path.join(folder, 'louvain.png'),
+		'Community structure (Louvain Algorithm)', params['dpi'],
+		CSRGraph.load(os.path.join(sources['coarsen'], 'community_graph.npz'))
+	)
+	return {}
+
+
+# Stage name -> (stages it reads from, parameters in its cache key,
+# function). Listed in execution order.
+STAGES = {
+	'ingest': ([], [], _ingest),
+	'build-graph': (['ingest'], [], _build_graph),
+	'centrality': (
+		['build-graph'], ['tol', 'max_iter', 'pivots', 'seed'], _centrality
+	),
+	'louvain': (['build-graph'], ['seed'], _louvain),
+	'cliques': (
+		['build-graph'], ['min_clique_size', 'max_clique_size'], _cliques
+	),
+	'coarsen': (['build-graph', 'louvain'], [], _coarsen),
+	'render': (
+		['build-graph', 'centrality', 'louvain', 'coarsen'],
+		['iterations', 'seed', 'dpi'], _render
+	),
+}
+
+
+def main():
+	parser = argparse.ArgumentParser(
+		description='Run the market surveillance analysis as cached, '
+			'resumable stages.'
+	)
+	parser.add_argument('input', help='Chat log (CSV, Parquet or XLSX).')
+	parser.add_argument(
+		'--stages', nargs='+', choices=list(STAGES), default=list(STAGES),
+		help='Stages to run (their dependencies are reused from the cache '
+			'or run as needed).'
+	)
+	parser.add_argument('--skip', nargs='+', choices=list(STAGES), default=[])
+	parser.add_argument(
+		'--force', nargs='+', choices=list(STAGES), default=[],
+		help='Stages to rerun even if cached.'
+	)
+	parser.add_argument('--cache-dir', default=CACHE_DIR)
+	parser.add_argument('--out-dir', default='.')
+	parser.add_argument('--workers', type=int, default=None)
+	parser.add_argument('--chunksize', type=int, default=DEFAULTS['chunksize'])
+	parser.add_argument('--seed', type=int, default=DEFAULTS['seed'])
+	parser.add_argument(
+		'--pivots', type=int, default=DEFAULTS['pivots'],
+		help='Approximate closeness from this many pivots (0 = exact).'
+	)
+	parser.add_argument(
+		'--min-clique-size', type=int, default=DEFAULTS['min_clique_size']
+	)
+	parser.add_argument('--max-clique-size', type=int, default=None)
+	parser.add_argument('--iterations', type=int, default=DEFAULTS['iterations'])
+	parser.add_argument('--dpi', type=int, default=DEFAULTS['dpi'])
+	parser.add_argument(
+		'--log', default=None,
+		help='Write JSON line logs of every stage to a file (or stderr).'
+	)
+	parser.add_argument(
+		'--metrics-json', default=None, help='Write a JSON metrics summary.'
+	)
+	parser.add_argument(
+		'--metrics-prom', default=None,
+		help='Write metrics in Prometheus text format.'
+	)
+	parser.add_argument(
+		'--profile', default=None,
+		help='Profile the stages and dump the slowest one to this file.'
+	)
+	args = parser.parse_args()
+
+	log = None
+	if args.log == 'stderr':
+		log = sys.stderr
+	elif args.log is not None:
+		log = open(args.log, 'a')
+	metrics = Metrics(log=log, profile=args.profile is not None)
+	try:
+		run_pipeline(
+			args.input, args.stages, args.skip, args.cache_dir, args.out_dir,
+			args.force, args.workers, metrics=metrics, chunksize=args.chunksize,
+			seed=args.seed, pivots=args.pivots,
+			min_clique_size=args.min_clique_size,
+			max_clique_size=args.max_clique_size,
+			iterations=args.iterations, dpi=args.dpi
+		)
+	except Exception:
+		print('Pipeline failed; completed stages are cached, rerun to resume.')
+		raise
+	finally:
+		# Metrics are written for failed runs too, so alerts see them.
+		if args.metrics_json is not None:
+			metrics.write_json(args.metrics_json)
+		if args.metrics_prom is not None:
+			metrics.write_prometheus(args.metrics_prom)
+		if args.profile is not None and metrics.dump_profile(args.profile):
+			print(f'Profile of the slowest stage ({metrics.slowest()[0]}) saved to {args.profile}')
+		metrics.close()
+
+	# Exit the program.
+	exit(0)
+
+
+if __name__ == '__main__':
+	main()
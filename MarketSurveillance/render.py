@@ -0,0 +1,264 @@
+# render.py
+# Scalable rendering for the surveillance graph, replacing
+# nx.spring_layout + nx.draw_networkx_*:
+#   - force_layout(): Fruchterman-Reingold style force layout written
+#     with NumPy array operations. On large graphs the all-pairs
+#     repulsion is approximated (like Barnes-Hut does with a quadtree)
+#     by binning the nodes into a density grid and convolving it with
+#     the repulsion kernel via FFT, so an iteration costs
+#     O(n + m + g^2 log g) instead of O(n^2).
+#   - draw_graph(): draws all edges as a single LineCollection and all
+#     nodes as a single scatter, instead of one artist per element.
+#   - cached_layout(): layouts keyed by a hash of the graph structure
+#     (and layout parameters), kept in memory and on disk so every plot
+#     of the same graph reuses one set of node positions.
+#   - save_*_plot(): the base, centrality and community figures, shared
+#     by market_surveillance.py and the pipeline's render stage (the
+#     community figure can draw the MsgCount between communities).
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import hashlib
+import os
+import numpy as np
+from scipy.signal import fftconvolve
+from matplotlib.collections import LineCollection
+
+
+# Graphs up to this many nodes use exact all-pairs repulsion.
+EXACT_MAX_NODES = 2000
+
+# Directory used by cached_layout() for layouts saved on disk.
+CACHE_DIR = '.layout_cache'
+
+# Community plots only label the communities up to this count.
+LABEL_MAX_COMMUNITIES = 500
+
+_LAYOUTS = {}
+
+
+def graph_hash(graph):
+	# Hash of the graph structure (CSR arrays and node names).
+	digest = hashlib.sha256()
+	digest.update(np.ascontiguousarray(graph.indptr).tobytes())
+	digest.update(np.ascontiguousarray(graph.indices).tobytes())
+	digest.update('\x00'.join(map(str, graph.names.tolist())).encode('utf-8'))
+	return digest.hexdigest()
+
+
+def cached_layout(graph, cache_dir=CACHE_DIR, **params):
+	# Return force_layout(graph, **params), computing it only once per
+	# graph structure and parameter set. Layouts are kept in memory and,
+	# unless cache_dir is None, in .npy files under cache_dir. Each call
+	# returns its own copy, so callers can not change the cached one.
+	key = graph_hash(graph) + '-' + hashlib.sha256(
+		repr(sorted(params.items())).encode('utf-8')
+	).hexdigest()[:16]
+	if key in _LAYOUTS:
+		return _LAYOUTS[key].copy()
+	path = None if cache_dir is None else os.path.join(cache_dir, key + '.npy')
+	if path is not None and os.path.exists(path):
+		pos = np.load(path)
+	else:
+		pos = force_layout(graph, **params)
+		if path is not None:
+			os.makedirs(cache_dir, exist_ok=True)
+			np.save(path, pos)
+	_LAYOUTS[key] = pos
+	return pos.copy()
+
+
+def force_layout(graph, iterations=50, seed=None, grid=None):
+	# Fruchterman-Reingold force layout. Returns an (n, 2) array of
+	# positions in [-1, 1]^2, indexed by node ID. grid sets the number
+	# of density grid cells per side used for the approximate
+	# repulsion (chosen from n by default; 0 forces exact repulsion).
+	n = graph.number_of_nodes()
+	rng = np.random.default_rng(seed)
+	if n == 0:
+		return np.zeros((0, 2))
+	if n == 1:
+		return np.zeros((1, 2))
+	src, dst, _ = graph.edge_arrays()
+	off = src != dst
+	src = src[off]
+	dst = dst[off]
+
+	pos = rng.random((n, 2))
+	k = np.sqrt(1.0 / n)
+	if grid is None:
+		grid = 0 if n <= EXACT_MAX_NODES else int(min(512, np.sqrt(n) / 2))
+	temperature = 0.1
+	cooling = temperature / (iterations + 1)
+	for _ in range(iterations):
+		if grid > 0:
+			disp = _grid_repulsion(pos, k, grid)
+		else:
+			disp = _exact_repulsion(pos, k)
+
+		# Attraction along the edges: d^2 / k towards each other.
+		delta = pos[src] - pos[dst]
+		dist = np.maximum(np.linalg.norm(delta, axis=1), 0.01)
+		pull = delta * (dist / k)[:, None]
+		for axis in range(2):
+			disp[:, axis] -= np.bincount(src, weights=pull[:, axis], minlength=n)
+			disp[:, axis] += np.bincount(dst, weights=pull[:, axis], minlength=n)
+
+		# Move every node by at most the current temperature.
+		length = np.maximum(np.linalg.norm(disp, axis=1), 0.01)
+		pos += disp * (np.minimum(length, temperature) / length)[:, None]
+		temperature -= cooling
+
+	# Rescale to [-1, 1] around the center, as nx.spring_layout does.
+	pos -= pos.mean(axis=0)
+	scale = np.abs(pos).max()
+	if scale > 0:
+		pos /= scale
+	return pos
+
+
+def draw_graph(ax, graph, pos, node_color='green', node_size=50, cmap=None,
+		norm=None, edge_color='k', edge_width=1.0, node_label=None,
+		edge_label=None):
+	# Draw every edge through one LineCollection and every node through
+	# one scatter call. Returns (node_artist, edge_artist).
+	src, dst, _ = graph.edge_arrays()
+	off = src != dst
+	segments = np.stack([pos[src[off]], pos[dst[off]]], axis=1)
+	edges = LineCollection(
+		segments, colors=edge_color, linewidths=edge_width, label=edge_label,
+		zorder=1
+	)
+	ax.add_collection(edges)
+	nodes = ax.scatter(
+		pos[:, 0], pos[:, 1], s=node_size, c=node_color, cmap=cmap,
+		norm=norm, label=node_label, zorder=2
+	)
+	ax.autoscale_view()
+	ax.set_axis_off()
+	return nodes, edges
+
+
+def community_positions(pos, membership):
+	# Place each community at the centroid of its members' positions,
+	# so a community plot reuses the node layout instead of computing
+	# a new one.
+	membership = np.asarray(membership)
+	size = membership.max() + 1
+	counts = np.bincount(membership, minlength=size)[:, None]
+	sums = np.stack([
+		np.bincount(membership, weights=pos[:, axis], minlength=size)
+		for axis in range(2)
+	], axis=1)
+	return sums / np.maximum(counts, 1)
+
+
+def save_base_plot(graph, pos, path, dpi=400):
+	# Node graph of the communications data.
+	import matplotlib.pyplot as plt
+	fig = plt.figure(figsize=[12, 8])
+	draw_graph(
+		plt.gca(), graph, pos, node_size=50, node_color='green',
+		edge_width=2.0, node_label='Participants',
+		edge_label='Number of Messages'
+	)
+	plt.title(
+		'Node Graph for Communications Data', fontsize=22,
+		fontname='Arial'
+	)
+	plt.box(on=None)
+	plt.axis('off')
+	plt.legend(bbox_to_anchor=(1, 0), loc='best', ncol=1)
+	fig.savefig(path, dpi=dpi)
+	plt.close(fig)
+
+
+def save_centrality_plot(graph, pos, measures, path, dpi=400):
+	# One subplot per (title, values) pair in measures, with nodes
+	# colored on a symmetric log scale.
+	import matplotlib.pyplot as plt
+	import matplotlib.colors as mcolors
+	fig = plt.figure(figsize=[8 * len(measures), 8])
+	for i, (title, values) in enumerate(measures):
+		plt.subplot(1, len(measures), i + 1)
+		nodes, _ = draw_graph(
+			plt.gca(), graph, pos, node_size=100, node_color=values,
+			cmap=plt.cm.viridis,
+			norm=mcolors.SymLogNorm(linthresh=0.01, linscale=1)
+		)
+		plt.title(title, fontsize=22, fontname='Arial')
+		plt.colorbar(nodes)
+		plt.axis('off')
+	fig.savefig(path, dpi=dpi)
+	plt.close(fig)
+
+
+def save_community_plot(pos, membership, modularity, path, title, dpi=400,
+		graph=None):
+	# One node per community, placed at the centroid of its members in
+	# the node layout (see community_positions()). graph is the optional
+	# community graph (coarsen.coarsen()); its edges are drawn between
+	# the communities with widths scaled by their MsgCount.
+	import matplotlib.pyplot as plt
+	centroids = community_positions(pos, membership)
+	fig = plt.figure(figsize=[12, 8])
+	ax = plt.gca()
+	if graph is not None:
+		src, dst, weights = graph.edge_arrays()
+		off = src != dst
+		if np.any(off):
+			widths = 0.2 + 3.0 * weights[off] / weights[off].max()
+			ax.add_collection(LineCollection(
+				np.stack([centroids[src[off]], centroids[dst[off]]], axis=1),
+				colors='gray', linewidths=widths, zorder=1,
+				label='MsgCount between communities'
+			))
+	ax.scatter(
+		centroids[:, 0], centroids[:, 1], s=160, zorder=2,
+		label='Modularity =' + str(round(modularity, 3)) +
+			', Communities=' + str(len(centroids))
+	)
+	if len(centroids) <= LABEL_MAX_COMMUNITIES:
+		for community_num, (x, y) in enumerate(centroids.tolist()):
+			ax.text(
+				x, y, str(community_num), fontsize=11, ha='center',
+				va='center', zorder=3
+			)
+	plt.suptitle(title, fontsize=22, fontname='Arial')
+	plt.box(on=None)
+	plt.axis('off')
+	plt.legend(bbox_to_anchor=(0,1), loc='best', ncol=1)
+	fig.savefig(path, dpi=dpi, bbox_inches='tight')
+	plt.close(fig)
+
+
+def _exact_repulsion(pos, k):
+	# k^2 / d away from every other node.
+	delta = pos[:, None, :] - pos[None, :, :]
+	dist2 = np.maximum((delta ** 2).sum(axis=2), 1e-4)
+	np.fill_diagonal(dist2, np.inf)
+	return (delta * (k * k / dist2)[:, :, None]).sum(axis=1)
+
+
+def _grid_repulsion(pos, k, grid):
+	# Bin the nodes into a grid x grid density map and convolve it with
+	# the k^2 / d repulsion kernel (FFT), then read the force back at
+	# each node's cell. Pairs in the same cell do not repel each other.
+	lo = pos.min(axis=0)
+	span = np.maximum(pos.max(axis=0) - lo, 1e-9)
+	cell = span / grid
+	ij = np.minimum(((pos - lo) / cell).astype(np.int64), grid - 1)
+	density = np.bincount(
+		ij[:, 0] * grid + ij[:, 1], minlength=grid * grid
+	).reshape(grid, grid).astype(np.float64)
+
+	offsets = np.arange(-(grid - 1), grid)
+	dx = offsets[:, None] * cell[0]
+	dy = offsets[None, :] * cell[1]
+	dist2 = dx * dx + dy * dy
+	dist2[grid - 1, grid - 1] = np.inf
+	scale = k * k / dist2
+	fx = fftconvolve(density, dx * scale, mode='same')
+	fy = fftconvolve(density, dy * scale, mode='same')
+	return np.stack([fx[ij[:, 0], ij[:, 1]], fy[ij[:, 0], ij[:, 1]]], axis=1)
@@ -0,0 +1,529 @@
+# service.py
+# Small asyncio HTTP service answering queries about a loaded graph
+# snapshot, so analysts do not have to rerun the whole analysis and
+# read CSV/PNG files:
+#   GET /health
+#   GET /community/<participant>         community and its members
+#   GET /centrality/<participant>        centrality values and ranks
+#   GET /top?measure=eigenvector&k=10    top-k influencers
+#   GET /cliques/<participant>?min_size=2
+#   GET /ego/<participant>?k=1           k-hop ego network
+#   POST /reload                         reload the snapshot files
+# The snapshot (graph, communities, centralities and rank arrays) is
+# loaded once. Cheap lookups are answered on the event loop; clique and
+# ego network queries run in a process pool whose workers map the CSR
+# arrays from shared memory (as closeness.py does), so memory does not
+# grow with the number of workers. Workers only see node IDs; names are
+# filled in on the event loop. Responses are kept in an LRU cache with a
+# TTL,
+# which is cleared whenever a new snapshot is loaded. Only the standard
+# library is used for HTTP, and TestClient runs the server in-process
+# for local testing:
+#   async with TestClient(service) as client:
+#       status, body = await client.get('/community/P1')
+# Python 3.8+ (multiprocessing.shared_memory)
+# Windows/MacOS/Linux
+
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs, unquote
+import numpy as np
+import scipy.sparse as sp
+from csr_graph import CSRGraph, expand, index_arrays, share_arrays
+from csr_graph import attach_arrays, release_arrays
+from louvain import IncrementalLouvain
+from centrality import compute_centralities, top_k
+from cliques import find_cliques
+
+
+# Ego networks with more nodes than this are refused.
+EGO_MAX_NODES = 10000
+
+# Clique queries stop after this many cliques or seconds; the response
+# then has "truncated" set.
+CLIQUES_MAX = 10000
+CLIQUES_TIME_LIMIT = 10.0
+
+# Default result cache size (entries) and time-to-live (seconds).
+CACHE_SIZE = 4096
+CACHE_TTL = 300.0
+
+_STATUS = {
+	200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+	405: 'Method Not Allowed', 500: 'Internal Server Error',
+}
+
+
+class QueryError(Exception):
+	# Error returned to the client with an HTTP status.
+	def __init__(self, status, message):
+		super().__init__(message)
+		self.status = status
+
+
+class ResultCache:
+	# LRU cache whose entries also expire ttl seconds after insertion.
+	def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+
+	def get(self, key):
+		entry = self.entries.get(key)
+		if entry is None or entry[0] < time.monotonic():
+			if entry is not None:
+				del self.entries[key]
+			self.misses += 1
+			return None
+		self.entries.move_to_end(key)
+		self.hits += 1
+		return entry[1]
+
+
+	def put(self, key, value):
+		self.entries[key] = (time.monotonic() + self.ttl, value)
+		self.entries.move_to_end(key)
+		while len(self.entries) > self.maxsize:
+			self.entries.popitem(last=False)
+
+
+	def clear(self):
+		self.entries.clear()
+
+
+class Snapshot:
+	# A graph with its communities, centralities and per-measure ranks
+	# (1 = largest value).
+	def __init__(self, graph, membership, centralities):
+		self.graph = graph
+		self.membership = np.asarray(membership)
+		self.centralities = centralities
+		self.ranks = {}
+		for name, values in centralities.items():
+			order = np.argsort(-np.asarray(values), kind='stable')
+			rank = np.empty(len(order), dtype=np.int64)
+			rank[order] = np.arange(1, len(order) + 1)
+			self.ranks[name] = rank
+		self.members = {}
+		if len(self.membership) > 0:
+			order = np.argsort(self.membership, kind='stable')
+			bounds = np.flatnonzero(np.diff(self.membership[order])) + 1
+			for group in np.split(order, bounds):
+				self.members[int(self.membership[group[0]])] = group
+
+
+	@classmethod
+	def load(cls, graph_path, louvain_path=None, centrality_path=None,
+			seed=None):
+		# Load a graph saved with CSRGraph.save() (e.g. the pipeline's
+		# graph.npz) plus, optionally, the Louvain state and centrality
+		# vectors written by the pipeline. Whatever is missing is
+		# computed here.
+		graph = CSRGraph.load(graph_path)
+		if louvain_path is not None:
+			louvain_state = IncrementalLouvain.load(louvain_path)
+		else:
+			louvain_state = IncrementalLouvain(graph, seed=seed)
+		partition = louvain_state.partition()
+		membership = [partition[name] for name in graph.names.tolist()]
+		if centrality_path is not None:
+			with np.load(centrality_path) as data:
+				centralities = {name: data[name] for name in data.files}
+		else:
+			centralities = compute_centralities(graph)
+		return cls(graph, membership, centralities)
+
+
+class GraphService:
+	def __init__(self, loader, workers=None, cache_size=CACHE_SIZE,
+			ttl=CACHE_TTL):
+		# loader is a callable returning a Snapshot; it is called now
+		# and again on every reload.
+		self.loader = loader
+		self.workers = workers
+		self.cache = ResultCache(cache_size, ttl)
+		self.snapshot = None
+		self.version = 0
+		self.pool = None
+		self.blocks = []
+		self.server = None
+		self.routes = {
+			'health': self.health,
+			'community': self.community,
+			'centrality': self.centrality,
+			'top': self.top,
+			'cliques': self.cliques,
+			'ego': self.ego,
+		}
+		self.load(loader())
+
+
+	def load(self, snapshot):
+		# Swap in a new snapshot: share the new graph's CSR arrays,
+		# restart the worker pool on them and invalidate every cached
+		# result. The old pool finishes its queries in the background
+		# before its shared arrays are released.
+		# Workers are spawned rather than forked, so they never inherit
+		# the event loop or open client sockets.
+		graph = snapshot.graph
+		blocks, specs = share_arrays(index_arrays(graph) + (graph.weights,))
+		try:
+			pool = ProcessPoolExecutor(
+				max_workers=self.workers,
+				mp_context=multiprocessing.get_context('spawn'),
+				initializer=_init_worker,
+				initargs=(specs, graph.number_of_nodes())
+			)
+			# Start the workers now rather than on the first heavy query.
+			pool.submit(_ping)
+		except BaseException:
+			release_arrays(blocks)
+			raise
+		old = (self.pool, self.blocks)
+		self.snapshot = snapshot
+		self.pool = pool
+		self.blocks = blocks
+		self.version += 1
+		self.cache.clear()
+		if old[0] is not None:
+			threading.Thread(target=_retire, args=old).start()
+
+
+	async def reload(self):
+		loop = asyncio.get_running_loop()
+		snapshot = await loop.run_in_executor(None, self.loader)
+		self.load(snapshot)
+		return {'version': self.version, 'nodes': snapshot.graph.number_of_nodes()}
+
+
+	async def query(self, method, target):
+		# Answer one request. Returns (status, JSON-serializable body).
+		parts = urlsplit(target)
+		segments = [unquote(s) for s in parts.path.split('/') if s != '']
+		params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+		try:
+			if segments == ['reload']:
+				if method != 'POST':
+					raise QueryError(405, 'Use POST to reload')
+				return 200, await self.reload()
+			if method != 'GET':
+				raise QueryError(405, f'Unsupported method {method}')
+			if len(segments) == 0 or segments[0] not in self.routes:
+				raise QueryError(404, f'Unknown endpoint {parts.path}')
+			if segments[0] == 'health':
+				return 200, await self.health(segments[1:], params)
+			key = (self.version, tuple(segments), tuple(sorted(params.items())))
+			result = self.cache.get(key)
+			if result is None:
+				version = self.version
+				result = await self.routes[segments[0]](segments[1:], params)
+				if version == self.version:
+					self.cache.put(key, result)
+			return 200, result
+		except QueryError as e:
+			return e.status, {'error': str(e)}
+		except Exception as e:
+			return 500, {'error': repr(e)}
+
+
+	async def health(self, args, params):
+		return {
+			'version': self.version,
+			'nodes': self.snapshot.graph.number_of_nodes(),
+			'edges': self.snapshot.graph.number_of_edges(),
+			'cache_entries': len(self.cache.entries),
+			'cache_hits': self.cache.hits,
+			'cache_misses': self.cache.misses,
+		}
+
+
+	async def community(self, args, params):
+		node = self._node(args)
+		snapshot = self.snapshot
+		community = int(snapshot.membership[node])
+		members = snapshot.members[community]
+		return {
+			'participant': args[0],
+			'community': community,
+			'size': len(members),
+			'members': snapshot.graph.names[members].tolist(),
+		}
+
+
+	async def centrality(self, args, params):
+		node = self._node(args)
+		snapshot = self.snapshot
+		return {
+			'participant': args[0],
+			'nodes': snapshot.graph.number_of_nodes(),
+			'values': {
+				name: float(values[node])
+				for name, values in snapshot.centralities.items()
+			},
+			'ranks': {
+				name: int(rank[node]) for name, rank in snapshot.ranks.items()
+			},
+		}
+
+
+	async def top(self, args, params):
+		measure = params.get('measure', 'eigenvector')
+		if measure not in self.snapshot.centralities:
+			raise QueryError(400, f'Unknown measure {measure}')
+		k = _int(params, 'k', 10)
+		values = self.snapshot.centralities[measure]
+		ids = top_k(values, k)
+		return {
+			'measure': measure,
+			'top': [
+				{'participant': name, 'value': float(value)}
+				for name, value in zip(
+					self.snapshot.graph.names[ids].tolist(), values[ids].tolist()
+				)
+			],
+		}
+
+
+	async def cliques(self, args, params):
+		node = self._node(args)
+		min_size = _int(params, 'min_size', 2)
+		names = self.snapshot.graph.names
+		cliques, truncated = await self._run(
+			_cliques_of, node, min_size, CLIQUES_MAX, CLIQUES_TIME_LIMIT
+		)
+		return {
+			'participant': args[0],
+			'cliques': [names[clique].tolist() for clique in cliques],
+			'truncated': truncated,
+		}
+
+
+	async def ego(self, args, params):
+		node = self._node(args)
+		k = _int(params, 'k', 1)
+		ids, rows, cols, weights = await self._run(_ego_network, node, k, EGO_MAX_NODES)
+		if ids is None:
+			raise QueryError(400, f'Ego network has more than {EGO_MAX_NODES} nodes')
+		names = self.snapshot.graph.names[ids]
+		edges = [
+			[u, v, w] for u, v, w in zip(
+				names[rows].tolist(), names[cols].tolist(), weights.tolist()
+			)
+		]
+		return {'participant': args[0], 'k': k, 'nodes': names.tolist(), 'edges': edges}
+
+
+	async def serve(self, host='127.0.0.1', port=8080):
+		# Start listening; returns the asyncio server.
+		self.server = await asyncio.start_server(self._handle, host, port)
+		return self.server
+
+
+	async def close(self):
+		if self.server is not None:
+			self.server.close()
+			await self.server.wait_closed()
+			self.server = None
+		if self.pool is not None:
+			_retire(self.pool, self.blocks)
+			self.pool = None
+			self.blocks = []
+
+
+	async def _run(self, func, *args):
+		# Run a CPU-heavy query in the worker pool.
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(self.pool, func, *args)
+
+
+	def _node(self, args):
+		if len(args) != 1:
+			raise QueryError(404, 'Expected /<endpoint>/<participant>')
+		ids = self.snapshot.graph.node_ids([args[0]])
+		if ids[0] < 0:
+			raise QueryError(404, f'Unknown participant {args[0]}')
+		return int(ids[0])
+
+
+	async def _handle(self, reader, writer):
+		# Minimal HTTP/1.1: one request per connection.
+		try:
+			request = (await reader.readline()).decode('latin-1').split()
+			length = 0
+			while True:
+				line = await reader.readline()
+				if line in (b'\r\n', b'\n', b''):
+					break
+				name, _, value = line.decode('latin-1').partition(':')
+				if name.strip().lower() == 'content-length':
+					length = int(value.strip())
+			if length > 0:
+				await reader.readexactly(length)
+			if len(request) < 2:
+				status, body = 400, {'error': 'Malformed request'}
+			else:
+				status, body = await self.query(request[0].upper(), request[1])
+			payload = json.dumps(body).encode('utf-8')
+			writer.write(
+				f'HTTP/1.1 {status} {_STATUS.get(status, "")}\r\n'
+				f'Content-Type: application/json\r\n'
+				f'Content-Length: {len(payload)}\r\n'
+				f'Connection: close\r\n\r\n'.encode('latin-1') + payload
+			)
+			await writer.drain()
+		finally:
+			writer.close()
+
+
+class TestClient:
+	# In-process client: serves the service on a free local port for
+	# the duration of an "async with" block and sends real HTTP
+	# requests to it.
+	def __init__(self, service):
+		self.service = service
+		self.port = None
+
+
+	async def __aenter__(self):
+		server = await self.service.serve('127.0.0.1', 0)
+		self.port = server.sockets[0].getsockname()[1]
+		return self
+
+
+	async def __aexit__(self, *exc):
+		await self.service.close()
+
+
+	async def request(self, method, path):
+		# Returns (status, parsed JSON body).
+		reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+		writer.write(
+			f'{method} {path} HTTP/1.1\r\nHost: localhost\r\n'
+			f'Content-Length: 0\r\n\r\n'.encode('latin-1')
+		)
+		await writer.drain()
+		status = int((await reader.readline()).split()[1])
+		length = 0
+		while True:
+			line = await reader.readline()
+			if line in (b'\r\n', b''):
+				break
+			name, _, value = line.decode('latin-1').partition(':')
+			if name.strip().lower() == 'content-length':
+				length = int(value.strip())
+		body = await reader.readexactly(length)
+		writer.close()
+		return status, json.loads(body.decode('utf-8'))
+
+
+	async def get(self, path):
+		return await self.request('GET', path)
+
+
+	async def post(self, path):
+		return await self.request('POST', path)
+
+
+def _int(params, name, default):
+	try:
+		return int(params.get(name, default))
+	except ValueError:
+		raise QueryError(400, f'{name} must be an integer')
+
+
+def _retire(pool, blocks):
+	# Wait for a replaced (or closed) pool's workers to finish, then
+	# release the shared arrays they mapped.
+	pool.shutdown(wait=True)
+	release_arrays(blocks)
+
+
+# Worker process state: the shared CSR arrays of the snapshot graph and
+# its adjacency matrix over them.
+_INDPTR = None
+_INDICES = None
+_ADJ = None
+
+
+def _init_worker(specs, n):
+	global _INDPTR, _INDICES, _ADJ
+	_INDPTR, _INDICES, weights = attach_arrays(specs)
+	_ADJ = sp.csr_matrix((weights, _INDICES, _INDPTR), shape=(n, n), copy=False)
+
+
+def _ping():
+	return True
+
+
+def _ego_network(node, k, max_nodes):
+	# IDs of the nodes within k hops of node and the edges among them
+	# (rows and columns index into the IDs), or Nones if there are more
+	# than max_nodes of them.
+	ids = expand(_INDPTR, _INDICES, [node], k, max_nodes)
+	if ids is None:
+		return None, None, None, None
+	sub = sp.triu(_ADJ[ids][:, ids]).tocoo()
+	return ids, sub.row, sub.col, sub.data
+
+
+def _cliques_of(node, min_size, max_cliques, time_limit):
+	# Maximal cliques (as node ID arrays) containing node, and whether
+	# max_cliques or time_limit cut the search short. Every such clique
+	# lies in the closed neighborhood of node, and is maximal there
+	# exactly when it is maximal in the whole graph, so only that
+	# subgraph is searched.
+	ids = expand(_INDPTR, _INDICES, [node], 1)
+	sub = sp.triu(_ADJ[ids][:, ids]).tocoo()
+	graph = CSRGraph.from_arrays(sub.row, sub.col, sub.data, ids)
+	stream = find_cliques(graph, min_size=min_size, time_limit=time_limit)
+	cliques = []
+	for clique in stream:
+		if node in clique:
+			if len(cliques) == max_cliques:
+				return cliques, True
+			cliques.append(np.asarray(clique, dtype=np.int64))
+	return cliques, stream.truncated
+
+
+def main():
+	parser = argparse.ArgumentParser(
+		description='Serve graph queries over HTTP.'
+	)
+	parser.add_argument('graph', help='Graph .npz written by CSRGraph.save().')
+	parser.add_argument('--louvain', default=None, help='Louvain state .npz.')
+	parser.add_argument('--centrality', default=None, help='Centrality .npz.')
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=8080)
+	parser.add_argument('--workers', type=int, default=None)
+	parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+	parser.add_argument('--ttl', type=float, default=CACHE_TTL)
+	args = parser.parse_args()
+
+	async def run():
+		service = GraphService(
+			lambda: Snapshot.load(args.graph, args.louvain, args.centrality),
+			args.workers, args.cache_size, args.ttl
+		)
+		server = await service.serve(args.host, args.port)
+		print(f'Serving on http://{args.host}:{args.port}')
+		async with server:
+			await server.serve_forever()
+
+	asyncio.run(run())
+
+	# Exit the program.
+	exit(0)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,71 @@
+# test_benchmark_suite.py
+# Smoke runs of the benchmark suite: a multi-process closeness step,
+# per-step memory and the --compare exit status.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import json
+import sys
+import pytest
+import benchmark_suite
+from closeness import BATCH_BYTES
+
+
+def test_closeness_with_worker_pool():
+	# 10^4 edges gives ~3300 nodes, more than one BFS batch, so the
+	# step's own process pool is started inside the step's child.
+	edges = 10000
+	n = edges * 2 // benchmark_suite.AVERAGE_DEGREE
+	assert n > BATCH_BYTES // (8 * n)
+	results = benchmark_suite.run_suite(
+		['ba'], [edges], ['closeness'], timeout=300, verbose=False, workers=2
+	)
+	assert len(results) == 1
+	assert results[0]['status'] == 'ok', results[0]['detail']
+	assert results[0]['detail'] == 'exact'
+
+
+def test_failed_step_is_recorded():
+	results = benchmark_suite.run_suite(
+		['ba'], [1000], ['no-such-step'], timeout=60, verbose=False
+	)
+	assert results[0]['status'] == 'error'
+
+
+def test_step_memory_excludes_setup():
+	# Degree centrality allocates a few arrays of n floats; generating
+	# the graph and building its DataFrame and CSR allocate far more.
+	results = benchmark_suite.run_suite(
+		['ba'], [300000], ['generate', 'degree'], timeout=300, verbose=False
+	)
+	generate, degree = results
+	assert generate['status'] == degree['status'] == 'ok'
+	if degree['step_rss_mb'] is None:
+		return
+	assert degree['step_rss_mb'] < 20
+	assert degree['step_rss_mb'] < generate['step_rss_mb']
+
+
+def test_compare_exits_with_regressions(tmp_path, monkeypatch):
+	baseline = tmp_path / 'baseline.json'
+	run = ['benchmark_suite.py', '--models', 'ba', '--edges', '1000', '--steps', 'degree']
+	monkeypatch.chdir(tmp_path)
+	monkeypatch.setattr(sys, 'argv', run + ['--out', str(baseline)])
+	with pytest.raises(SystemExit) as exit_info:
+		benchmark_suite.main()
+	assert exit_info.value.code == 0
+
+	with open(baseline) as f:
+		results = json.load(f)
+	for record in results['results']:
+		record['seconds'] = 1e-9
+	with open(baseline, 'w') as f:
+		json.dump(results, f)
+	monkeypatch.setattr(
+		sys, 'argv',
+		run + ['--out', str(tmp_path / 'new.json'), '--compare', str(baseline)]
+	)
+	with pytest.raises(SystemExit) as exit_info:
+		benchmark_suite.main()
+	assert exit_info.value.code == 1
@@ -0,0 +1,93 @@
+# test_centrality.py
+# Tests of the CSR graph and the vectorized centralities against
+# networkx.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import networkx as nx
+import numpy as np
+import pytest
+from csr_graph import CSRGraph
+from centrality import compute_centralities, eigenvector_centrality
+from centrality import save_vector, top_k, top_k_dict, warm_start
+
+
+def weighted_graph(seed=0):
+	G = nx.barabasi_albert_graph(400, 3, seed=seed)
+	rng = np.random.default_rng(seed)
+	for u, v in G.edges():
+		G[u][v]['MsgCount'] = int(rng.integers(1, 10))
+	G.add_edge(5, 5, MsgCount=4)
+	return G
+
+
+def test_csr_graph_matches_networkx(tmp_path):
+	G = weighted_graph()
+	graph = CSRGraph.from_networkx(G)
+	assert graph.number_of_nodes() == G.number_of_nodes()
+	assert graph.number_of_edges() == G.number_of_edges()
+	np.testing.assert_array_equal(graph.degree(), [G.degree(u) for u in graph.names])
+	np.testing.assert_allclose(
+		graph.strength(), [G.degree(u, weight='MsgCount') for u in graph.names]
+	)
+	for u in [0, 5, 17]:
+		assert set(graph.names[graph.neighbors(graph.node_id(u))]) == set(G[u])
+	assert nx.utils.graphs_equal(graph.to_networkx(), G)
+
+	graph.save(tmp_path / 'graph.npz')
+	loaded = CSRGraph.load(tmp_path / 'graph.npz')
+	np.testing.assert_array_equal(loaded.indptr, graph.indptr)
+	np.testing.assert_array_equal(loaded.indices, graph.indices)
+	np.testing.assert_array_equal(loaded.weights, graph.weights)
+
+
+def test_centralities_match_networkx():
+	G = weighted_graph()
+	G.remove_edge(5, 5)
+	graph = CSRGraph.from_networkx(G)
+	values = compute_centralities(graph, tol=1e-10, max_iter=1000)
+	expected = {
+		'degree': nx.degree_centrality(G),
+		'strength': dict(G.degree(weight='MsgCount')),
+		'eigenvector': nx.eigenvector_centrality(G, tol=1e-10, max_iter=1000),
+	}
+	for measure, values_nx in expected.items():
+		np.testing.assert_allclose(
+			values[measure], [values_nx[u] for u in graph.names], atol=1e-6
+		)
+	weighted = eigenvector_centrality(graph, weighted=True, tol=1e-10, max_iter=1000)
+	weighted_nx = nx.eigenvector_centrality(
+		G, tol=1e-10, max_iter=1000, weight='MsgCount'
+	)
+	np.testing.assert_allclose(weighted, [weighted_nx[u] for u in graph.names], atol=1e-6)
+
+	top = top_k_dict(graph, values['degree'], 10)
+	assert list(top.values()) == sorted(expected['degree'].values(), reverse=True)[:10]
+
+
+def test_warm_start(tmp_path):
+	G = weighted_graph()
+	graph = CSRGraph.from_networkx(G)
+	cold = eigenvector_centrality(graph, tol=1e-10, max_iter=1000)
+	save_vector(tmp_path / 'vector.npz', graph, cold)
+	G.add_edge(0, 399)
+	G.add_edge(399, 'new')
+	changed = CSRGraph.from_networkx(G)
+	start = warm_start(tmp_path / 'vector.npz', changed)
+	assert start.shape == (changed.number_of_nodes(),)
+	expected = nx.eigenvector_centrality(G, tol=1e-10, max_iter=1000)
+	np.testing.assert_allclose(
+		eigenvector_centrality(changed, tol=1e-10, max_iter=1000, start=start),
+		[expected[u] for u in changed.names], atol=1e-6
+	)
+	assert warm_start(tmp_path / 'missing.npz', changed) is None
+	with pytest.raises(ValueError):
+		eigenvector_centrality(changed, start=np.ones(3))
+
+
+def test_top_k():
+	values = np.array([0.3, 0.9, 0.1, 0.9, 0.5])
+	assert top_k(values, 3).tolist() == [1, 3, 4]
+	assert top_k(values, 10).tolist() == [1, 3, 4, 0, 2]
+	assert top_k(values, 0).tolist() == []
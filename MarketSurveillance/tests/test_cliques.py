@@ -0,0 +1,56 @@
+# test_cliques.py
+# Tests of the streaming maximal-clique enumeration against networkx,
+# and of the truncation flag set by max_cliques and time_limit.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import networkx as nx
+from csr_graph import CSRGraph
+from cliques import find_cliques
+
+
+def expected_cliques(G, min_size=1, max_size=None):
+	return sorted(
+		sorted(clique) for clique in nx.find_cliques(G)
+		if len(clique) >= min_size and (max_size is None or len(clique) <= max_size)
+	)
+
+
+def test_cliques_match_networkx():
+	G = nx.gnm_random_graph(200, 1500, seed=3)
+	graph = CSRGraph.from_networkx(G)
+	for min_size, max_size in [(1, None), (3, None), (2, 4)]:
+		for degeneracy in [True, False]:
+			cliques = find_cliques(
+				graph, min_size=min_size, max_size=max_size, degeneracy=degeneracy
+			)
+			assert sorted(sorted(clique) for clique in cliques) == expected_cliques(
+				G, min_size, max_size
+			)
+			assert cliques.truncated is False
+	cliques = find_cliques(graph, min_size=3, workers=2)
+	assert sorted(sorted(clique) for clique in cliques) == expected_cliques(G, 3)
+	assert cliques.truncated is False
+
+
+def test_max_cliques_truncates():
+	G = nx.gnm_random_graph(200, 1500, seed=3)
+	graph = CSRGraph.from_networkx(G)
+	total = len(expected_cliques(G, 2))
+	cliques = find_cliques(graph, min_size=2, max_cliques=10)
+	assert len(list(cliques)) == 10
+	assert cliques.truncated is True
+	assert cliques.reason == 'max_cliques'
+	# Reaching the cap with nothing left over is not a truncation.
+	cliques = find_cliques(graph, min_size=2, max_cliques=total)
+	assert len(list(cliques)) == total
+	assert cliques.truncated is False
+
+
+def test_time_limit_truncates():
+	graph = CSRGraph.from_networkx(nx.gnm_random_graph(2000, 40000, seed=3))
+	cliques = find_cliques(graph, min_size=2, time_limit=0)
+	list(cliques)
+	assert cliques.truncated is True
+	assert cliques.reason == 'time_limit'
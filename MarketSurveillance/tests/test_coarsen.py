@@ -0,0 +1,86 @@
+# test_coarsen.py
+# Tests of the community graph (coarsen) and of the graph samplers.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import networkx as nx
+import numpy as np
+import pytest
+from csr_graph import CSRGraph
+from coarsen import SAMPLERS, coarsen, degree_distance, induced_subgraph
+from coarsen import sample, sample_graph
+from louvain import louvain_membership, modularity
+
+
+def graphs():
+	# Graphs with heavy-tailed, narrow and Poisson degree distributions.
+	return {
+		'barabasi-albert': nx.barabasi_albert_graph(5000, 3, seed=1),
+		'watts-strogatz': nx.connected_watts_strogatz_graph(5000, 6, 0.1, seed=1),
+		'erdos-renyi': nx.gnm_random_graph(5000, 15000, seed=1),
+	}
+
+
+@pytest.fixture(scope='module', params=sorted(graphs()))
+def graph_and_membership(request):
+	graph = CSRGraph.from_networkx(graphs()[request.param])
+	return graph, louvain_membership(graph, seed=1)
+
+
+def test_coarsen_keeps_modularity():
+	G = nx.karate_club_graph()
+	for u, v in G.edges():
+		G[u][v]['MsgCount'] = 1 + (u * v) % 5
+	graph = CSRGraph.from_networkx(G)
+	membership = louvain_membership(graph, seed=0)
+	communities = coarsen(graph, membership)
+	identity = dict(enumerate(range(communities.number_of_communities())))
+	fine = modularity(graph, graph.to_dict(membership))
+	assert modularity(communities.graph, identity) == pytest.approx(fine)
+	groups = [
+		set(communities.members(community).tolist())
+		for community in range(communities.number_of_communities())
+	]
+	assert fine == pytest.approx(
+		nx.community.modularity(G, groups, weight='MsgCount')
+	)
+	assert communities.sizes.sum() == graph.number_of_nodes()
+	assert communities.graph.strength().sum() == pytest.approx(graph.strength().sum())
+	for community in range(communities.number_of_communities()):
+		members = communities.member_ids(community)
+		assert np.all(membership[members] == community)
+		assert communities.drill_down(community).number_of_nodes() == len(members)
+
+
+@pytest.mark.parametrize('method', sorted(SAMPLERS))
+def test_sample_degree_distribution(graph_and_membership, method):
+	graph, membership = graph_and_membership
+	limit = 0.05 if method == 'stratified' else 0.3
+	for seed in range(3):
+		sampled = sample(graph, method, 500, seed=seed, membership=membership)
+		assert sampled.number_of_nodes() == 500
+		assert sampled.number_of_edges() == len(set(zip(*sampled.edge_arrays()[:2])))
+		assert degree_distance(graph, sampled) < limit
+		nodes = graph.node_ids(sampled.names)
+		assert degree_distance(graph, sampled) < degree_distance(
+			graph, induced_subgraph(graph, nodes)
+		)
+
+
+def test_sample_graph_keeps_degrees():
+	graph = CSRGraph.from_networkx(nx.gnm_random_graph(2000, 8000, seed=2))
+	nodes = np.arange(0, 2000, 4)
+	sampled = sample_graph(graph, nodes, seed=0)
+	assert np.all(sampled.row_ids() != sampled.indices)
+	lost = graph.degree()[nodes] - sampled.degree()
+	assert lost.min() >= 0
+	assert lost.sum() <= 0.01 * graph.degree()[nodes].sum()
+
+
+def test_sample_rejects_unknown_options():
+	graph = CSRGraph.from_networkx(nx.path_graph(10))
+	with pytest.raises(ValueError):
+		sample(graph, 'forest-fire', 5, walkers=4)
+	with pytest.raises(ValueError):
+		sample(graph, 'stratified', 5)
@@ -0,0 +1,86 @@
+# test_girvan_newman.py
+# Tests of the incremental Girvan-Newman against networkx.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import itertools
+import networkx as nx
+import numpy as np
+import pytest
+from csr_graph import CSRGraph
+from girvan_newman import edge_betweenness, girvan_newman, write_girvan_newman
+
+
+def karate():
+	G = nx.karate_club_graph()
+	for u, v in G.edges():
+		G[u][v]['MsgCount'] = 1
+	return G
+
+
+def groups(membership):
+	return {
+		frozenset(np.flatnonzero(membership == community).tolist())
+		for community in np.unique(membership)
+	}
+
+
+def test_edge_betweenness_matches_networkx():
+	G = nx.connected_watts_strogatz_graph(60, 4, 0.2, seed=1)
+	graph = CSRGraph.from_networkx(G)
+	src, dst, _ = graph.edge_arrays()
+	edges = list(zip(range(len(src)), src.tolist(), dst.tolist()))
+	nodes = list(range(graph.number_of_nodes()))
+	values = edge_betweenness(nodes, edges, nodes)
+	expected = nx.edge_betweenness_centrality(G, normalized=False)
+	for e, u, v in edges:
+		pair = (graph.names[u], graph.names[v])
+		value = expected[pair] if pair in expected else expected[pair[::-1]]
+		# Brandes from every source counts each pair of nodes twice;
+		# networkx halves it for undirected graphs.
+		assert values[e] == pytest.approx(2 * value)
+
+
+def test_splits_match_networkx():
+	G = karate()
+	graph = CSRGraph.from_networkx(G)
+	membership, q, history = girvan_newman(graph, patience=100)
+	levels = list(itertools.islice(nx.community.girvan_newman(G), len(history) - 1))
+	assert [communities for _, communities, _ in history[1:]] == [
+		len(level) for level in levels
+	]
+	for (_, _, q_level), level in zip(history[1:], levels):
+		assert q_level == pytest.approx(
+			nx.community.modularity(G, level, weight='MsgCount')
+		)
+	assert q == pytest.approx(max(q_level for _, _, q_level in history))
+	groups = {}
+	for node, community in graph.to_dict(membership).items():
+		groups.setdefault(community, set()).add(node)
+	assert q == pytest.approx(
+		nx.community.modularity(G, groups.values(), weight='MsgCount')
+	)
+
+
+def test_worker_pool_gives_the_same_partition(tmp_path):
+	graph = CSRGraph.from_networkx(
+		nx.relabel_nodes(
+			nx.connected_caveman_graph(12, 50), lambda node: f'P{node}'
+		)
+	)
+	serial = girvan_newman(graph, max_removals=30)
+	pooled = girvan_newman(graph, workers=2, max_removals=30)
+	# Communities may be numbered in another order.
+	assert groups(serial[0]) == groups(pooled[0])
+	assert serial[1] == pytest.approx(pooled[1])
+	partition, q = write_girvan_newman(
+		graph, str(tmp_path / 'communities.csv'), max_removals=30
+	)
+	assert len(set(partition.values())) == 12
+	assert q == pytest.approx(nx.community.modularity(
+		graph.to_networkx(), [
+			{name for name, c in partition.items() if c == community}
+			for community in set(partition.values())
+		], weight='MsgCount'
+	))
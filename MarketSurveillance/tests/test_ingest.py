@@ -0,0 +1,70 @@
+# test_ingest.py
+# Tests of the chunked chat log ingestion against a graph built row by
+# row with networkx, for every supported file type and chunk size.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+from csr_graph import CSRGraph
+from ingest import ingest_edges, ingest_graph
+
+
+def chat_log(rows=500, participants=40, seed=0):
+	rng = np.random.default_rng(seed)
+	df = pd.DataFrame({
+		'Inviter': rng.integers(0, participants, rows),
+		'Invitee': rng.integers(0, participants, rows),
+		'MsgCount': rng.integers(1, 20, rows),
+	})
+	df['Inviter'] = 'P' + df['Inviter'].astype(str)
+	df['Invitee'] = 'P' + df['Invitee'].astype(str)
+	df.loc[::37, 'Invitee'] = None
+	return df
+
+
+def expected_graph(df):
+	# Undirected graph with MsgCount summed over every row of a pair.
+	G = nx.Graph()
+	for _, row in df.dropna(subset=['Inviter', 'Invitee']).iterrows():
+		u, v = row['Inviter'], row['Invitee']
+		weight = G.get_edge_data(u, v, {'MsgCount': 0})['MsgCount']
+		G.add_edge(u, v, MsgCount=weight + row['MsgCount'])
+	return G
+
+
+def write(df, path):
+	if path.suffix == '.csv':
+		df.to_csv(path, index=False)
+	elif path.suffix == '.parquet':
+		df.to_parquet(path, index=False)
+	else:
+		df.to_excel(path, index=False)
+
+
+def same_graph(G, H):
+	assert set(G.nodes()) == set(H.nodes())
+	assert {frozenset(e) for e in G.edges()} == {frozenset(e) for e in H.edges()}
+	for u, v, w in G.edges(data='MsgCount'):
+		assert H[u][v]['MsgCount'] == pytest.approx(w)
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet', '.xlsx'])
+def test_ingest_matches_networkx(tmp_path, suffix):
+	df = chat_log()
+	path = tmp_path / f'chat{suffix}'
+	write(df, path)
+	G = expected_graph(df)
+	for chunksize in [7, 100, 10000]:
+		edges = ingest_edges(str(path), chunksize, verbose=False)
+		assert len(edges) == G.number_of_edges()
+		same_graph(G, ingest_graph(str(path), chunksize, verbose=False))
+		same_graph(G, CSRGraph.from_edges(edges).to_networkx())
+
+
+def test_unsupported_file_type(tmp_path):
+	with pytest.raises(ValueError):
+		ingest_edges(str(tmp_path / 'chat.json'), verbose=False)
@@ -0,0 +1,84 @@
+# test_louvain.py
+# Tests of Louvain and of the incremental partition updates against
+# networkx modularity and networkx's own Louvain.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import networkx as nx
+import numpy as np
+import pytest
+from csr_graph import CSRGraph
+from louvain import IncrementalLouvain, best_partition, modularity
+
+
+def weighted_graph(seed=0):
+	G = nx.planted_partition_graph(10, 30, 0.3, 0.01, seed=seed)
+	rng = np.random.default_rng(seed)
+	for u, v in G.edges():
+		G[u][v]['MsgCount'] = int(rng.integers(1, 5))
+	G.add_edge(3, 3, MsgCount=2)
+	return G
+
+
+def nx_modularity(G, partition):
+	groups = {}
+	for node, community in partition.items():
+		groups.setdefault(community, set()).add(node)
+	return nx.community.modularity(G, groups.values(), weight='MsgCount')
+
+
+def test_modularity_matches_networkx():
+	G = weighted_graph()
+	graph = CSRGraph.from_networkx(G)
+	rng = np.random.default_rng(1)
+	for communities in [1, 5, 300]:
+		partition = {node: int(rng.integers(communities)) for node in G}
+		assert modularity(graph, partition) == pytest.approx(nx_modularity(G, partition))
+
+
+def test_best_partition_matches_networkx_louvain():
+	G = weighted_graph()
+	graph = CSRGraph.from_networkx(G)
+	partition = best_partition(graph, seed=0)
+	assert set(partition) == set(G)
+	expected = nx.community.modularity(
+		G, nx.community.louvain_communities(G, weight='MsgCount', seed=0),
+		weight='MsgCount'
+	)
+	assert nx_modularity(G, partition) == pytest.approx(modularity(graph, partition))
+	assert nx_modularity(G, partition) > expected - 0.01
+
+
+def test_incremental_updates_track_networkx_modularity(tmp_path):
+	G = weighted_graph()
+	state = IncrementalLouvain(CSRGraph.from_networkx(G), seed=0)
+	assert state.modularity == pytest.approx(nx_modularity(G, state.partition()))
+	assert state.update(CSRGraph.from_networkx(G)) == 0
+
+	rng = np.random.default_rng(2)
+	for day in range(3):
+		nodes = list(G)
+		for _ in range(20):
+			u, v = rng.choice(nodes, 2)
+			G.add_edge(u, v, MsgCount=int(rng.integers(1, 5)))
+		G.remove_node(nodes[day])
+		G.add_edge(f'new{day}', nodes[-1], MsgCount=3)
+		touched = state.update(CSRGraph.from_networkx(G))
+		assert 0 < touched < G.number_of_nodes()
+		partition = state.partition()
+		assert set(partition) == set(G)
+		assert state.modularity == pytest.approx(nx_modularity(G, partition))
+		full = nx.community.modularity(
+			G, nx.community.louvain_communities(G, weight='MsgCount', seed=0),
+			weight='MsgCount'
+		)
+		assert state.modularity > full - 0.05
+
+	state.save(tmp_path / 'state.npz')
+	loaded = IncrementalLouvain.load(tmp_path / 'state.npz')
+	# Names are saved as strings.
+	assert loaded.partition() == {
+		str(node): community for node, community in state.partition().items()
+	}
+	assert loaded.modularity == pytest.approx(state.modularity)
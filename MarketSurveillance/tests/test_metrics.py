@@ -0,0 +1,48 @@
+# test_metrics.py
+# Tests of the run instrumentation: per-span peak RSS, the run-wide
+# peak and closing the log file.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import json
+import numpy as np
+from metrics import Metrics, reset_peak_rss
+
+
+MB = 1 << 20
+
+
+def test_span_peak_covers_the_span_alone():
+	metrics = Metrics()
+	with metrics.span('outer'):
+		with metrics.span('large'):
+			block = np.ones(200 * MB // 8)
+			del block
+		with metrics.span('small'):
+			block = np.ones(MB // 8)
+			del block
+	large, small, outer = [span['peak_rss_bytes'] for span in metrics.spans]
+	if not reset_peak_rss():
+		assert small is None
+		return
+	# The small span ran after the large one freed its memory; its peak
+	# must not include it, while the enclosing span's must.
+	assert large - small > 150 * MB
+	assert outer >= large
+	assert metrics.peak_rss() >= large
+
+
+def test_close_closes_the_log(tmp_path):
+	path = tmp_path / 'metrics.log'
+	metrics = Metrics(log=open(path, 'a'))
+	with metrics.span('stage'):
+		pass
+	metrics.count('nodes', 3)
+	log = metrics.log
+	metrics.close()
+	assert log.closed
+	metrics.count('edges', 2)
+	with open(path) as f:
+		records = [json.loads(line) for line in f]
+	assert [record['event'] for record in records] == ['span', 'counter']
@@ -0,0 +1,111 @@
+# test_multigraph.py
+# Tests of the multi-relation graph: per-relation views, combined
+# weights and rows with missing values.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+from multigraph import MultiRelationGraph
+
+
+def make_sources():
+	chats = pd.DataFrame({
+		'Inviter': ['A', 'B', 'A', 'C', 'D'],
+		'Invitee': ['B', 'A', 'C', 'D', 'D'],
+		'MsgCount': [2, 3, 1, 4, 5],
+	})
+	trades = pd.DataFrame({
+		'Buyer': ['A', 'C', 'E', 'C'],
+		'Seller': ['B', 'A', 'A', 'A'],
+		'Notional': [1000.0, 250.0, 4000.0, 750.0],
+	})
+	calls = pd.DataFrame({'Caller': ['B', 'E', 'E'], 'Callee': ['C', 'A', 'A']})
+	return {
+		'chat': (chats, 'Inviter', 'Invitee', 'MsgCount'),
+		'trade': (trades, 'Buyer', 'Seller', 'Notional'),
+		'call': (calls, 'Caller', 'Callee', None),
+	}
+
+
+def expected_relation(edges, source, target, weight):
+	# The relation as an undirected networkx graph with summed weights.
+	G = nx.Graph()
+	for i in range(len(edges)):
+		u = edges[source].iloc[i]
+		v = edges[target].iloc[i]
+		w = 1.0 if weight is None else float(edges[weight].iloc[i])
+		G.add_edge(u, v, weight=G.get_edge_data(u, v, {'weight': 0.0})['weight'] + w)
+	return G
+
+
+def edge_weights(graph):
+	src, dst, weights = graph.edge_arrays()
+	return {
+		frozenset((graph.names[u], graph.names[v])): float(w)
+		for u, v, w in zip(src, dst, weights)
+	}
+
+
+def test_relation_views_match_networkx():
+	sources = make_sources()
+	multi = MultiRelationGraph.from_sources(sources)
+	assert multi.number_of_nodes() == 5
+	for name, source in sources.items():
+		G = expected_relation(*source)
+		expected = {
+			frozenset((u, v)): w for u, v, w in G.edges(data='weight')
+		}
+		assert edge_weights(multi.relation(name)) == pytest.approx(expected)
+
+
+def test_combined_weights():
+	multi = MultiRelationGraph.from_sources(make_sources())
+	graph = multi.combine({'chat': 1.0, 'trade': 0.001, 'call': 2.0})
+	weights = edge_weights(graph)
+	assert weights[frozenset('AB')] == pytest.approx(5 + 1.0)
+	assert weights[frozenset('AC')] == pytest.approx(1 + 1.0)
+	assert weights[frozenset('AE')] == pytest.approx(4.0 + 4.0)
+	assert weights[frozenset('BC')] == pytest.approx(2.0)
+	assert weights[frozenset('D')] == pytest.approx(5)
+	assert multi.combine({'chat': 1.0, 'trade': 0.001, 'call': 2.0}) is graph
+
+	# Normalized: every relation divided by its mean non-zero weight.
+	normalized = edge_weights(multi.combine({'chat': 1.0, 'trade': 1.0}, normalize=True))
+	assert normalized[frozenset('AB')] == pytest.approx(5 / 3.75 + 1000 / 2000)
+	assert frozenset('BC') not in normalized
+	assert multi.combine({'trade': 1.0}).number_of_edges() == 3
+
+
+def test_missing_participants_and_weights():
+	sources = make_sources()
+	chats, source, target, weight = sources['chat']
+	chats = pd.concat([chats, pd.DataFrame({
+		'Inviter': ['A', None, 'F'],
+		'Invitee': [np.nan, 'B', 'B'],
+		'MsgCount': [7, 8, np.nan],
+	})], ignore_index=True)
+	sources['chat'] = (chats, source, target, weight)
+	multi = MultiRelationGraph.from_sources(sources)
+	# The rows without a participant are dropped; the row without a
+	# MsgCount keeps its pair with a weight of 0.
+	assert sorted(multi.names.tolist()) == ['A', 'B', 'C', 'D', 'E', 'F']
+	weights = edge_weights(multi.relation('chat'))
+	assert weights[frozenset('AB')] == pytest.approx(5)
+	assert frozenset('BF') not in weights
+	frame = multi.pair_frame()
+	assert len(frame) == 7
+	assert frame['chat'].sum() == pytest.approx(15)
+
+
+def test_save_and_load(tmp_path):
+	multi = MultiRelationGraph.from_sources(make_sources(), dtypes={'call': np.int32})
+	multi.save(tmp_path / 'multi.npz')
+	loaded = MultiRelationGraph.load(tmp_path / 'multi.npz')
+	assert loaded.names.tolist() == multi.names.tolist()
+	for name, values in multi.relations.items():
+		assert loaded.relations[name].dtype == values.dtype
+		np.testing.assert_array_equal(loaded.relations[name], values)
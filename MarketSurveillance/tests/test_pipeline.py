@@ -0,0 +1,43 @@
+# test_pipeline.py
+# Tests of the cached pipeline stages: the ingest cache key depends on
+# the input file, not on the chunk size used to read it.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import pandas as pd
+from ingest import ingest_edges
+from pipeline import run_pipeline, stage_summary
+
+
+def write_log(path, rows):
+	pd.DataFrame(rows, columns=['Inviter', 'Invitee', 'MsgCount']).to_csv(
+		path, index=False
+	)
+
+
+def test_ingest_key_ignores_chunksize(tmp_path):
+	path = tmp_path / 'chat.csv'
+	write_log(path, [
+		['A', 'B', 2], ['B', 'C', 1], ['B', 'A', 3], ['C', 'D', 4], ['A', 'C', 1],
+	])
+	cache = tmp_path / 'cache'
+	first = run_pipeline(
+		str(path), ['ingest'], cache_dir=str(cache), verbose=False, chunksize=2
+	)
+	second = run_pipeline(
+		str(path), ['ingest'], cache_dir=str(cache), verbose=False, chunksize=3
+	)
+	assert first['ingest'] == second['ingest']
+	assert stage_summary(first['ingest']) == {'edges': 4}
+	# Reading with any chunk size gives the cached edges.
+	cached = pd.read_parquet(f"{first['ingest']}/edges.parquet")
+	for chunksize in [1, 2, 3, 10]:
+		assert ingest_edges(str(path), chunksize, verbose=False).equals(cached)
+
+	# A different file is a different key.
+	write_log(path, [['A', 'B', 2]])
+	third = run_pipeline(
+		str(path), ['ingest'], cache_dir=str(cache), verbose=False, chunksize=2
+	)
+	assert third['ingest'] != first['ingest']
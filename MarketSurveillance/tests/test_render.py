@@ -0,0 +1,22 @@
+# test_render.py
+# Tests of the cached force layout.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import networkx as nx
+import numpy as np
+from csr_graph import CSRGraph
+from render import cached_layout
+
+
+def test_cached_layout_returns_copies(tmp_path):
+	graph = CSRGraph.from_networkx(nx.karate_club_graph())
+	pos = cached_layout(graph, cache_dir=str(tmp_path), seed=1)
+	expected = pos.copy()
+	pos[:] = 0
+	again = cached_layout(graph, cache_dir=str(tmp_path), seed=1)
+	np.testing.assert_array_equal(again, expected)
+	again += 1
+	np.testing.assert_array_equal(cached_layout(graph, cache_dir=None, seed=1), expected)
+	assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,172 @@
+# test_service.py
+# In-process tests of the graph query service through TestClient.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import asyncio
+import pandas as pd
+import service
+from csr_graph import CSRGraph
+from service import GraphService, ResultCache, Snapshot
+from service import TestClient as ServiceClient
+
+
+def make_snapshot(extra=False):
+	# Two triangles (A-B-C, D-E-F) joined by C-D, plus a path F-G-H.
+	# extra adds a new participant Z connected to A.
+	edges = pd.DataFrame({
+		'Inviter': ['A', 'A', 'B', 'C', 'D', 'D', 'E', 'F', 'G'],
+		'Invitee': ['B', 'C', 'C', 'D', 'E', 'F', 'F', 'G', 'H'],
+		'MsgCount': [5, 4, 3, 1, 6, 2, 7, 1, 1],
+	})
+	if extra:
+		edges.loc[len(edges)] = ['A', 'Z', 9]
+	graph = CSRGraph.from_edges(edges)
+	names = graph.names.tolist()
+	membership = [0 if name in 'ABCZ' else 1 for name in names]
+	centralities = {
+		'degree': graph.degree() / (graph.number_of_nodes() - 1),
+		'strength': graph.strength(),
+	}
+	return Snapshot(graph, membership, centralities)
+
+
+def run(snapshots, *requests, **options):
+	# Serve a service whose loader returns the given snapshots in turn
+	# and send it the (method, path) requests. Returns the responses.
+	snapshots = list(snapshots)
+	service = GraphService(lambda: snapshots.pop(0), workers=1, **options)
+
+	async def session():
+		async with ServiceClient(service) as client:
+			return [await client.request(method, path) for method, path in requests]
+
+	return asyncio.run(session())
+
+
+def test_community():
+	(status, body), = run([make_snapshot()], ('GET', '/community/A'))
+	assert status == 200
+	assert body['community'] == 0
+	assert sorted(body['members']) == ['A', 'B', 'C']
+
+
+def test_top():
+	(status, body), = run([make_snapshot()], ('GET', '/top?measure=strength&k=2'))
+	assert status == 200
+	assert [row['participant'] for row in body['top']] == ['E', 'F']
+	assert body['top'][0]['value'] == 13.0
+
+
+def test_ego():
+	(status, body), (status2, body2) = run(
+		[make_snapshot()], ('GET', '/ego/C?k=1'), ('GET', '/ego/C?k=2')
+	)
+	assert status == 200
+	assert sorted(body['nodes']) == ['A', 'B', 'C', 'D']
+	assert sorted(tuple(sorted(edge[:2])) for edge in body['edges']) == [
+		('A', 'B'), ('A', 'C'), ('B', 'C'), ('C', 'D')
+	]
+	assert status2 == 200
+	assert sorted(body2['nodes']) == ['A', 'B', 'C', 'D', 'E', 'F']
+	assert len(body2['edges']) == 7
+
+
+def test_unknown_participant_and_endpoint_are_404():
+	responses = run(
+		[make_snapshot()], ('GET', '/community/nobody'), ('GET', '/nothing')
+	)
+	assert [status for status, _ in responses] == [404, 404]
+	assert all('error' in body for _, body in responses)
+
+
+def test_bad_parameters_are_400():
+	responses = run(
+		[make_snapshot()], ('GET', '/top?measure=nope'), ('GET', '/top?k=ten')
+	)
+	assert [status for status, _ in responses] == [400, 400]
+
+
+def test_reload():
+	responses = run(
+		[make_snapshot(), make_snapshot(extra=True)],
+		('GET', '/community/A'),
+		('GET', '/community/Z'),
+		('GET', '/reload'),
+		('POST', '/reload'),
+		('GET', '/community/A'),
+		('GET', '/health'),
+	)
+	statuses = [status for status, _ in responses]
+	assert statuses == [200, 404, 405, 200, 200, 200]
+	assert responses[3][1] == {'version': 2, 'nodes': 9}
+	assert sorted(responses[4][1]['members']) == ['A', 'B', 'C', 'Z']
+	assert responses[5][1]['version'] == 2
+
+
+def test_centrality():
+	(status, body), = run([make_snapshot()], ('GET', '/centrality/E'))
+	assert status == 200
+	assert body['nodes'] == 8
+	assert body['values']['strength'] == 13.0
+	assert body['values']['degree'] == 2 / 7
+	# Ties are ranked in node order (C, D, F, then A, B, E).
+	assert body['ranks'] == {'strength': 1, 'degree': 6}
+
+
+def test_cliques():
+	(status, body), (status2, body2), (status3, _) = run(
+		[make_snapshot()], ('GET', '/cliques/C'), ('GET', '/cliques/G?min_size=3'),
+		('GET', '/cliques/nobody')
+	)
+	assert status == 200
+	assert sorted(sorted(clique) for clique in body['cliques']) == [
+		['A', 'B', 'C'], ['C', 'D']
+	]
+	assert body['truncated'] is False
+	assert status2 == 200
+	assert body2['cliques'] == []
+	assert status3 == 404
+
+
+def test_cliques_are_capped(monkeypatch):
+	monkeypatch.setattr(service, 'CLIQUES_MAX', 1)
+	(status, body), = run([make_snapshot()], ('GET', '/cliques/C'))
+	assert status == 200
+	assert len(body['cliques']) == 1
+	assert body['truncated'] is True
+
+
+def test_repeated_query_is_cached():
+	responses = run(
+		[make_snapshot()], ('GET', '/ego/C?k=2'), ('GET', '/ego/C?k=2'),
+		('GET', '/health')
+	)
+	assert responses[0] == responses[1]
+	health = responses[2][1]
+	assert (health['cache_entries'], health['cache_hits'], health['cache_misses']) == (1, 1, 1)
+
+
+def test_cache_entries_expire(monkeypatch):
+	now = [100.0]
+	monkeypatch.setattr(service.time, 'monotonic', lambda: now[0])
+	cache = ResultCache(maxsize=10, ttl=5.0)
+	cache.put('a', 1)
+	now[0] = 104.0
+	assert cache.get('a') == 1
+	now[0] = 105.5
+	assert cache.get('a') is None
+	assert len(cache.entries) == 0
+	assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used():
+	cache = ResultCache(maxsize=2, ttl=60.0)
+	cache.put('a', 1)
+	cache.put('b', 2)
+	assert cache.get('a') == 1
+	cache.put('c', 3)
+	assert list(cache.entries) == ['a', 'c']
+	assert cache.get('b') is None
+	assert cache.get('c') == 3
@@ -0,0 +1,99 @@
+# test_windowed.py
+# Tests of the sliding time window against networkx graphs rebuilt
+# from the messages still in the window.
+# Python 3.8+
+# Windows/MacOS/Linux
+
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+from windowed import SlidingWindowGraph
+
+
+def messages(count=3000, participants=60, seed=0):
+	rng = np.random.default_rng(seed)
+	frame = pd.DataFrame({
+		'Timestamp': np.sort(rng.uniform(0, 100000, count)),
+		'Inviter': rng.integers(0, participants, count),
+		'Invitee': rng.integers(0, participants, count),
+		'MsgCount': rng.integers(1, 10, count),
+	})
+	frame = frame[frame['Inviter'] != frame['Invitee']]
+	frame['Inviter'] = 'P' + frame['Inviter'].astype(str)
+	frame['Invitee'] = 'P' + frame['Invitee'].astype(str)
+	return frame.reset_index(drop=True)
+
+
+def split(frame, parts):
+	bounds = np.linspace(0, len(frame), parts + 1).astype(int)
+	return [frame.iloc[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def window_graph(frame, now, window):
+	# The messages after now - window, as a networkx graph.
+	live = frame[(frame['Timestamp'] > now - window) & (frame['Timestamp'] <= now)]
+	G = nx.Graph()
+	for _, row in live.iterrows():
+		u, v = row['Inviter'], row['Invitee']
+		weight = G.get_edge_data(u, v, {'MsgCount': 0})['MsgCount']
+		G.add_edge(u, v, MsgCount=weight + row['MsgCount'])
+	return G
+
+
+def test_window_matches_networkx():
+	frame = messages()
+	window = 6 * 3600
+	stream = SlidingWindowGraph(window, drift_threshold=0.2, seed=0)
+	for batch in split(frame, 20):
+		stream.add_frame(batch)
+		G = window_graph(frame, stream.now, window)
+		assert stream.number_of_nodes() == G.number_of_nodes()
+		assert stream.number_of_edges() == G.number_of_edges()
+		assert stream.degree_centrality() == pytest.approx(nx.degree_centrality(G))
+		assert stream.strength_centrality() == pytest.approx(
+			dict(G.degree(weight='MsgCount'))
+		)
+		assert nx.utils.graphs_equal(stream.snapshot().to_networkx(), G)
+
+		stream.refresh(force=True)
+		partition = stream.partition()
+		assert set(partition) == set(G)
+		groups = {}
+		for node, community in partition.items():
+			groups.setdefault(community, set()).add(node)
+		assert stream.modularity == pytest.approx(
+			nx.community.modularity(G, groups.values(), weight='MsgCount')
+		)
+		expected = nx.eigenvector_centrality(G, tol=1e-6, max_iter=100)
+		values = stream.graph.to_dict(stream.centralities['eigenvector'])
+		assert values == pytest.approx(expected, abs=1e-3)
+
+
+def test_refresh_waits_for_drift():
+	frame = messages()
+	stream = SlidingWindowGraph(24 * 3600, drift_threshold=0.5, seed=0)
+	batches = split(frame, 50)
+	stream.add_frame(batches[0])
+	assert stream.refresh()
+	stream.add_frame(batches[1].iloc[:5])
+	assert stream.drift() < 0.5
+	assert not stream.refresh()
+	for batch in batches[2:]:
+		stream.add_frame(batch)
+	assert stream.drift() >= 0.5
+	assert stream.refresh()
+	assert stream.recomputes == 2
+
+
+def test_everything_expires():
+	frame = messages(count=200)
+	stream = SlidingWindowGraph(3600)
+	stream.add_frame(frame)
+	stream.advance(frame['Timestamp'].max() + 3600)
+	assert stream.number_of_nodes() == 0
+	assert stream.number_of_edges() == 0
+	assert stream.snapshot().number_of_nodes() == 0
+	stream.refresh(force=True)
+	assert stream.partition() == {}
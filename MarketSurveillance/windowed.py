@@ -0,0 +1,361 @@
+# windowed.py
+# Sliding time-window view of a timestamped chat stream (e.g. the last
+# 24h or 7d of messages). Messages are added in batches as they arrive
+# and expire in bulk once they fall out of the window. The per-pair
+# MsgCount weights and the per-node degree and strength behind degree
+# centrality are kept up to date incrementally (array updates for the
+# batch's distinct pairs only). Louvain communities and the centrality
+# vectors are only recomputed when the graph has drifted far enough
+# from the last computed snapshot; Louvain then continues from the
+# previous partition (IncrementalLouvain.update()) and eigenvector
+# centrality is warm-started from the previous vector. Pairs and nodes
+# whose last live message expired go on free lists and their slots and
+# IDs are reused, so memory and snapshot cost follow the number of
+# live pairs rather than the whole history of the stream.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+from collections import deque
+import numpy as np
+import pandas as pd
+from csr_graph import CSRGraph
+from louvain import IncrementalLouvain
+from centrality import compute_centralities
+from ingest import SOURCE_COL, TARGET_COL, WEIGHT_COL
+
+
+# Default name of the message timestamp column.
+TIME_COL = 'Timestamp'
+
+# Default drift (fraction of the MsgCount weight or of the edges that
+# changed since the last recompute) that triggers a recompute.
+DRIFT_THRESHOLD = 0.1
+
+
+class SlidingWindowGraph:
+	def __init__(self, window, drift_threshold=DRIFT_THRESHOLD, seed=None):
+		# window is the window length, in seconds or as a timedelta
+		# (e.g. pd.Timedelta('24h')). Timestamps may be numbers of
+		# seconds or datetimes.
+		if isinstance(window, (int, float)):
+			self.window = float(window)
+		else:
+			self.window = pd.Timedelta(window).total_seconds()
+		self.drift_threshold = drift_threshold
+		self.seed = seed
+		self.now = -np.inf
+
+		# Node table: name <-> ID, degree (distinct live neighbors) and
+		# strength (live MsgCount) per node. IDs of nodes without live
+		# edges are released (their name becomes None) and reused.
+		self.index = {}
+		self.names = []
+		self.free_nodes = []
+		self.degree = np.zeros(0, dtype=np.int64)
+		self.strength = np.zeros(0)
+
+		# Pair table: one slot per live undirected pair, with its live
+		# MsgCount and number of live messages. Slots of pairs without
+		# live messages are released and reused; pair_count is the
+		# number of slots in use or on the free list.
+		self.slots = {}
+		self.free_slots = []
+		self.pair_count = 0
+		self.src = np.zeros(0, dtype=np.int64)
+		self.dst = np.zeros(0, dtype=np.int64)
+		self.weight = np.zeros(0)
+		self.events = np.zeros(0, dtype=np.int64)
+		self.live_edges = 0
+		self.total_weight = 0.0
+
+		# Messages still in the window, as batches of (sorted times,
+		# pair slots, MsgCounts).
+		self.batches = deque()
+
+		# Change since the last recompute and its results.
+		self.changed_weight = 0.0
+		self.changed_edges = 0
+		self.base_weight = 0.0
+		self.base_edges = 0
+		self.graph = None
+		self.louvain = None
+		self.centralities = None
+		self.recomputes = 0
+
+
+	def add(self, timestamps, sources, targets, weights=None):
+		# Add a batch of messages and expire everything that fell out of
+		# the window. Missing weights count 1 message each.
+		times = _seconds(timestamps)
+		if len(times) == 0:
+			return
+		if weights is None:
+			weights = np.ones(len(times))
+		weights = np.asarray(weights, dtype=np.float64)
+		src = self._node_ids(sources)
+		dst = self._node_ids(targets)
+		lo = np.minimum(src, dst)
+		hi = np.maximum(src, dst)
+
+		# Look up (or create) the slot of each distinct pair once.
+		keys, first, inverse = np.unique(
+			(lo << 32) | hi, return_index=True, return_inverse=True
+		)
+		pair_slots = np.empty(len(keys), dtype=np.int64)
+		for i, key in enumerate(keys.tolist()):
+			slot = self.slots.get(key)
+			if slot is None:
+				if len(self.free_slots) > 0:
+					slot = self.free_slots.pop()
+				else:
+					slot = self.pair_count
+					self.pair_count += 1
+				self.slots[key] = slot
+			pair_slots[i] = slot
+		self._grow_pairs(self.pair_count)
+		self.src[pair_slots] = lo[first]
+		self.dst[pair_slots] = hi[first]
+		slots = pair_slots[inverse.ravel()]
+
+		self._apply(slots, weights, 1)
+		order = np.argsort(times, kind='stable')
+		self.batches.append((times[order], slots[order], weights[order]))
+		self.advance(times.max())
+
+
+	def add_frame(self, frame, time=TIME_COL, source=SOURCE_COL,
+			target=TARGET_COL, weight=WEIGHT_COL):
+		# Add the messages of a chat log dataframe (one row per
+		# message).
+		self.add(
+			frame[time], frame[source], frame[target],
+			frame[weight].to_numpy() if weight in frame else None
+		)
+
+
+	def advance(self, now):
+		# Move the clock forward (it never goes back) and expire, in
+		# one bulk update, every message at or before now - window.
+		# Returns the number of expired messages.
+		now = float(_seconds([now])[0]) if not isinstance(now, float) else now
+		self.now = max(self.now, now)
+		cutoff = self.now - self.window
+		expired_slots = []
+		expired_weights = []
+		kept = deque()
+		for times, slots, weights in self.batches:
+			if times[0] > cutoff:
+				kept.append((times, slots, weights))
+				continue
+			k = np.searchsorted(times, cutoff, side='right')
+			expired_slots.append(slots[:k])
+			expired_weights.append(weights[:k])
+			if k < len(times):
+				kept.append((times[k:], slots[k:], weights[k:]))
+		self.batches = kept
+		if len(expired_slots) == 0:
+			return 0
+		slots = np.concatenate(expired_slots)
+		self._apply(slots, np.concatenate(expired_weights), -1)
+		return len(slots)
+
+
+	def drift(self):
+		# Fraction of the MsgCount weight, or of the edges, that was
+		# added or expired since the last recompute (the larger one).
+		return max(
+			self.changed_weight / max(self.base_weight, 1.0),
+			self.changed_edges / max(self.base_edges, 1)
+		)
+
+
+	def refresh(self, force=False):
+		# Recompute communities and centralities if the drift reached
+		# the threshold (or on the first call, or when forced). Returns
+		# True if a recompute happened.
+		if not force and self.graph is not None and \
+				self.drift() < self.drift_threshold:
+			return False
+		graph = self.snapshot()
+		start = None
+		if self.centralities is not None and graph.number_of_nodes() > 0:
+			ids = graph.node_ids(self.graph.names)
+			known = ids >= 0
+			if np.any(known):
+				start = np.full(
+					graph.number_of_nodes(),
+					self.centralities['eigenvector'][known].mean()
+				)
+				start[ids[known]] = self.centralities['eigenvector'][known]
+		if graph.number_of_edges() == 0:
+			self.louvain = None
+			self.centralities = {
+				name: np.zeros(graph.number_of_nodes())
+				for name in ('degree', 'strength', 'eigenvector')
+			}
+		else:
+			if self.louvain is None:
+				self.louvain = IncrementalLouvain(graph, seed=self.seed)
+			else:
+				self.louvain.update(graph)
+			self.centralities = compute_centralities(graph, start=start)
+		self.graph = graph
+		self.changed_weight = 0.0
+		self.changed_edges = 0
+		self.base_weight = self.total_weight
+		self.base_edges = self.live_edges
+		self.recomputes += 1
+		return True
+
+
+	def snapshot(self):
+		# CSRGraph of the live edges (nodes without live edges are left
+		# out).
+		live = np.flatnonzero(self.events[:self.pair_count] > 0)
+		active = np.flatnonzero(self.degree > 0)
+		ids = np.full(len(self.names), -1, dtype=np.int64)
+		ids[active] = np.arange(len(active))
+		names = np.asarray(self.names, dtype=object)[active]
+		return CSRGraph.from_arrays(
+			ids[self.src[live]], ids[self.dst[live]], self.weight[live], names
+		)
+
+
+	def partition(self):
+		# {node_name: community} from the last recompute.
+		if self.louvain is None:
+			return {}
+		return self.louvain.partition()
+
+
+	@property
+	def modularity(self):
+		return 0.0 if self.louvain is None else self.louvain.modularity
+
+
+	def degree_centrality(self):
+		# Live degree centrality {node_name: value}, maintained
+		# incrementally (no recompute needed).
+		active = np.flatnonzero(self.degree > 0)
+		n = len(active)
+		values = self.degree[active] / (n - 1) if n > 1 else np.ones(n)
+		names = np.asarray(self.names, dtype=object)[active]
+		return dict(zip(names.tolist(), values.tolist()))
+
+
+	def strength_centrality(self):
+		# Live MsgCount per node {node_name: value}.
+		active = np.flatnonzero(self.degree > 0)
+		names = np.asarray(self.names, dtype=object)[active]
+		return dict(zip(names.tolist(), self.strength[active].tolist()))
+
+
+	def number_of_nodes(self):
+		return int(np.count_nonzero(self.degree > 0))
+
+
+	def number_of_edges(self):
+		return self.live_edges
+
+
+	def _node_ids(self, names):
+		# Map names to node IDs, adding unseen names to the node table
+		# (reusing released IDs first).
+		names = pd.Series(np.asarray(names, dtype=object))
+		ids = names.map(self.index)
+		missing = ids.isna().to_numpy()
+		if np.any(missing):
+			for name in pd.unique(names[missing]).tolist():
+				if len(self.free_nodes) > 0:
+					node = self.free_nodes.pop()
+					self.names[node] = name
+				else:
+					node = len(self.names)
+					self.names.append(name)
+				self.index[name] = node
+			self._grow_nodes(len(self.names))
+			ids = names.map(self.index)
+		return ids.to_numpy(dtype=np.int64)
+
+
+	def _apply(self, slots, weights, sign):
+		# Add (sign = 1) or remove (sign = -1) messages from the pair
+		# and node tables.
+		pairs, inverse = np.unique(slots, return_inverse=True)
+		counts = np.bincount(inverse, minlength=len(pairs))
+		sums = np.bincount(inverse, weights=weights, minlength=len(pairs))
+		before = self.events[pairs] > 0
+		self.events[pairs] += sign * counts
+		self.weight[pairs] += sign * sums
+		after = self.events[pairs] > 0
+		self.weight[pairs[~after]] = 0.0
+
+		# Degree changes only when a pair appears or disappears; a
+		# self-loop counts twice, as in CSRGraph.degree().
+		appeared = pairs[~before & after]
+		vanished = pairs[before & ~after]
+		for changed, step in ((appeared, 1), (vanished, -1)):
+			np.add.at(self.degree, self.src[changed], step)
+			np.add.at(self.degree, self.dst[changed], step)
+		np.add.at(self.strength, self.src[slots], sign * weights)
+		np.add.at(self.strength, self.dst[slots], sign * weights)
+
+		self.live_edges += len(appeared) - len(vanished)
+		self.total_weight += sign * sums.sum()
+		self.changed_weight += sums.sum()
+		self.changed_edges += len(appeared) + len(vanished)
+		if len(vanished) > 0:
+			self._release(vanished)
+
+
+	def _release(self, vanished):
+		# Put the slots of pairs without live messages, and the IDs of
+		# nodes left without live edges, on the free lists.
+		for lo, hi in zip(self.src[vanished].tolist(), self.dst[vanished].tolist()):
+			del self.slots[(lo << 32) | hi]
+		self.free_slots.extend(vanished.tolist())
+		nodes = np.unique(np.concatenate([self.src[vanished], self.dst[vanished]]))
+		nodes = nodes[self.degree[nodes] == 0]
+		self.strength[nodes] = 0.0
+		for node in nodes.tolist():
+			del self.index[self.names[node]]
+			self.names[node] = None
+		self.free_nodes.extend(nodes.tolist())
+
+
+	def _grow_nodes(self, size):
+		if size > len(self.degree):
+			capacity = max(size, 2 * len(self.degree), 1024)
+			self.degree = _resize(self.degree, capacity)
+			self.strength = _resize(self.strength, capacity)
+
+
+	def _grow_pairs(self, size):
+		if size > len(self.src):
+			capacity = max(size, 2 * len(self.src), 1024)
+			self.src = _resize(self.src, capacity)
+			self.dst = _resize(self.dst, capacity)
+			self.weight = _resize(self.weight, capacity)
+			self.events = _resize(self.events, capacity)
+
+
+def _resize(array, size):
+	grown = np.zeros(size, dtype=array.dtype)
+	grown[:len(array)] = array
+	return grown
+
+
+def _seconds(timestamps):
+	# Timestamps as float seconds (datetimes become seconds since the
+	# epoch).
+	values = pd.Series(timestamps) if not isinstance(timestamps, pd.Series) \
+		else timestamps
+	if pd.api.types.is_datetime64_any_dtype(values):
+		if values.dt.tz is not None:
+			values = values.dt.tz_convert(None)
+		return values.to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9
+	if values.dtype == object and len(values) > 0 and \
+			not isinstance(values.iloc[0], (int, float, np.number)):
+		return _seconds(pd.to_datetime(values))
+	return values.to_numpy(dtype=np.float64)
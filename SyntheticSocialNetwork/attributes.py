@@ -0,0 +1,244 @@
+# attributes.py
+# Batched synthesis of node attributes (name, sex, age, occupation,
+# organization, location) for large synthetic social networks. Faker is
+# only called to fill small pools of distinct values once; every node
+# then gets integer codes into those pools, drawn in vectorized blocks
+# (optionally spread across a process pool). Attributes are stored as
+# columnar arrays indexed by node ID, and strings are only built when a
+# column or label is actually read. Node labels ("First Last") are
+# guaranteed unique: repeated names get a " 2", " 3", ... suffix, which
+# cannot collide with a pool name since Faker names contain no digits.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+# Attribute columns stored as codes into a pool of distinct values.
+CODED = ['sex', 'first', 'last', 'occupation', 'organization', 'location']
+SEXES = np.asarray(['F', 'M'], dtype=object)
+
+# Ages are drawn from a normal distribution clipped to this range.
+AGE_MEAN = 40
+AGE_STD = 13
+AGE_RANGE = (18, 85)
+
+DEFAULT_BLOCK_SIZE = 1_000_000
+
+
+def attribute_pools(size=1000, seed=None, locale='en_US'):
+	# Pools of distinct attribute values drawn with Faker (at most size
+	# Faker calls per pool). First names are shared between the sexes,
+	# with the positions of the female and male names kept separately.
+	from faker import Faker
+	faker = Faker(locale)
+	faker.seed_instance(seed)
+	female = [faker.first_name_female() for _ in range(size)]
+	male = [faker.first_name_male() for _ in range(size)]
+	first = _distinct(female + male)
+	index = pd.Index(first)
+	return {
+		'sex': SEXES,
+		'first': first,
+		'first_female': np.unique(index.get_indexer(female)),
+		'first_male': np.unique(index.get_indexer(male)),
+		'last': _distinct([faker.last_name() for _ in range(size)]),
+		'occupation': _distinct([faker.job() for _ in range(size)]),
+		'organization': _distinct([faker.company() for _ in range(size)]),
+		'location': _distinct([faker.city() for _ in range(size)]),
+	}
+
+
+def generate_attributes(n, seed=None, pools=None, workers=1,
+		block_size=DEFAULT_BLOCK_SIZE):
+	# Attributes for nodes 0..n-1. Each block of block_size nodes is
+	# drawn with its own sub-seed, so the result is the same for any
+	# number of workers (workers > 1 uses a process pool).
+	if pools is None:
+		pools = attribute_pools(seed=seed)
+	entropy = np.random.SeedSequence(seed).entropy
+	sizes = {name: len(pools[name]) for name in CODED}
+	blocks = [
+		(i, start, min(n, start + block_size))
+		for i, start in enumerate(range(0, n, block_size))
+	]
+	tasks = [
+		(entropy, i, start, end, sizes, pools['first_female'], pools['first_male'])
+		for i, start, end in blocks
+	]
+	if workers == 1 or len(tasks) <= 1:
+		parts = [_generate_block(*task) for task in tasks]
+	else:
+		with ProcessPoolExecutor(max_workers=workers) as pool:
+			parts = list(pool.map(_generate_block, *zip(*tasks)))
+
+	columns = {}
+	for name in CODED + ['age']:
+		if len(parts) > 0:
+			columns[name] = np.concatenate([part[name] for part in parts])
+		else:
+			columns[name] = np.zeros(0, dtype=np.int32)
+	return NodeAttributes(pools, columns)
+
+
+class NodeAttributes:
+	def __init__(self, pools, columns):
+		# pools: {column: array of distinct values} (plus the female
+		# and male first name positions).
+		# columns: {column: array indexed by node ID}; codes into the
+		# pools, and 'age' as plain integers.
+		self.pools = pools
+		self.columns = columns
+		self.suffix = _occurrence(
+			columns['first'], columns['last'], len(pools['last'])
+		)
+
+
+	def __len__(self):
+		return len(self.columns['age'])
+
+
+	def column(self, name, start=0, stop=None):
+		# Values of one attribute for the nodes [start, stop).
+		values = self.columns[name][start:stop]
+		if name in self.pools:
+			return self.pools[name][values]
+		return values
+
+
+	def labels(self, start=0, stop=None):
+		# Unique "First Last" labels for the nodes [start, stop). Each
+		# distinct name is only built once; repeats then just get their
+		# suffix appended.
+		first = self.pools['first']
+		last = self.pools['last']
+		keys = _name_keys(
+			self.columns['first'][start:stop], self.columns['last'][start:stop],
+			len(last)
+		)
+		present = np.flatnonzero(np.bincount(keys, minlength=len(first) * len(last)))
+		names = np.empty(len(first) * len(last), dtype=object)
+		names[present] = first[present // len(last)] + ' ' + last[present % len(last)]
+		labels = names[keys]
+
+		suffix = self.suffix[start:stop]
+		repeated = np.flatnonzero(suffix > 0)
+		if len(repeated) > 0:
+			suffixes = np.asarray(
+				[' ' + str(i + 1) for i in range(int(suffix.max()) + 1)], dtype=object
+			)
+			labels[repeated] = labels[repeated] + suffixes[suffix[repeated]]
+		return labels
+
+
+	def to_frame(self, start=0, stop=None):
+		# Attributes as a dataframe; coded columns become categoricals
+		# that share the pools (no per-node strings except the labels).
+		frame = pd.DataFrame({'label': self.labels(start, stop)})
+		for name in ['sex', 'occupation', 'organization', 'location']:
+			frame[name] = pd.Categorical.from_codes(
+				self.columns[name][start:stop], self.pools[name]
+			)
+		frame['age'] = self.columns['age'][start:stop]
+		return frame
+
+
+	def attach(self, G):
+		# Set the attributes on a (small) networkx graph whose nodes are
+		# the labels (e.g. to_networkx(..., names=attributes.labels())).
+		import networkx as nx
+		frame = self.to_frame()
+		labels = frame['label'].tolist()
+		for name in ['sex', 'age', 'occupation', 'organization', 'location']:
+			nx.set_node_attributes(G, dict(zip(labels, frame[name].tolist())), name)
+		return G
+
+
+	def save(self, path):
+		# Write the code columns and pools to an .npz file.
+		arrays = {f'column_{name}': values for name, values in self.columns.items()}
+		for name, values in self.pools.items():
+			values = np.asarray(values)
+			arrays[f'pool_{name}'] = values.astype(str) if values.dtype == object else values
+		np.savez(path, **arrays)
+
+
+	@classmethod
+	def load(cls, path):
+		with np.load(path) as data:
+			columns = {
+				key[len('column_'):]: data[key]
+				for key in data.files if key.startswith('column_')
+			}
+			pools = {}
+			for key in data.files:
+				if key.startswith('pool_'):
+					values = data[key]
+					pools[key[len('pool_'):]] = values.astype(object) \
+						if values.dtype.kind == 'U' else values
+		return cls(pools, columns)
+
+
+def same_attributes(a, b):
+	# True when two NodeAttributes hold the same columns (codes and
+	# dtypes) and pools, e.g. after a save() / load() round trip.
+	if set(a.columns) != set(b.columns) or set(a.pools) != set(b.pools):
+		return False
+	for name, values in a.columns.items():
+		other = b.columns[name]
+		if values.dtype != other.dtype or not np.array_equal(values, other):
+			return False
+	return all(
+		np.array_equal(np.asarray(values), np.asarray(b.pools[name]))
+		for name, values in a.pools.items()
+	)
+
+
+def _generate_block(entropy, index, start, end, sizes, female, male):
+	# Worker: attribute codes for the nodes [start, end).
+	rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(index,)))
+	count = end - start
+	sex = rng.integers(0, 2, count, dtype=np.int8)
+	first = np.where(
+		sex == 0, female[rng.integers(0, len(female), count)],
+		male[rng.integers(0, len(male), count)]
+	).astype(np.int32)
+	age = np.clip(
+		np.rint(rng.normal(AGE_MEAN, AGE_STD, count)), *AGE_RANGE
+	).astype(np.uint8)
+	columns = {'sex': sex, 'first': first, 'age': age}
+	for name in ['last', 'occupation', 'organization', 'location']:
+		columns[name] = rng.integers(0, sizes[name], count, dtype=np.int32)
+	return columns
+
+
+def _distinct(values):
+	# Distinct values in first-seen order, as an object array.
+	return np.asarray(pd.unique(pd.Series(values, dtype=object)), dtype=object)
+
+
+def _name_keys(first, last, last_size):
+	# One integer per distinct (first, last) name.
+	return first.astype(np.int64) * last_size + last
+
+
+def _occurrence(first, last, last_size):
+	# 0 for the first node with a given (first, last) name, 1 for the
+	# second, and so on (in node ID order). Sorting name key and node ID
+	# packed into one integer is a stable sort by name key, done by the
+	# (much faster) plain sort of an int64 array.
+	n = len(first)
+	if n == 0:
+		return np.zeros(0, dtype=np.int64)
+	shift = int(n - 1).bit_length()
+	packed = np.sort((_name_keys(first, last, last_size) << shift) | np.arange(n))
+	sorted_key = packed >> shift
+	starts = np.ones(n, dtype=bool)
+	starts[1:] = sorted_key[1:] != sorted_key[:-1]
+	group_start = np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+	occurrence = np.empty(n, dtype=np.int64)
+	occurrence[packed & ((1 << shift) - 1)] = np.arange(n) - group_start
+	return occurrence
@@ -0,0 +1,237 @@
+# generators.py
+# Vectorized NumPy implementations of the Erdos-Renyi, Watts-Strogatz
+# and Barabasi-Albert graph models. Each generator is seeded, returns
+# plain (src, dst) edge arrays instead of building an nx.Graph, and can
+# reach 10^6-10^8 edges. Node names are produced by vectorized sampling
+# from a precomputed pool of Faker first and last names.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import numpy as np
+
+
+# Number of geometric skips drawn at a time by the Erdos-Renyi sampler.
+ER_BATCH = 1 << 22
+
+
+def erdos_renyi_edges(n, p, seed=None):
+	# G(n, p) by geometric skip sampling (Batagelj & Brandes 2005): the
+	# n(n-1)/2 possible edges are numbered and the gaps between chosen
+	# edges are drawn from a geometric distribution, so the cost is
+	# proportional to the number of edges, not n^2.
+	rng = np.random.default_rng(seed)
+	total = n * (n - 1) // 2
+	if p <= 0 or total == 0:
+		return _empty()
+	if p >= 1:
+		return _pairs_to_edges(np.arange(total, dtype=np.int64))
+
+	batch = int(min(ER_BATCH, 1.1 * p * total + 64))
+	chunks = []
+	last = -1
+	while True:
+		skips = rng.geometric(p, size=batch).astype(np.int64)
+		positions = last + np.cumsum(skips)
+		positions = positions[positions < total]
+		if len(positions) > 0:
+			chunks.append(positions)
+			last = positions[-1]
+		if len(positions) < batch:
+			break
+	return _pairs_to_edges(np.concatenate(chunks))
+
+
+def watts_strogatz_edges(n, k, p, seed=None):
+	# Ring lattice where every node is joined to its k // 2 nearest
+	# neighbors on each side, after which each edge (u, v) is rewired
+	# to (u, w) with probability p (w uniform, no self-loops or
+	# duplicate edges), as in nx.watts_strogatz_graph.
+	rng = np.random.default_rng(seed)
+	half = k // 2
+	if half == 0 or n == 0:
+		return _empty()
+	if k >= n:
+		return erdos_renyi_edges(n, 1.0)
+	nodes = np.arange(n, dtype=np.int64)
+	src = np.repeat(nodes, half)
+	dst = (src + np.tile(np.arange(1, half + 1, dtype=np.int64), n)) % n
+
+	lattice = dst.copy()
+	rewired = rng.random(len(src)) < p
+	rewire = np.flatnonzero(rewired)
+	dst[rewire] = rng.integers(0, n, size=len(rewire))
+
+	# Redraw rewired targets that produced a self-loop or a duplicate
+	# edge. Lattice edges win over rewired copies of the same edge, so
+	# a conflict is always flagged on an edge that can be redrawn.
+	# Edges still conflicting after a few rounds (saturated nodes) go
+	# back to their lattice target, or are dropped if that edge now
+	# exists too.
+	for _ in range(32):
+		bad = rewire[_conflicts(src, dst, n, ~rewired)[rewire]]
+		if len(bad) == 0:
+			return src, dst
+		dst[bad] = rng.integers(0, n, size=len(bad))
+	bad = rewire[_conflicts(src, dst, n, ~rewired)[rewire]]
+	dst[bad] = lattice[bad]
+	keep = ~_conflicts(src, dst, n, dst == lattice)
+	return src[keep], dst[keep]
+
+
+def barabasi_albert_edges(n, m, seed=None):
+	# Preferential attachment through a repeated-node array, as in
+	# nx.barabasi_albert_graph: start from a star on m + 1 nodes, then
+	# every new node t attaches to m distinct targets drawn uniformly
+	# from the array of edge endpoints seen so far.
+	# Each new node owns 2m slots of that array: m "target" slots and m
+	# slots holding t itself. A target slot is drawn as a pointer to a
+	# uniformly random earlier slot and resolved by pointer jumping, so
+	# the whole sequential process is simulated with array operations.
+	if m < 1 or m >= n:
+		raise ValueError(f'Barabasi-Albert network must have m >= 1 and m < n, m = {m}, n = {n}')
+	rng = np.random.default_rng(seed)
+	t0 = m + 1
+	new_nodes = np.arange(t0, n, dtype=np.int64)
+	prefix = 2 * m
+	size = prefix + 2 * m * len(new_nodes)
+
+	# Value of every slot once resolved (-1 for unresolved target
+	# slots) and the pointer of every target slot.
+	value = np.full(size, -1, dtype=np.int64)
+	value[:m] = 0
+	value[m:prefix] = np.arange(1, m + 1)
+	blocks = value[prefix:].reshape(len(new_nodes), 2 * m)
+	blocks[:, m:] = new_nodes[:, None]
+
+	target_slots = (
+		prefix + 2 * m * np.arange(len(new_nodes))[:, None] + np.arange(m)
+	).ravel()
+	limits = np.repeat(prefix + 2 * m * np.arange(len(new_nodes)), m)
+	pointer = np.arange(size, dtype=np.int64)
+	pointer[target_slots] = (rng.random(len(target_slots)) * limits).astype(np.int64)
+
+	# Resolve the new nodes in blocks of doubling size. Every slot
+	# before a block is final, so duplicate targets within the block
+	# can be redrawn (until each node has m distinct targets) by
+	# re-resolving only the block itself.
+	start = 0
+	while start < len(new_nodes):
+		end = min(len(new_nodes), start + max(1024, start))
+		slots = target_slots[start * m:end * m]
+		while True:
+			value[slots] = -1
+			per_node = _resolve(value, pointer, slots).reshape(-1, m)
+			order = np.argsort(per_node, axis=1, kind='stable')
+			ranked = np.take_along_axis(per_node, order, axis=1)
+			dup_sorted = np.zeros_like(ranked, dtype=bool)
+			dup_sorted[:, 1:] = ranked[:, 1:] == ranked[:, :-1]
+			dup = np.zeros_like(dup_sorted)
+			np.put_along_axis(dup, order, dup_sorted, axis=1)
+			dup = dup.ravel()
+			if not np.any(dup):
+				break
+			pending = slots[dup]
+			limit = limits[start * m:end * m][dup]
+			pointer[pending] = (rng.random(len(pending)) * limit).astype(np.int64)
+		start = end
+	targets = value[target_slots]
+
+	star_src = np.zeros(m, dtype=np.int64)
+	star_dst = np.arange(1, m + 1, dtype=np.int64)
+	src = np.concatenate([star_src, np.repeat(new_nodes, m)])
+	dst = np.concatenate([star_dst, targets])
+	return src, dst
+
+
+def name_pool(size=1000, seed=None, locale='en_US'):
+	# Precompute pools of first and last names with Faker. Only
+	# 2 * size Faker calls are made, no matter how many names are
+	# sampled from the pools afterwards.
+	from faker import Faker
+	faker = Faker(locale)
+	faker.seed_instance(seed)
+	first = np.asarray([faker.first_name() for _ in range(size)], dtype=object)
+	last = np.asarray([faker.last_name() for _ in range(size)], dtype=object)
+	return first, last
+
+
+def sample_names(count, pool=None, seed=None):
+	# Vectorized "First Last" names for count nodes, drawn from a name
+	# pool (see name_pool()).
+	if pool is None:
+		pool = name_pool(seed=seed)
+	first, last = pool
+	rng = np.random.default_rng(seed)
+	return first[rng.integers(0, len(first), count)] + ' ' + \
+		last[rng.integers(0, len(last), count)]
+
+
+def save_edges(path, src, dst, names=None):
+	# Write the edge arrays (and optional node names) to an .npz file
+	# without going through networkx.
+	arrays = {'src': src, 'dst': dst}
+	if names is not None:
+		arrays['names'] = np.asarray(names).astype(str)
+	np.savez(path, **arrays)
+
+
+def to_networkx(src, dst, n=None, names=None):
+	# Build an nx.Graph from edge arrays (for drawing small graphs).
+	# When names are given the nodes are labeled with them directly,
+	# so no nx.relabel_nodes copy is needed.
+	import networkx as nx
+	G = nx.Graph()
+	if n is not None:
+		G.add_nodes_from(range(n) if names is None else list(names))
+	if names is not None:
+		names = np.asarray(names, dtype=object)
+		src = names[src]
+		dst = names[dst]
+	G.add_edges_from(zip(np.asarray(src).tolist(), np.asarray(dst).tolist()))
+	return G
+
+
+def _resolve(value, pointer, slots):
+	# Follow pointers from the given slots until they reach a slot with
+	# a known value and store the result in value.
+	result = np.empty(len(slots), dtype=np.int64)
+	pending = np.arange(len(slots))
+	current = pointer[slots]
+	while len(pending) > 0:
+		found = value[current]
+		known = found >= 0
+		result[pending[known]] = found[known]
+		pending = pending[~known]
+		current = pointer[current[~known]]
+	value[slots] = result
+	return result
+
+
+def _pairs_to_edges(positions):
+	# Map linear indices over the lower triangle (v > w) back to pairs.
+	v = ((1 + np.sqrt(1 + 8 * positions.astype(np.float64))) // 2).astype(np.int64)
+	# Correct floating point rounding at the triangle boundaries.
+	v -= (v * (v - 1) // 2) > positions
+	v += ((v + 1) * v // 2) <= positions
+	w = positions - v * (v - 1) // 2
+	return v, w
+
+
+def _conflicts(src, dst, n, preferred=None):
+	# Mark self-loops and every edge but one copy of a duplicate: the
+	# first preferred copy if there is one, else the first copy.
+	lo = np.minimum(src, dst)
+	hi = np.maximum(src, dst)
+	key = lo * n + hi
+	if preferred is None:
+		order = np.argsort(key, kind='stable')
+	else:
+		order = np.lexsort((~np.asarray(preferred, dtype=bool), key))
+	dup = np.zeros(len(key), dtype=bool)
+	dup[order[1:]] = key[order[1:]] == key[order[:-1]]
+	return dup | (src == dst)
+
+
+def _empty():
+	return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
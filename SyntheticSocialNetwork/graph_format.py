@@ -0,0 +1,314 @@
+# graph_format.py
+# Compact binary, memory-mappable file format for (undirected) graphs,
+# replacing indented node-link JSON. A file holds:
+#   - an 8 byte magic string and the length of a JSON header,
+#   - the JSON header (format version, node/entry counts, the offset,
+#     dtype and length of every array, and a SHA-256 checksum of the
+#     array data),
+#   - 64 byte aligned raw arrays: a CSR of the edges (indptr, indices)
+#     with their weights, and a string table for the node labels
+#     (label_offsets + UTF-8 label_bytes).
+# Loading only maps the file with np.memmap, so it takes near-zero time
+# and only the slices that are actually read are paged in.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import hashlib
+import json
+import numpy as np
+
+
+MAGIC = b'SNGRAPH\x00'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+ARRAYS = ('indptr', 'indices', 'weights', 'label_offsets', 'label_bytes')
+CHECKSUM_BLOCK = 1 << 24
+
+
+def write_graph(path, src, dst, weights=None, labels=None, n=None):
+	# Write an undirected graph given as edge arrays of node IDs. Each
+	# edge is stored in both directions of the CSR (self-loops once) and
+	# duplicate pairs have their weights summed. Missing weights are 1.
+	# labels (one string per node ID) default to the IDs themselves.
+	# Returns the header.
+	src = np.asarray(src, dtype=np.int64)
+	dst = np.asarray(dst, dtype=np.int64)
+	if weights is None:
+		weights = np.ones(len(src), dtype=np.float32)
+	weights = np.asarray(weights, dtype=np.float32)
+	if n is None:
+		n = len(labels) if labels is not None else (
+			int(max(src.max(), dst.max())) + 1 if len(src) > 0 else 0
+		)
+	indptr, indices, values = _csr(src, dst, weights, n)
+
+	if labels is None:
+		labels = np.arange(n).astype(str)
+	encoded = [str(label).encode('utf-8') for label in labels]
+	label_offsets = np.zeros(n + 1, dtype=np.int64)
+	label_offsets[1:] = np.cumsum([len(label) for label in encoded])
+	label_bytes = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+	arrays = {
+		'indptr': indptr,
+		'indices': indices.astype(np.int32 if n < 2 ** 31 else np.int64),
+		'weights': values,
+		'label_offsets': label_offsets,
+		'label_bytes': label_bytes,
+	}
+	header = {
+		'version': FORMAT_VERSION,
+		'directed': False,
+		'nodes': int(n),
+		'entries': int(len(indices)),
+		'checksum': checksum(arrays),
+		'arrays': {},
+	}
+
+	# Lay out the arrays after the header. The header size depends on
+	# the offsets, so reserve generous room for the offset digits.
+	draft = json.dumps(_with_layout(header, arrays, 0)).encode('utf-8')
+	start = _align(len(MAGIC) + 8 + len(draft) + 256)
+	header = _with_layout(header, arrays, start)
+	raw = json.dumps(header).encode('utf-8')
+	with open(path, 'wb') as f:
+		f.write(MAGIC)
+		f.write(np.uint64(len(raw)).tobytes())
+		f.write(raw)
+		for name in ARRAYS:
+			f.write(b'\x00' * (header['arrays'][name]['offset'] - f.tell()))
+			f.write(np.ascontiguousarray(arrays[name]).tobytes())
+	return header
+
+
+def write_networkx(path, G, weight='weight'):
+	# Write a networkx graph; node labels are the string form of the
+	# node keys. Missing weights are 1.
+	nodes = list(G.nodes())
+	index = {node: i for i, node in enumerate(nodes)}
+	m = G.number_of_edges()
+	src = np.empty(m, dtype=np.int64)
+	dst = np.empty(m, dtype=np.int64)
+	weights = np.empty(m, dtype=np.float32)
+	for i, (u, v, w) in enumerate(G.edges(data=weight, default=1)):
+		src[i] = index[u]
+		dst[i] = index[v]
+		weights[i] = w
+	return write_graph(path, src, dst, weights, [str(node) for node in nodes])
+
+
+class GraphFile:
+	# Read-only, memory-mapped view of a graph file.
+	def __init__(self, path):
+		self.path = path
+		with open(path, 'rb') as f:
+			if f.read(len(MAGIC)) != MAGIC:
+				raise ValueError(f'{path} is not a graph file')
+			size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+			self.header = json.loads(f.read(size).decode('utf-8'))
+		if self.header['version'] > FORMAT_VERSION:
+			raise ValueError(
+				f'Unsupported graph file version {self.header["version"]}'
+			)
+		for name in ARRAYS:
+			spec = self.header['arrays'][name]
+			if spec['length'] == 0:
+				array = np.zeros(0, dtype=np.dtype(spec['dtype']))
+			else:
+				array = np.memmap(
+					path, dtype=np.dtype(spec['dtype']), mode='r',
+					offset=spec['offset'], shape=(spec['length'],)
+				)
+			setattr(self, name, array)
+
+
+	@property
+	def checksum(self):
+		return self.header['checksum']
+
+
+	def number_of_nodes(self):
+		return self.header['nodes']
+
+
+	def number_of_edges(self):
+		loops = 0
+		for start in range(0, self.number_of_nodes(), 1_000_000):
+			indptr, indices, _ = self.rows(start, start + 1_000_000)
+			rows = start + np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+			loops += int(np.count_nonzero(rows == indices))
+		return (self.header['entries'] - loops) // 2 + loops
+
+
+	def neighbors(self, node):
+		return np.asarray(self.indices[self.indptr[node]:self.indptr[node + 1]])
+
+
+	def edge_weights(self, node):
+		return np.asarray(self.weights[self.indptr[node]:self.indptr[node + 1]])
+
+
+	def rows(self, start, stop):
+		# CSR block for the nodes [start, stop): (indptr rebased to 0,
+		# indices, weights). Only that part of the file is read.
+		stop = min(stop, self.number_of_nodes())
+		indptr = np.asarray(self.indptr[start:stop + 1])
+		lo = indptr[0]
+		hi = indptr[-1]
+		return (
+			indptr - lo, np.asarray(self.indices[lo:hi]),
+			np.asarray(self.weights[lo:hi])
+		)
+
+
+	def label(self, node):
+		lo = self.label_offsets[node]
+		hi = self.label_offsets[node + 1]
+		return bytes(self.label_bytes[lo:hi]).decode('utf-8')
+
+
+	def labels(self, start=0, stop=None):
+		if stop is None:
+			stop = self.number_of_nodes()
+		offsets = np.asarray(self.label_offsets[start:stop + 1])
+		raw = bytes(self.label_bytes[offsets[0]:offsets[-1]])
+		offsets = offsets - offsets[0]
+		return [
+			raw[offsets[i]:offsets[i + 1]].decode('utf-8')
+			for i in range(len(offsets) - 1)
+		]
+
+
+	def verify(self):
+		# Recompute the checksum of the stored arrays.
+		return checksum({name: getattr(self, name) for name in ARRAYS}) == self.checksum
+
+
+	def to_networkx(self, weight='weight'):
+		import networkx as nx
+		G = nx.Graph()
+		labels = np.asarray(self.labels(), dtype=object)
+		G.add_nodes_from(labels.tolist())
+		indptr = np.asarray(self.indptr)
+		rows = np.repeat(np.arange(self.number_of_nodes()), np.diff(indptr))
+		cols = np.asarray(self.indices)
+		keep = rows <= cols
+		G.add_weighted_edges_from(
+			zip(
+				labels[rows[keep]].tolist(), labels[cols[keep]].tolist(),
+				np.asarray(self.weights)[keep].tolist()
+			),
+			weight=weight
+		)
+		return G
+
+
+def read_graph(path):
+	return GraphFile(path)
+
+
+def same_graph(a, b):
+	# Fast equality check of two graph files (paths or GraphFiles) by
+	# comparing the checksums stored in their headers.
+	if not isinstance(a, GraphFile):
+		a = GraphFile(a)
+	if not isinstance(b, GraphFile):
+		b = GraphFile(b)
+	return a.checksum == b.checksum
+
+
+def json_to_graph(json_path, graph_path, weight='weight'):
+	# Convert a node-link JSON file (such as fake_network.json) to the
+	# binary format. Node ids become the labels.
+	with open(json_path) as f:
+		data = json.load(f)
+	ids = [node['id'] for node in data['nodes']]
+	index = {node: i for i, node in enumerate(ids)}
+	links = data.get('links', data.get('edges', []))
+	src = np.fromiter((index[link['source']] for link in links), np.int64, len(links))
+	dst = np.fromiter((index[link['target']] for link in links), np.int64, len(links))
+	weights = np.fromiter(
+		(link.get(weight, 1) for link in links), np.float32, len(links)
+	)
+	return write_graph(
+		graph_path, src, dst, weights, [str(node) for node in ids], len(ids)
+	)
+
+
+def graph_to_json(graph_path, json_path, weight='weight'):
+	# Convert a binary graph file back to node-link JSON, in the same
+	# layout as fake_network.json. Weights of 1 are omitted.
+	graph = GraphFile(graph_path)
+	labels = graph.labels()
+	links = []
+	for node in range(graph.number_of_nodes()):
+		for other, w in zip(graph.neighbors(node).tolist(), graph.edge_weights(node).tolist()):
+			if node <= other:
+				link = {'source': labels[node], 'target': labels[other]}
+				if w != 1:
+					link[weight] = w
+				links.append(link)
+	data = {
+		'directed': False,
+		'multigraph': False,
+		'graph': {},
+		'nodes': [{'id': label} for label in labels],
+		'links': links,
+	}
+	with open(json_path, 'w') as f:
+		json.dump(data, f, indent=4)
+
+
+def checksum(arrays):
+	# SHA-256 over the arrays (in ARRAYS order, little-endian bytes),
+	# hashed in blocks so memory-mapped arrays are never copied whole.
+	digest = hashlib.sha256()
+	for name in ARRAYS:
+		array = arrays[name]
+		dtype = array.dtype.newbyteorder('<')
+		digest.update(name.encode('utf-8'))
+		for start in range(0, len(array), CHECKSUM_BLOCK):
+			block = np.ascontiguousarray(array[start:start + CHECKSUM_BLOCK], dtype=dtype)
+			digest.update(block.tobytes())
+	return digest.hexdigest()
+
+
+def _csr(src, dst, weights, n):
+	# Symmetric CSR with sorted, duplicate-free rows.
+	off = src != dst
+	rows = np.concatenate([src, dst[off]])
+	cols = np.concatenate([dst, src[off]])
+	vals = np.concatenate([weights, weights[off]])
+	key = rows * max(n, 1) + cols
+	order = np.argsort(key, kind='stable')
+	key = key[order]
+	first = np.ones(len(key), dtype=bool)
+	first[1:] = key[1:] != key[:-1]
+	starts = np.flatnonzero(first)
+	values = np.add.reduceat(vals[order], starts) if len(starts) > 0 else vals[:0]
+	rows = rows[order][starts]
+	cols = cols[order][starts]
+	indptr = np.zeros(n + 1, dtype=np.int64)
+	indptr[1:] = np.cumsum(np.bincount(rows, minlength=n))
+	return indptr, cols, values.astype(np.float32)
+
+
+def _with_layout(header, arrays, start):
+	header = dict(header)
+	layout = {}
+	offset = start
+	for name in ARRAYS:
+		array = arrays[name]
+		layout[name] = {
+			'dtype': array.dtype.newbyteorder('<').str,
+			'offset': offset,
+			'length': int(len(array)),
+		}
+		offset = _align(offset + array.nbytes)
+	header['arrays'] = layout
+	return header
+
+
+def _align(offset):
+	return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
@@ -0,0 +1,337 @@
+# sharded.py
+# Multi-process, sharded generation of very large synthetic social
+# networks. The node IDs are split into fixed-size blocks; each block
+# is one shard, generated by a worker with its own deterministic
+# sub-seed and written to its own file. A JSON manifest records the
+# model, parameters and shards and describes how to stitch them back
+# together. Since shards depend only on (seed, block), the output is
+# bit-identical no matter how many worker processes are used.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+DEFAULT_BLOCK_SIZE = 1_000_000
+
+# Watts-Strogatz: redraws of the rewired targets that are in conflict
+# before they fall back to their lattice target.
+REWIRE_ROUNDS = 64
+
+# splitmix64 constants (used as a counter-based random number
+# generator for the Barabasi-Albert model).
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def generate_sharded(model, out_dir, n, seed, block_size=DEFAULT_BLOCK_SIZE,
+		workers=None, **params):
+	# Generate an 'er' (p), 'ws' (k, p) or 'ba' (m) graph with n nodes
+	# into out_dir as shard-NNNNN.npz files plus manifest.json. Returns
+	# the manifest dict.
+	if model not in _MODELS:
+		raise ValueError(f'Unknown model: {model}')
+	if seed is None:
+		raise ValueError('A seed is required for reproducible shards')
+	os.makedirs(out_dir, exist_ok=True)
+	blocks = [
+		(start, min(n, start + block_size))
+		for start in range(0, n, block_size)
+	]
+	tasks = [
+		(model, out_dir, i, start, end, n, seed, params)
+		for i, (start, end) in enumerate(blocks)
+	]
+	if workers == 1:
+		shards = [_generate_shard(*task) for task in tasks]
+	else:
+		with ProcessPoolExecutor(max_workers=workers) as pool:
+			shards = list(pool.map(_generate_shard, *zip(*tasks)))
+
+	manifest = {
+		'format': 'edge-shards',
+		'version': FORMAT_VERSION,
+		'model': model,
+		'params': params,
+		'seed': seed,
+		'nodes': n,
+		'block_size': block_size,
+		'edges': _stitched_edges(model, out_dir, shards, n, params),
+		'stitch': {
+			'order': 'concatenate the shards in the listed order',
+			'dedupe': model == 'ws',
+		},
+		'shards': shards,
+	}
+	with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+		json.dump(manifest, f, indent=4)
+	return manifest
+
+
+def load_sharded(path, verify=True):
+	# Stitch the shards described by a manifest (or the directory that
+	# holds it) back into (src, dst) arrays, checking every shard's
+	# checksum when verify is set.
+	if os.path.isdir(path):
+		path = os.path.join(path, MANIFEST)
+	with open(path) as f:
+		manifest = json.load(f)
+	folder = os.path.dirname(path)
+	srcs = []
+	dsts = []
+	for shard in manifest['shards']:
+		with np.load(os.path.join(folder, shard['file'])) as data:
+			src = data['src']
+			dst = data['dst']
+		if verify and _checksum(src, dst) != shard['sha256']:
+			raise ValueError(f'Checksum mismatch in shard {shard["file"]}')
+		srcs.append(src)
+		dsts.append(dst)
+	src = np.concatenate(srcs) if srcs else np.zeros(0, dtype=np.int64)
+	dst = np.concatenate(dsts) if dsts else np.zeros(0, dtype=np.int64)
+	if manifest['stitch']['dedupe']:
+		# Rewired Watts-Strogatz edges from two different shards can
+		# coincide; keep the first occurrence.
+		key = np.minimum(src, dst) * manifest['nodes'] + np.maximum(src, dst)
+		_, first = np.unique(key, return_index=True)
+		first.sort()
+		src = src[first]
+		dst = dst[first]
+	return src, dst
+
+
+def _generate_shard(model, out_dir, index, start, end, n, seed, params):
+	# Worker: generate the edges owned by the nodes [start, end) and
+	# write them to disk. Returns the shard's manifest entry.
+	rng = np.random.default_rng(
+		np.random.SeedSequence(seed, spawn_key=(index,))
+	)
+	src, dst = _MODELS[model](rng, start, end, n, seed, **params)
+	src = src.astype(np.int64)
+	dst = dst.astype(np.int64)
+	name = f'shard-{index:05d}.npz'
+	np.savez(os.path.join(out_dir, name), src=src, dst=dst)
+	return {
+		'file': name,
+		'first_node': start,
+		'last_node': end - 1,
+		'edges': int(len(src)),
+		'sha256': _checksum(src, dst),
+	}
+
+
+def _stitched_edges(model, out_dir, shards, n, params):
+	# Number of edges load_sharded() returns. Only Watts-Strogatz shards
+	# can overlap, and only in rewired edges (the edges more than k // 2
+	# apart on the ring), so only those are read back to count the
+	# duplicates.
+	total = sum(shard['edges'] for shard in shards)
+	if model != 'ws':
+		return total
+	keys = []
+	for shard in shards:
+		with np.load(os.path.join(out_dir, shard['file'])) as data:
+			src = data['src']
+			dst = data['dst']
+		ring = np.abs(dst - src)
+		rewired = np.minimum(ring, n - ring) > params['k'] // 2
+		keys.append(
+			np.minimum(src, dst)[rewired] * n + np.maximum(src, dst)[rewired]
+		)
+	if len(keys) == 0:
+		return total
+	keys = np.concatenate(keys)
+	return total - (len(keys) - len(np.unique(keys)))
+
+
+def _er_block(rng, start, end, n, seed, p):
+	# Erdos-Renyi edges (v, w) with w < v and start <= v < end, by
+	# geometric skip sampling over the block's range of pair indices.
+	from generators import _pairs_to_edges
+	lo = start * (start - 1) // 2 if start > 0 else 0
+	hi = end * (end - 1) // 2
+	expected = p * (hi - lo)
+	batch = int(min(1 << 22, 1.1 * expected + 64))
+	chunks = []
+	last = lo - 1
+	while p > 0:
+		skips = rng.geometric(p, size=batch).astype(np.int64)
+		positions = last + np.cumsum(skips)
+		positions = positions[positions < hi]
+		if len(positions) > 0:
+			chunks.append(positions)
+			last = positions[-1]
+		if len(positions) < batch:
+			break
+	if len(chunks) == 0:
+		return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+	return _pairs_to_edges(np.concatenate(chunks))
+
+
+def _ws_block(rng, start, end, n, seed, k, p):
+	# Watts-Strogatz lattice edges (u, u + j) for start <= u < end and
+	# j = 1..k // 2, each rewired with probability p to (u, w). A
+	# rewired target is redrawn while it is u itself, one of u's lattice
+	# neighbors or a duplicate of another edge in the shard. Edges still
+	# in conflict after REWIRE_ROUNDS redraws (only likely when n is
+	# barely larger than k) keep their lattice target instead, so the
+	# shard is always a simple graph and depends only on (seed, block).
+	# Duplicates across shards are dropped when stitching.
+	half = k // 2
+	nodes = np.arange(start, end, dtype=np.int64)
+	src = np.repeat(nodes, half)
+	lattice = (src + np.tile(np.arange(1, half + 1, dtype=np.int64), len(nodes))) % n
+	dst = lattice.copy()
+	rewire = np.flatnonzero(rng.random(len(src)) < p)
+	dst[rewire] = rng.integers(0, n, size=len(rewire))
+	if n <= 2 * half + 1:
+		return src, lattice
+	for attempt in range(REWIRE_ROUNDS + 1):
+		ring = np.abs(dst[rewire] - src[rewire])
+		ring = np.minimum(ring, n - ring)
+		lo = np.minimum(src, dst)
+		key = lo * n + np.maximum(src, dst)
+		order = np.argsort(key, kind='stable')
+		dup = np.zeros(len(key), dtype=bool)
+		dup[order[1:]] = key[order[1:]] == key[order[:-1]]
+		bad = rewire[(ring <= half) | dup[rewire]]
+		if len(bad) == 0:
+			break
+		if attempt == REWIRE_ROUNDS:
+			# Lattice edges never coincide with each other or with a
+			# rewired edge (those are more than half apart on the ring).
+			dst[bad] = lattice[bad]
+		else:
+			dst[bad] = rng.integers(0, n, size=len(bad))
+	return src, dst
+
+
+def _ba_block(rng, start, end, n, seed, m):
+	# Barabasi-Albert edges of the new nodes in [start, end), using the
+	# same repeated-node slot layout as generators.barabasi_albert_edges.
+	# Slot pointers come from a counter-based hash of (seed, slot), so
+	# every worker can resolve any chain of earlier slots without shared
+	# state. Duplicate targets of a node are merged (the node keeps its
+	# distinct targets) rather than redrawn.
+	t0 = m + 1
+	prefix = 2 * m
+	srcs = []
+	dsts = []
+	if start == 0:
+		# The initial star on nodes 0..m.
+		srcs.append(np.zeros(m, dtype=np.int64))
+		dsts.append(np.arange(1, m + 1, dtype=np.int64))
+	first = max(start, t0)
+	if first < end:
+		nodes = np.arange(first, end, dtype=np.int64)
+		slots = (
+			prefix + 2 * m * (nodes - t0)[:, None] + np.arange(m)
+		).ravel().astype(np.uint64)
+		targets = _ba_resolve(slots, seed, m).reshape(len(nodes), m)
+		targets.sort(axis=1)
+		keep = np.ones_like(targets, dtype=bool)
+		keep[:, 1:] = targets[:, 1:] != targets[:, :-1]
+		srcs.append(np.repeat(nodes, m).reshape(len(nodes), m)[keep])
+		dsts.append(targets[keep])
+	if len(srcs) == 0:
+		return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+	return np.concatenate(srcs), np.concatenate(dsts)
+
+
+def _ba_resolve(slots, seed, m):
+	# Resolve target slots to node IDs by following hash pointers back
+	# until a slot with a fixed value (star prefix or node slot) is hit.
+	t0 = m + 1
+	prefix = 2 * m
+	key = _splitmix(np.asarray([seed], dtype=np.uint64))[0]
+	result = np.empty(len(slots), dtype=np.int64)
+	pending = np.arange(len(slots))
+	current = slots.astype(np.int64)
+	while len(pending) > 0:
+		# Draw the pointer of each current (target) slot uniformly from
+		# the slots that existed before its node was added.
+		node = t0 + (current - prefix) // (2 * m)
+		limit = prefix + 2 * m * (node - t0)
+		bits = _splitmix(current.astype(np.uint64) ^ key)
+		uniform = (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+		current = (uniform * limit).astype(np.int64)
+
+		# Slots in the star prefix or in a node's own half are fixed.
+		value = np.full(len(current), -1, dtype=np.int64)
+		in_prefix = current < prefix
+		value[in_prefix] = np.where(
+			current[in_prefix] < m, 0, current[in_prefix] - m + 1
+		)
+		offset = (current - prefix) % (2 * m)
+		own = ~in_prefix & (offset >= m)
+		value[own] = t0 + (current[own] - prefix) // (2 * m)
+		known = value >= 0
+		result[pending[known]] = value[known]
+		pending = pending[~known]
+		current = current[~known]
+	return result
+
+
+def _splitmix(x):
+	# splitmix64 finalizer on a uint64 array (wrapping arithmetic).
+	with np.errstate(over='ignore'):
+		z = x + _GOLDEN
+		z = (z ^ (z >> np.uint64(30))) * _MIX1
+		z = (z ^ (z >> np.uint64(27))) * _MIX2
+		return z ^ (z >> np.uint64(31))
+
+
+def _checksum(src, dst):
+	digest = hashlib.sha256()
+	digest.update(np.ascontiguousarray(src, dtype='<i8').tobytes())
+	digest.update(np.ascontiguousarray(dst, dtype='<i8').tobytes())
+	return digest.hexdigest()
+
+
+_MODELS = {'er': _er_block, 'ws': _ws_block, 'ba': _ba_block}
+
+
+def main():
+	parser = argparse.ArgumentParser(
+		description='Generate a large synthetic graph as sharded edge files.'
+	)
+	parser.add_argument('model', choices=sorted(_MODELS))
+	parser.add_argument('out_dir', help='Directory for the shards and manifest.')
+	parser.add_argument('--nodes', type=int, required=True)
+	parser.add_argument('--seed', type=int, default=42)
+	parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE)
+	parser.add_argument('--workers', type=int, default=None)
+	parser.add_argument('--p', type=float, help='Edge/rewiring probability (er, ws).')
+	parser.add_argument('--k', type=int, help='Lattice degree (ws).')
+	parser.add_argument('--m', type=int, help='Edges per new node (ba).')
+	args = parser.parse_args()
+
+	params = {
+		'er': lambda: {'p': args.p},
+		'ws': lambda: {'k': args.k, 'p': args.p},
+		'ba': lambda: {'m': args.m},
+	}[args.model]()
+	manifest = generate_sharded(
+		args.model, args.out_dir, args.nodes, args.seed, args.block_size,
+		args.workers, **params
+	)
+	print(
+		f'Wrote {manifest["edges"]} edges in {len(manifest["shards"])} '
+		f'shards to {args.out_dir}'
+	)
+
+	# Exit the program.
+	exit(0)
+
+
+if __name__ == '__main__':
+	main()
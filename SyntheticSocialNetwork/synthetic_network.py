@@ -6,11 +6,13 @@
 # Windows/MacOS/Linux
 
 
-import json
-from faker import Faker
 import networkx as nx
 import numpy as np
 import matplotlib.pyplot as plt
+from generators import erdos_renyi_edges, watts_strogatz_edges
+from generators import barabasi_albert_edges, to_networkx
+from attributes import generate_attributes, NodeAttributes, same_attributes
+from graph_format import write_networkx, read_graph
 
 
 def main():
@@ -19,14 +21,18 @@ def main():
 	# adjusting the hyperparameters generates drastically different
 	# graphs.
 	
+	# The models are the vectorized generators in generators.py, which
+	# return edge arrays (no nx.Graph is built until it is needed for
+	# drawing) and scale to load-test graphs with 10^6-10^8 edges.
+
 	# Erdos-Renyi model.
-	G1 = nx.erdos_renyi_graph(n=50, p=0.2, seed=42)
+	G1 = to_networkx(*erdos_renyi_edges(n=50, p=0.2, seed=42), n=50)
 
 	# Watts-Strogatz model.
-	G2 = nx.watts_strogatz_graph(n=50, k=5, p=0.4, seed=42)
+	G2 = to_networkx(*watts_strogatz_edges(n=50, k=5, p=0.4, seed=42), n=50)
 
 	# Barabasi-Albert model.
-	G3 = nx.barabasi_albert_graph(n=50, m=5, seed=42)
+	G3 = to_networkx(*barabasi_albert_edges(n=50, m=5, seed=42), n=50)
 
 	# Plot the graphs side by side.
 	fig, ax = plt.subplots(1, 3, figsize=(15, 5))
@@ -45,23 +51,19 @@ def main():
 	# labels. This can be done using faker python library, which 
 	# generates fake data such as names.
 
-	# Initialize faker & names list.
-	faker = Faker()
-	names = []
-
-	# Generate 10 unique names.
-	for i in range(10):
-		# Generate a random name.
-		name = faker.name()
-		# Append the name to the list.
-		names.append(name)
+	# Precompute pools of names, occupations, organizations and
+	# locations with faker and draw every node's attributes from them in
+	# vectorized batches (instead of calling faker once per node). The
+	# attributes are columns indexed by node ID and the names are
+	# guaranteed to be unique labels (see attributes.py).
+	attributes = generate_attributes(10, seed=42)
 
 	# Barabasi-Albert model.
-	G = nx.barabasi_albert_graph(n=10, m=5, seed=42)
+	src, dst = barabasi_albert_edges(n=10, m=5, seed=42)
 
-	# Add the names to the graph.
-	mapping = {i: names[i] for i in range(len(names))}
-	G = nx.relabel_nodes(G, mapping)
+	# Add the names to the graph (nodes are labeled directly, so no
+	# nx.relabel_nodes copy is needed).
+	G = to_networkx(src, dst, n=10, names=attributes.labels())
 
 	fig, ax = plt.subplots(figsize=(3, 2), dpi=300)
 	nx.draw(G, with_labels=True, node_size=50,width=0.1, font_size=3.5)
@@ -69,25 +71,38 @@ def main():
 	plt.savefig('./Synthetic_Social_Network_Graph.png') # Saves graph to file.
 
 	# The synthetic social network now has labels. Each node represents
-	# a person, and their name acts as the node label.
-	# It is possible to generate other node attributes like age, sex, 
-	# and occupation of each person in the social network and update 
-	# the graph.
+	# a person, and their name acts as the node label. The other
+	# attributes (age, sex, occupation, organization and location) can
+	# be added to the graph as node attributes as well.
+	attributes.attach(G)
+	print(attributes.to_frame())
 	# Now we have a fully loaded synthetic social network that can be 
 	# used to perform graph analytic tasks.
 
-	# You can also save & load a graph with networkx.
-	with open("fake_network.json", "w+") as f:
-		json.dump(nx.node_link_data(G), f, indent=4)
-
-	with open("fake_network.json", "r") as r:
-		loaded_graph = nx.node_link_graph(
-			json.load(r)
-		)
-
-	# Compare the loaded graph with the original (compare the JSON
-	# serialized data, not the actual raw objects).
-	print(f"Loaded and original graphs match: {nx.node_link_data(G) == nx.node_link_data(loaded_graph)}")
+	# You can also save & load a graph. Instead of indented node-link
+	# JSON, the graph is written in the compact binary format from
+	# graph_format.py (CSR edges and weights, a string table for the
+	# labels and a versioned header with a checksum), which loads with
+	# np.memmap in near-zero time. json_to_graph() and graph_to_json()
+	# convert from/to the fake_network.json node-link format. The binary
+	# format only holds the structure and the labels, so the node
+	# attributes are saved next to it (as code columns and pools, see
+	# NodeAttributes.save()), in the same node ID order.
+	header = write_networkx("fake_network.graph", G)
+	attributes.save("fake_network_attributes.npz")
+	loaded_graph = read_graph("fake_network.graph")
+	loaded_attributes = NodeAttributes.load("fake_network_attributes.npz")
+
+	# Compare the loaded graph with the original by checksum (the
+	# checksum stored in the file must match the one computed from the
+	# original graph and the data actually read back), and the loaded
+	# attributes with the original ones (including that they still
+	# label the same nodes).
+	graph_match = loaded_graph.checksum == header['checksum'] and loaded_graph.verify()
+	attributes_match = same_attributes(attributes, loaded_attributes) and \
+		loaded_graph.labels() == loaded_attributes.labels().tolist()
+	print(f"Loaded and original graphs match: {graph_match}")
+	print(f"Loaded and original attributes match: {attributes_match}")
 
 	# Exit the program.
 	exit(0)
@@ -0,0 +1,11 @@
+# conftest.py
+# Make the SyntheticSocialNetwork modules importable from the tests
+# (the scripts use flat sibling imports).
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
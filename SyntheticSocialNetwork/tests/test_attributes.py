@@ -0,0 +1,41 @@
+# test_attributes.py
+# Node attributes must survive a save() / load() round trip next to a
+# binary graph file.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import numpy as np
+from attributes import attribute_pools, generate_attributes
+from attributes import NodeAttributes, same_attributes
+from generators import barabasi_albert_edges, to_networkx
+from graph_format import write_networkx, read_graph
+
+
+def test_attributes_round_trip(tmp_path):
+	attributes = generate_attributes(500, seed=7, pools=attribute_pools(50, seed=7))
+	G = attributes.attach(
+		to_networkx(*barabasi_albert_edges(500, 3, 7), n=500, names=attributes.labels())
+	)
+	write_networkx(str(tmp_path / 'graph.graph'), G)
+	attributes.save(str(tmp_path / 'attributes.npz'))
+
+	graph = read_graph(str(tmp_path / 'graph.graph'))
+	loaded = NodeAttributes.load(str(tmp_path / 'attributes.npz'))
+	assert same_attributes(attributes, loaded)
+	assert graph.labels() == loaded.labels().tolist()
+	assert loaded.to_frame().equals(attributes.to_frame())
+	for name in ['sex', 'age', 'occupation', 'organization', 'location']:
+		values = loaded.column(name)
+		for node, label in [(0, graph.label(0)), (499, graph.label(499))]:
+			assert G.nodes[label][name] == values[node]
+
+
+def test_same_attributes_detects_changes():
+	attributes = generate_attributes(100, seed=1, pools=attribute_pools(20, seed=1))
+	columns = dict(attributes.columns)
+	columns['age'] = columns['age'].copy()
+	columns['age'][3] += 1
+	changed = NodeAttributes(attributes.pools, columns)
+	assert same_attributes(attributes, attributes)
+	assert not same_attributes(attributes, changed)
@@ -0,0 +1,40 @@
+# test_generators.py
+# The vectorized generators must return simple graphs (no self-loops,
+# no duplicate edges).
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import numpy as np
+import pytest
+from generators import watts_strogatz_edges, erdos_renyi_edges
+from generators import barabasi_albert_edges
+
+
+def assert_simple(src, dst, n):
+	assert np.all(src != dst)
+	key = np.minimum(src, dst) * n + np.maximum(src, dst)
+	assert len(np.unique(key)) == len(key)
+
+
+def test_watts_strogatz_small_is_simple():
+	# Rewired edges that sort before the lattice edge they duplicate
+	# used to survive (e.g. seed 4 returned (17, 19) twice). Small
+	# graphs hit these conflicts often, so many seeds are checked.
+	for seed in range(3000):
+		src, dst = watts_strogatz_edges(20, 4, 0.5, seed)
+		assert_simple(src, dst, 20)
+		assert len(src) == 40, seed
+
+
+@pytest.mark.parametrize('p', [0.1, 0.5, 1.0])
+def test_watts_strogatz_large_is_simple(p):
+	n = 100000
+	src, dst = watts_strogatz_edges(n, 6, p, 42)
+	assert_simple(src, dst, n)
+	assert len(src) == 3 * n
+
+
+def test_erdos_renyi_and_barabasi_albert_are_simple():
+	assert_simple(*erdos_renyi_edges(1000, 0.01, 42), 1000)
+	assert_simple(*barabasi_albert_edges(1000, 3, 42), 1000)
@@ -0,0 +1,70 @@
+# test_sharded.py
+# Sharded generation must not depend on the number of workers, and the
+# manifest must describe the stitched graph.
+# Python 3.7
+# Windows/MacOS/Linux
+
+
+import json
+import os
+import numpy as np
+import pytest
+from sharded import generate_sharded, load_sharded, MANIFEST
+
+
+MODELS = {
+	'er': {'p': 0.002},
+	'ws': {'k': 6, 'p': 0.3},
+	'ba': {'m': 3},
+}
+
+
+def read_shards(folder):
+	with open(os.path.join(folder, MANIFEST)) as f:
+		manifest = json.load(f)
+	files = {}
+	for shard in manifest['shards']:
+		with open(os.path.join(folder, shard['file']), 'rb') as f:
+			files[shard['file']] = f.read()
+	return manifest, files
+
+
+@pytest.mark.parametrize('model', sorted(MODELS))
+def test_output_does_not_depend_on_workers(tmp_path, model):
+	outputs = []
+	for workers in [1, 3]:
+		folder = str(tmp_path / f'workers-{workers}')
+		generate_sharded(
+			model, folder, 5000, 42, block_size=700, workers=workers,
+			**MODELS[model]
+		)
+		outputs.append(read_shards(folder))
+	(manifest_1, files_1), (manifest_n, files_n) = outputs
+	assert manifest_1 == manifest_n
+	assert files_1 == files_n
+	assert len(files_1) == 8
+
+
+@pytest.mark.parametrize('model', sorted(MODELS))
+def test_manifest_counts_stitched_edges(tmp_path, model):
+	# Small blocks and a high rewiring probability so Watts-Strogatz
+	# shards overlap.
+	params = dict(MODELS[model], p=0.9) if model == 'ws' else MODELS[model]
+	manifest = generate_sharded(
+		model, str(tmp_path), 300, 7, block_size=20, workers=1, **params
+	)
+	src, dst = load_sharded(str(tmp_path))
+	assert manifest['edges'] == len(src)
+	assert np.all(src != dst)
+	key = np.minimum(src, dst) * 300 + np.maximum(src, dst)
+	assert len(np.unique(key)) == len(key)
+
+
+def test_watts_strogatz_falls_back_to_the_lattice(tmp_path):
+	# Every node has a single target more than k // 2 away on the ring,
+	# so most rewired edges cannot be placed.
+	manifest = generate_sharded('ws', str(tmp_path), 8, 1, workers=1, k=6, p=1.0)
+	src, dst = load_sharded(str(tmp_path))
+	assert manifest['edges'] == len(src) == 24
+	key = np.minimum(src, dst) * 8 + np.maximum(src, dst)
+	assert len(np.unique(key)) == len(key)